@@ -0,0 +1,5 @@
+"""
+Benchmarks of keepdataflow's load operations.
+
+Run ``python -m benchmarks --help`` from the root of the project for the options.
+"""
@@ -0,0 +1,294 @@
+import os
+import platform
+import time
+
+import polars as pl
+import sqlalchemy as sa
+
+from benchmarks.synthetic_data import (
+    changed_data,
+    generate_random_data,
+)
+from keepdataflow.data_transfer import DatabaseDataTransfer
+from keepdataflow.database_operations.df_insert import df_insert
+from keepdataflow.database_operations.df_insert_on_conflict import df_insert_on_conflict
+from keepdataflow.database_operations.df_merge import df_merge
+
+SOURCE_TABLE = "bench_source"
+TARGET_TABLE = "bench_target"
+
+# Row-by-row strategies take hours at the largest sizes, so they stop here
+ROW_BY_ROW_MAX_ROWS = 1_000_000
+
+# name, operation, dialects, keyword arguments, whether the target starts with the base rows, max rows
+CASES = [
+    (
+        "df_insert/executemany",
+        "df_insert",
+        ("sqlite", "postgresql", "mssql"),
+        {"method": "executemany"},
+        False,
+        ROW_BY_ROW_MAX_ROWS,
+    ),
+    ("df_insert/values", "df_insert", ("sqlite", "postgresql", "mssql"), {"method": "values"}, False, None),
+    ("df_insert/copy", "df_insert", ("postgresql",), {"method": "copy"}, False, None),
+    ("df_insert/adbc", "df_insert", ("sqlite", "postgresql"), {"method": "adbc"}, False, None),
+    (
+        "df_insert_on_conflict/executemany",
+        "df_insert_on_conflict",
+        ("postgresql",),
+        {"method": "executemany"},
+        True,
+        ROW_BY_ROW_MAX_ROWS,
+    ),
+    ("df_insert_on_conflict/copy", "df_insert_on_conflict", ("postgresql",), {"method": "copy"}, True, None),
+    (
+        "df_insert_on_conflict/copy_skip_unchanged",
+        "df_insert_on_conflict",
+        ("postgresql",),
+        {"method": "copy", "skip_unchanged": True},
+        True,
+        None,
+    ),
+    ("df_insert_on_conflict/adbc", "df_insert_on_conflict", ("sqlite", "postgresql"), {"method": "adbc"}, True, None),
+    ("df_merge/merge", "df_merge", ("mssql",), {}, True, None),
+    ("df_merge/skip_unchanged", "df_merge", ("mssql",), {"skip_unchanged": True}, True, None),
+    ("df_merge/batched", "df_merge", ("mssql",), {"batch_size": 100_000}, True, None),
+    ("transfer/append", "transfer", ("sqlite", "postgresql", "mssql"), {"operation": "append"}, False, None),
+    (
+        "transfer/append_chunked",
+        "transfer",
+        ("sqlite", "postgresql", "mssql"),
+        {"operation": "append", "chunk_size": 100_000},
+        False,
+        None,
+    ),
+    (
+        "transfer/append_pipelined",
+        "transfer",
+        ("sqlite", "postgresql", "mssql"),
+        {"operation": "append", "chunk_size": 100_000, "pipeline_depth": 2},
+        False,
+        None,
+    ),
+    (
+        "transfer/append_partitioned",
+        "transfer",
+        ("sqlite", "postgresql", "mssql"),
+        {"operation": "append", "chunk_size": 100_000, "partition_column": "ItemID", "partition_count": 4},
+        False,
+        None,
+    ),
+    (
+        "transfer/append_adaptive",
+        "transfer",
+        ("sqlite", "postgresql", "mssql"),
+        {"operation": "append", "chunk_size": 100_000, "target_batch_seconds": 1.0},
+        False,
+        None,
+    ),
+    ("transfer/refresh", "transfer", ("sqlite", "postgresql", "mssql"), {"operation": "refresh"}, True, None),
+    (
+        "transfer/refresh_swap",
+        "transfer",
+        ("postgresql", "mssql"),
+        {"operation": "refresh", "refresh_mode": "swap"},
+        True,
+        None,
+    ),
+    # Frames read back from PostgreSQL carry the folded column names
+    (
+        "transfer/merge",
+        "transfer",
+        ("postgresql", "mssql"),
+        {"operation": "merge", "load_method": "copy", "conflict_columns": ["itemid"]},
+        True,
+        None,
+    ),
+    (
+        "transfer/merge_chunked",
+        "transfer",
+        ("postgresql", "mssql"),
+        {"operation": "merge", "load_method": "copy", "conflict_columns": ["itemid"], "chunk_size": 100_000},
+        True,
+        None,
+    ),
+]
+
+
+def _table(name):
+    # Unquoted like the SQL keepdataflow generates, so PostgreSQL folds the names the same way
+    return sa.Table(
+        name,
+        sa.MetaData(),
+        sa.Column("ItemID", sa.BigInteger, primary_key=True, autoincrement=False, quote=False),
+        sa.Column("ItemName", sa.String(100), quote=False),
+        sa.Column("Description", sa.String(200), quote=False),
+        sa.Column("Category", sa.String(50), quote=False),
+        sa.Column("Quantity", sa.BigInteger, quote=False),
+        sa.Column("Location", sa.String(50), quote=False),
+    )
+
+
+def _create_table(engine, name):
+    table = _table(name)
+    table.drop(engine, checkfirst=True)
+    table.create(engine)
+
+
+def _bulk_load(engine, data_frame, table_name):
+    """Load the rows a case starts from with the fastest method the database has."""
+    method = "copy" if engine.dialect.name == "postgresql" else "values"
+    df_insert(data_frame, table_name, engine, method=method)
+
+
+def _row_count(engine, table_name):
+    with engine.connect() as conn:
+        return conn.execute(sa.select(sa.func.count()).select_from(_table(table_name))).scalar_one()
+
+
+def _peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def case_key(database, name, rows):
+    """Identify a benchmark result, e.g. ``postgresql/df_insert/copy/1000000``."""
+    return f"{database}/{name}/{rows}"
+
+
+def _case_urls(database, url, work_dir):
+    """Return the destination and source URLs of a case."""
+    if database == "sqlite":
+        # Separate files, so a streaming read of the source never holds a lock on the destination
+        return (
+            f"sqlite:///{os.path.join(work_dir, 'target.db')}",
+            f"sqlite:///{os.path.join(work_dir, 'source.db')}",
+        )
+    return url, url
+
+
+def _drop_tables(url, source_url):
+    for table_url, table_name in ((url, TARGET_TABLE), (source_url, SOURCE_TABLE)):
+        engine = sa.create_engine(table_url)
+        _table(table_name).drop(engine, checkfirst=True)
+        engine.dispose()
+
+
+def setup_case(name, database, url, rows, work_dir, seed=42):
+    """
+    Generate the synthetic rows of a benchmark case and create the tables it starts from.
+
+    Meant to run in its own process before `run_case`, so that generating the rows and bulk
+    loading them do not count towards the peak RSS of the case. The rows the operation loads
+    are written to a Parquet file in `work_dir` for `run_case` to read; transfers read them
+    from the source table instead.
+
+    Parameters
+    ----------
+    name : str
+        The name of a case in `CASES`, e.g. ``"df_insert/copy"``.
+    database : str
+        The dialect of `url`.
+    url : str
+        The destination database URL. For SQLite a new file in `work_dir` is used instead.
+    rows : int
+        The number of rows of the synthetic table.
+    work_dir : str
+        A directory for the Parquet file and SQLite databases.
+    seed : int
+        Seed of the synthetic data.
+
+    Returns
+    -------
+    int
+        The number of rows the destination table must have after the case ran.
+    """
+    _, operation, _, _, prepopulate, _ = next(case for case in CASES if case[0] == name)
+    url, source_url = _case_urls(database, url, work_dir)
+
+    base = generate_random_data(rows, seed=seed)
+    # Merge workloads load the next version of rows that are already in the table
+    data_frame = changed_data(base, seed=seed + 1) if prepopulate else base
+
+    try:
+        engine = sa.create_engine(url)
+        _create_table(engine, TARGET_TABLE)
+        if prepopulate:
+            _bulk_load(engine, base, TARGET_TABLE)
+        engine.dispose()
+
+        if operation == "transfer":
+            source_engine = sa.create_engine(source_url)
+            _create_table(source_engine, SOURCE_TABLE)
+            _bulk_load(source_engine, data_frame, SOURCE_TABLE)
+            source_engine.dispose()
+        else:
+            data_frame.write_parquet(os.path.join(work_dir, "rows.parquet"))
+    except Exception:
+        _drop_tables(url, source_url)
+        raise
+    return data_frame.height
+
+
+def run_case(name, database, url, rows, work_dir, expected_rows):
+    """
+    Time one benchmark case prepared by `setup_case`, returning its result as a dict.
+
+    Meant to run in a fresh process, so that the reported peak RSS is that of the operation
+    alone, with the rows it loads in memory. Only the operation itself is timed. Afterwards
+    the destination table's row count is checked and the tables are dropped.
+
+    Parameters
+    ----------
+    name, database, url, rows, work_dir
+        As passed to `setup_case`.
+    expected_rows : int
+        The row count returned by `setup_case`.
+    """
+    _, operation, _, kwargs, _, _ = next(case for case in CASES if case[0] == name)
+    url, source_url = _case_urls(database, url, work_dir)
+    engine = sa.create_engine(url)
+    source_engine = engine if source_url == url else sa.create_engine(source_url)
+
+    try:
+        if operation == "transfer":
+            schema = None if database == "sqlite" else sa.inspect(engine).default_schema_name
+            transfer = DatabaseDataTransfer(source_engine, engine)
+            started = time.perf_counter()
+            transfer.transfer(SOURCE_TABLE, TARGET_TABLE, schema, schema, **kwargs)
+        else:
+            load = {"df_insert": df_insert, "df_insert_on_conflict": df_insert_on_conflict, "df_merge": df_merge}[
+                operation
+            ]
+            if operation == "df_insert_on_conflict":
+                kwargs = {"conflict_columns": ["ItemID"], **kwargs}
+            data_frame = pl.read_parquet(os.path.join(work_dir, "rows.parquet"))
+            started = time.perf_counter()
+            load(data_frame, TARGET_TABLE, engine, **kwargs)
+        seconds = time.perf_counter() - started
+
+        destination_rows = _row_count(engine, TARGET_TABLE)
+        if destination_rows != expected_rows:
+            raise AssertionError(f"{TARGET_TABLE} has {destination_rows} rows, expected {expected_rows}")
+    finally:
+        source_engine.dispose()
+        engine.dispose()
+        _drop_tables(url, source_url)
+
+    return {
+        "seconds": seconds,
+        "rows_per_second": expected_rows / seconds if seconds else None,
+        "peak_rss_bytes": _peak_rss_bytes(),
+    }
+
+
+def database_of(url):
+    """Return the dialect name of a database URL."""
+    return sa.engine.make_url(url).get_backend_name()
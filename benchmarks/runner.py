@@ -0,0 +1,244 @@
+import argparse
+import datetime
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import polars as pl
+import sqlalchemy as sa
+
+from benchmarks.cases import (
+    CASES,
+    case_key,
+    run_case,
+    setup_case,
+)
+
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+
+DEFAULT_TOLERANCE = 0.1
+
+
+def parse_size(text):
+    """
+    Parse a table size such as ``10k``, ``1m`` or ``2500`` into a row count.
+
+    Examples
+    --------
+    >>> parse_size("10k"), parse_size("10M"), parse_size("2500")
+    (10000, 10000000, 2500)
+    """
+    text = text.strip().lower()
+    if text in SIZES:
+        return SIZES[text]
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def _environment(databases, seed):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__)
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "polars": pl.__version__,
+        "sqlalchemy": sa.__version__,
+        "databases": sorted(databases),
+        "seed": seed,
+    }
+
+
+def _in_fresh_process(function, *args):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(function, *args).result()
+
+
+def _run_isolated(name, database, url, rows, seed):
+    """
+    Set up one case and run it, each in a fresh process.
+
+    The peak RSS of the run is then neither inflated by earlier cases nor by generating and
+    bulk loading the case's own rows.
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        expected_rows = _in_fresh_process(setup_case, name, database, url, rows, work_dir, seed)
+        return _in_fresh_process(run_case, name, database, url, rows, work_dir, expected_rows)
+
+
+def run_benchmarks(databases, sizes, repeat=3, patterns=None, seed=42, log=print):
+    """
+    Run every benchmark case that applies to `databases` at every size in `sizes`.
+
+    Each case runs `repeat` times, every time in a new process on freshly generated tables.
+    The fastest run is reported, since slower runs measure interference from the rest of the
+    machine rather than the code, together with the highest peak RSS of all runs.
+
+    Parameters
+    ----------
+    databases : dict
+        Dialect name to database URL, e.g. ``{"sqlite": None, "postgresql": "postgresql://..."}``.
+        SQLite cases run on files in a temporary directory and need no URL.
+    sizes : list of int
+        The row counts of the synthetic tables.
+    repeat : int
+        How often each case runs.
+    patterns : list of str, optional
+        Only run cases whose key (``database/operation/strategy/rows``) matches one of these globs.
+    seed : int
+        Seed of the synthetic data.
+    log : callable
+        Called with a line of progress per case.
+
+    Returns
+    -------
+    dict
+        ``{"environment": {...}, "results": {key: {...}}}``, ready to be saved as JSON.
+    """
+    results = {}
+    for rows in sizes:
+        for database, url in databases.items():
+            for name, operation, dialects, _, _, max_rows in CASES:
+                key = case_key(database, name, rows)
+                if database not in dialects or (patterns and not any(fnmatch.fnmatch(key, p) for p in patterns)):
+                    continue
+                result = {"database": database, "case": name, "operation": operation, "rows": rows}
+                if max_rows is not None and rows > max_rows:
+                    results[key] = {**result, "status": "skipped", "reason": f"only run up to {max_rows} rows"}
+                    log(f"{key}: skipped")
+                    continue
+
+                runs = []
+                try:
+                    for _ in range(repeat):
+                        runs.append(_run_isolated(name, database, url, rows, seed))
+                except Exception as e:
+                    results[key] = {**result, "status": "failed", "error": f"{type(e).__name__}: {e}"}
+                    log(f"{key}: failed: {e}")
+                    continue
+
+                best = min(runs, key=lambda run: run["seconds"])
+                peaks = [run["peak_rss_bytes"] for run in runs if run["peak_rss_bytes"] is not None]
+                results[key] = {
+                    **result,
+                    "status": "ok",
+                    "seconds": best["seconds"],
+                    "rows_per_second": best["rows_per_second"],
+                    "peak_rss_bytes": max(peaks) if peaks else None,
+                    "runs": [run["seconds"] for run in runs],
+                }
+                log(f"{key}: {best['rows_per_second']:,.0f} rows/s, {best['seconds']:.3f}s")
+
+    return {"environment": _environment(databases, seed), "results": results}
+
+
+def compare_results(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare two benchmark runs and return the regressions of `current` against `baseline`.
+
+    A case regresses when its throughput drops, or its peak RSS grows, by more than
+    `tolerance` (a fraction), or when it succeeded in the baseline and fails now. Cases that
+    only one of the runs has are ignored.
+
+    Examples
+    --------
+    >>> baseline = {"results": {"sqlite/df_insert/values/10000": {"status": "ok", "rows_per_second": 100000.0, "peak_rss_bytes": 100}}}
+    >>> current = {"results": {"sqlite/df_insert/values/10000": {"status": "ok", "rows_per_second": 80000.0, "peak_rss_bytes": 105}}}
+    >>> [(r["key"], r["metric"], round(r["change"], 2)) for r in compare_results(current, baseline)]
+    [('sqlite/df_insert/values/10000', 'rows_per_second', -0.2)]
+    """
+    regressions = []
+    for key, result in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if before is None or before.get("status") != "ok":
+            continue
+        if result.get("status") != "ok":
+            if result.get("status") == "failed":
+                regressions.append(
+                    {"key": key, "metric": "status", "baseline": "ok", "current": "failed", "change": None}
+                )
+            continue
+
+        for metric, worse in (("rows_per_second", -1), ("peak_rss_bytes", 1)):
+            old, new = before.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change * worse > tolerance:
+                regressions.append({"key": key, "metric": metric, "baseline": old, "current": new, "change": change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time keepdataflow's load operations on synthetic tables and compare against a baseline.",
+    )
+    parser.add_argument("--sizes", default="10k,1m,10m", help="Comma separated table sizes (default: 10k,1m,10m)")
+    parser.add_argument(
+        "--postgresql-url",
+        default=os.environ.get("KEEPDATAFLOW_BENCH_POSTGRESQL_URL"),
+        help="A local PostgreSQL database to run on (default: $KEEPDATAFLOW_BENCH_POSTGRESQL_URL)",
+    )
+    parser.add_argument(
+        "--mssql-url",
+        default=os.environ.get("KEEPDATAFLOW_BENCH_MSSQL_URL"),
+        help="A SQL Server database to run on, for the df_merge cases (default: $KEEPDATAFLOW_BENCH_MSSQL_URL)",
+    )
+    parser.add_argument("--no-sqlite", action="store_true", help="Skip the SQLite cases")
+    parser.add_argument("--cases", help="Comma separated globs of case keys to run, e.g. 'postgresql/df_insert/*'")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; the fastest is reported (default: 3)")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic data (default: 42)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="The relative slowdown or memory growth reported as a regression (default: 0.1)",
+    )
+    args = parser.parse_args(argv)
+
+    databases = {} if args.no_sqlite else {"sqlite": None}
+    if args.postgresql_url:
+        databases["postgresql"] = args.postgresql_url
+    if args.mssql_url:
+        databases["mssql"] = args.mssql_url
+
+    report = run_benchmarks(
+        databases,
+        [parse_size(size) for size in args.sizes.split(",")],
+        repeat=args.repeat,
+        patterns=args.cases.split(",") if args.cases else None,
+        seed=args.seed,
+    )
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare_results(report, baseline, args.tolerance)
+    for regression in regressions:
+        if regression["change"] is None:
+            print(f"REGRESSION {regression['key']}: failed, passed in the baseline")
+        else:
+            print(
+                f"REGRESSION {regression['key']}: {regression['metric']} {regression['baseline']:,.0f} -> "
+                f"{regression['current']:,.0f} ({regression['change']:+.1%})"
+            )
+    print(f"{len(regressions)} regressions against {args.baseline}")
+    return 1 if regressions else 0
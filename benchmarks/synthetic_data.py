@@ -0,0 +1,100 @@
+import numpy as np
+import polars as pl
+
+# The vocabulary of the inventory rows used by the merge tests
+ITEM_NAMES = ["Laptop", "Desk Chair", "USB-C Cable", "Monitor"]
+DESCRIPTIONS = [
+    "15-inch laptop with 8GB RAM",
+    "Ergonomic office chair",
+    "1m USB-C charging cable",
+    "24-inch LED monitors",
+]
+CATEGORIES = ["Electronics", "Furniture", "Electronics", "Electronics"]
+WAREHOUSE_NAMES = ["Warehouse A", "Warehouse B", "Warehouse C", "Warehouse D", "Warehouse K"]
+
+
+def _pick(values, indices):
+    return pl.Series(values, dtype=pl.Utf8).gather(indices)
+
+
+def generate_random_data(n, seed=42, start_id=1):
+    """
+    Generate `n` rows of the inventory table used by the merge tests as a Polars DataFrame.
+
+    This is the merge tests' ``generate_random_data`` made usable at benchmark sizes: the text
+    columns are built by indexing into the vocabulary instead of materialising NumPy string
+    arrays, so 10 million rows fit comfortably in memory. With the default `seed` and
+    `start_id` it produces exactly the same rows as the test generator for the same `n`.
+
+    Parameters
+    ----------
+    n : int
+        The number of rows.
+    seed : int
+        Seed of the random generator. The same seed always gives the same rows.
+    start_id : int
+        The smallest ItemID; ItemIDs are a shuffled range of `n` consecutive integers from here.
+
+    Examples
+    --------
+    >>> df = generate_random_data(1000)
+    >>> df.shape
+    (1000, 6)
+    >>> df["ItemID"].sort().to_list() == list(range(1, 1001))
+    True
+    >>> df.equals(generate_random_data(1000))
+    True
+    """
+    # The legacy generator and draw order match np.random.seed / np.random.choice in the merge tests
+    random = np.random.RandomState(seed)
+    item_ids = random.permutation(np.arange(start_id, start_id + n))
+    item_names = random.randint(0, len(ITEM_NAMES), n)
+    descriptions = random.randint(0, len(DESCRIPTIONS), n)
+    categories = random.randint(0, len(CATEGORIES), n)
+    quantities = random.randint(1, 100, n)
+    locations = random.randint(0, len(WAREHOUSE_NAMES), n)
+
+    return pl.DataFrame(
+        {
+            "ItemID": pl.Series(item_ids, dtype=pl.Int64),
+            "ItemName": _pick(ITEM_NAMES, item_names),
+            "Description": _pick(DESCRIPTIONS, descriptions),
+            "Category": _pick(CATEGORIES, categories),
+            "Quantity": pl.Series(quantities, dtype=pl.Int64),
+            "Location": _pick(WAREHOUSE_NAMES, locations),
+        }
+    )
+
+
+def changed_data(data_frame, changed_fraction=0.1, new_fraction=0.1, seed=43):
+    """
+    Return the next version of `data_frame` for merge and upsert benchmarks.
+
+    A `changed_fraction` of the rows get a new Quantity and Location, and `new_fraction` times
+    as many new rows are added with ItemIDs above the existing ones. The other rows are
+    returned unchanged, as a source system would between two loads.
+
+    Examples
+    --------
+    >>> base = generate_random_data(1000)
+    >>> changed = changed_data(base)
+    >>> changed.height
+    1100
+    >>> changed.join(base, on="ItemID", how="inner").filter(pl.col("Quantity") != pl.col("Quantity_right")).height
+    100
+    """
+    random = np.random.RandomState(seed)
+    changed_count = int(data_frame.height * changed_fraction)
+    item_ids = data_frame["ItemID"].to_numpy()
+    changed = pl.Series(np.isin(item_ids, random.choice(item_ids, changed_count, replace=False)))
+    changed_rows = data_frame.filter(changed)
+    changed_rows = changed_rows.with_columns(
+        # Quantities of generated rows are below 100, so every changed row really changes
+        (pl.col("Quantity") + 100).alias("Quantity"),
+        _pick(WAREHOUSE_NAMES, random.randint(0, len(WAREHOUSE_NAMES), changed_rows.height)).alias("Location"),
+    )
+
+    new_rows = generate_random_data(
+        int(data_frame.height * new_fraction), seed=seed, start_id=int(data_frame["ItemID"].max() or 0) + 1
+    )
+    return pl.concat([data_frame.filter(~changed), changed_rows, new_rows])
@@ -1,13 +1,19 @@
 from __future__ import annotations
 
-# from keepdataflow.sql_conn import SqlConn
+from loguru import logger
 
+# from keepdataflow.sql_conn import SqlConn
 from keepdataflow.data_transfer import DatabaseDataTransfer
-
-from keepdataflow.database_operations.df_merge import df_merge
-from keepdataflow.database_operations.df_insert_on_conflict import df_insert_on_conflict
 from keepdataflow.database_operations.df_insert import df_insert
+from keepdataflow.database_operations.df_insert_on_conflict import df_insert_on_conflict
+from keepdataflow.database_operations.df_merge import df_merge
+from keepdataflow.database_operations.run_sql_commands import (
+    run_sql_query,
+    run_stored_procedure,
+)
 from keepdataflow.transfer_utils import run_transfers
-from keepdataflow.database_operations.run_sql_commands import run_stored_procedure, run_sql_query
+
+# Libraries stay quiet until the application opts in with logger.enable("keepdataflow")
+logger.disable("keepdataflow")
 
 # __version__ = '0.1.0'
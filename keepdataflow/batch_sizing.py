@@ -0,0 +1,109 @@
+class AdaptiveBatchSizer:
+    """
+    Choose load batch sizes from the measured throughput of the batches already loaded.
+
+    No fixed batch size suits every table: a narrow table on a local server can take hundreds of
+    thousands of rows per batch, while a wide table on a remote server needs a few thousand to
+    keep each round trip short. After every batch the sizer updates a smoothed load time per row
+    and moves the batch size towards the number of rows that takes `target_seconds` to load. It
+    changes by at most `max_growth` times per batch and always stays within `min_rows`,
+    `max_rows`, the `max_bytes` memory budget and the `max_parameters` bind parameter limit.
+
+    Parameters
+    ----------
+    target_seconds : float
+        The load time to aim for per batch. Default is 2 seconds.
+    initial_rows : int
+        The size of the first batch. Default is 5000.
+    min_rows, max_rows : int
+        Bounds of the batch size.
+    max_bytes : int, optional
+        The most memory a batch may take, estimated from the frame being loaded. Default is 256 MiB.
+    max_parameters : int, optional
+        The most bind parameters (rows times columns) a batch may need, for drivers that send a
+        batch as one statement.
+    max_growth : float
+        The largest factor by which the size grows or shrinks after one batch. Default is 2.
+    smoothing : float
+        The weight of the newest measurement in the time per row average. Default is 0.5.
+
+    Examples
+    --------
+    >>> sizer = AdaptiveBatchSizer(target_seconds=1.0, initial_rows=1000)
+    >>> sizer.record(1000, 0.1)  # 10,000 rows/s: grow, by at most 2x
+    >>> sizer.batch_rows
+    2000
+    >>> sizer.record(2000, 4.0)  # much slower: shrink
+    >>> sizer.batch_rows
+    1000
+    """
+
+    def __init__(
+        self,
+        target_seconds=2.0,
+        initial_rows=5000,
+        min_rows=100,
+        max_rows=1_000_000,
+        max_bytes=256 * 2**20,
+        max_parameters=None,
+        max_growth=2.0,
+        smoothing=0.5,
+    ):
+        if target_seconds <= 0:
+            raise ValueError("target_seconds must be positive")
+        self.target_seconds = target_seconds
+        self.min_rows = min_rows
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_parameters = max_parameters
+        self.max_growth = max_growth
+        self.smoothing = smoothing
+
+        self.batch_rows = max(min_rows, min(initial_rows, max_rows))
+        self.seconds_per_row = None
+        self.batches = 0
+        self.rows = 0
+        self.seconds = 0.0
+
+    def size_for(self, data_frame):
+        """Return how many rows of `data_frame` to load in the next batch."""
+        limit = self.max_rows
+        if self.max_bytes and data_frame.height:
+            bytes_per_row = max(data_frame.estimated_size() / data_frame.height, 1)
+            limit = min(limit, int(self.max_bytes // bytes_per_row))
+        if self.max_parameters and data_frame.width:
+            limit = min(limit, self.max_parameters // data_frame.width)
+        # The hard limits win over min_rows
+        return max(1, min(self.batch_rows, limit))
+
+    def record(self, rows, seconds):
+        """Record that a batch of `rows` rows took `seconds` to load and adjust the batch size."""
+        if rows <= 0:
+            return
+        self.batches += 1
+        self.rows += rows
+        self.seconds += seconds
+
+        # Averaging the time per row rather than the rate lets a slowdown pull the size down quickly
+        seconds_per_row = max(seconds, 1e-6) / rows
+        if self.seconds_per_row is None:
+            self.seconds_per_row = seconds_per_row
+        else:
+            self.seconds_per_row = self.smoothing * seconds_per_row + (1 - self.smoothing) * self.seconds_per_row
+
+        # Fixed per-batch costs make small remainders look slow, so only full-sized batches steer
+        if rows * 2 < self.batch_rows:
+            return
+        desired = self.target_seconds / self.seconds_per_row
+        desired = min(max(desired, self.batch_rows / self.max_growth), self.batch_rows * self.max_growth)
+        self.batch_rows = int(max(self.min_rows, min(desired, self.max_rows)))
+
+    @property
+    def rows_per_second(self):
+        """The smoothed load throughput, or None before the first batch."""
+        return None if self.seconds_per_row is None else 1 / self.seconds_per_row
+
+    def summary(self):
+        """Describe the settled batch size and the measured throughput."""
+        rate = self.rows / self.seconds if self.seconds else 0.0
+        return f"settled on {self.batch_rows} rows per batch after {self.batches} batches ({rate:,.0f} rows/s)"
@@ -1,7 +1,44 @@
+import contextlib
+import functools
+import time
+
 import polars as pl
-from keepdataflow.database_operations.df_merge import df_merge
+import sqlalchemy as sa
+from loguru import logger
+from keepdataflow.batch_sizing import AdaptiveBatchSizer
+from keepdataflow.database_operations.df_merge import (
+    delete_missing_rows,
+    df_merge,
+    resolve_match_columns,
+)
 from keepdataflow.database_operations.df_insert_on_conflict import df_insert_on_conflict
 from keepdataflow.database_operations.df_insert import df_insert
+from keepdataflow.database_operations.index_suspension import suspended_indexes
+from keepdataflow.database_operations.partition_swap import (
+    drop_partition_stage,
+    find_partition,
+    prepare_partition_stage,
+    switch_partition,
+)
+from keepdataflow.database_operations.table_swap import (
+    create_shadow_table,
+    drop_shadow_table,
+    swap_shadow_table,
+)
+from keepdataflow.metrics import (
+    count,
+    metrics_table,
+    timed,
+)
+from keepdataflow.pipeline import (
+    interleave,
+    prefetch,
+)
+from keepdataflow.source_query import (
+    build_source_query,
+    partition_predicates,
+    split_range,
+)
 from abc import ABC, abstractmethod
 from sqlalchemy.engine.url import make_url
 
@@ -10,6 +47,38 @@ from sqlalchemy.engine.url import make_url
 # from database_factory
 
 
+def _chunk_batches(chunk_id, batches):
+    """Tag every batch with `chunk_id` and mark the end of the chunk with a ``(chunk_id, None)`` pair."""
+    for batch in batches:
+        yield chunk_id, batch
+    yield chunk_id, None
+
+
+def _sized_batches(batches, batch_sizer):
+    """
+    Regroup ``(chunk_id, DataFrame)`` batches into batches of the size `batch_sizer` asks for.
+
+    Fetched rows are held per chunk until there are enough for the next batch, and whatever is
+    left of a chunk is passed on when its end marker arrives. The size is looked up again for
+    every batch, so the measured load time of one batch steers the size of the next.
+    """
+    pending = {}
+    for chunk_id, data_frame in batches:
+        frames = pending.setdefault(chunk_id, [])
+        if data_frame is not None and data_frame.height:
+            frames.append(data_frame)
+        while frames:
+            size = batch_sizer.size_for(frames[-1])
+            if data_frame is not None and sum(frame.height for frame in frames) < size:
+                break
+            buffered = pl.concat(frames, how="vertical_relaxed") if len(frames) > 1 else frames[0]
+            yield chunk_id, buffered.slice(0, size)
+            frames[:] = [buffered.slice(size)] if buffered.height > size else []
+        if data_frame is None:
+            del pending[chunk_id]
+            yield chunk_id, None
+
+
 class DataTransfer(ABC):
     @abstractmethod
     def transfer(self, source_table, destination_table, source_schema, destination_schema, operation="merge", **kwargs):
@@ -66,12 +135,91 @@ class DatabaseDataTransfer(DataTransfer):
                 - include_match_condition_in_insert (bool): Whether to include match columns in the INSERT statement. Default is True.
                 - skip_inserts (bool): Whether to skip inserting unmatched rows. Default is False.
                 - skip_updates (bool): Whether to skip updating matched rows. Default is False.
+                - hash_column (str): A BIGINT column of the destination that stores a hash of each row's
+                  non-key columns. Only new or changed rows are staged and merged.
+                - merge_batch_size (int): Merge in chunks of this many rows, each committed on its own,
+                  and delete rows missing from the source in one pass afterwards.
 
             - For `df_insert_on_conflict` (PostgreSQL INSERT ON CONFLICT):
                 - conflict_columns (list of str): The columns to use in the ON CONFLICT clause for resolving conflicts (typically primary keys).
+                - load_method (str): "executemany" (default), "copy", which COPYs the rows into a temporary
+                  staging table and upserts them with one INSERT ... SELECT ... ON CONFLICT statement,
+                  or "adbc", which stages the rows' Arrow data through an ADBC driver.
+
+            - For both merge operations:
+                - skip_unchanged (bool): Only update matched rows whose values actually differ, compared
+                  NULL-safely on the server. Default is False.
 
             - For `df_insert` (Basic INSERT for both databases):
-                - No additional kwargs required for basic INSERT.
+                - load_method (str): "executemany", "copy", "adbc" (Arrow ingestion through an ADBC
+                  driver) or "values" (multi-row INSERT ... VALUES batches). Defaults to "copy" (COPY FROM STDIN) for PostgreSQL destinations and
+                  "executemany" otherwise.
+
+            - For all operations:
+                - columns (list of str): Only read these columns from the source table. Default is all columns.
+                - where (str or list of str): Filter predicate(s) applied by the source database when reading.
+                - chunk_size (int): Stream the source table in batches of this many rows instead of
+                  reading it into memory at once. Each batch is loaded as soon as it is fetched. A
+                  `refresh` clears the destination before the first batch only, or at the end when the
+                  source has no rows. A SQL Server `merge` merges each batch without deletes and, unless
+                  skipDeletes=True, deletes the rows whose keys were in no batch in one pass after the
+                  last batch.
+                - incremental_column (str): A monotonically increasing column (e.g. a modified timestamp or
+                  rowversion). Only rows where it is greater than the high-water mark saved by the last
+                  successful load are read, and the new mark is saved once all rows are loaded. Not
+                  supported with `refresh`, nor with a SQL Server `merge` unless skipDeletes=True, since
+                  rows missing from an incremental read were not deleted from the source.
+                - state_store (StateStore): Where high-water marks and checkpoints are kept. Required with
+                  incremental_column. When given, the transfer records a checkpoint as it goes: the partition
+                  bounds, the rows committed by every batch of each partition slice (or of the whole read
+                  without partition_column), which slices are complete, and whether the whole transfer finished.
+                - run_id (str): The run, from `StateStore.start_run`, this transfer belongs to. It is
+                  recorded with the checkpoint, and a resumed transfer ignores checkpoints of other runs.
+                - resume (bool): Continue from the checkpoint of an interrupted run in state_store. A finished
+                  transfer is skipped, and completed slices are not read again. A slice that failed part way
+                  is read again in full, which merges apply idempotently. A `refresh` whose failed slice had
+                  committed batches restarts from an empty table instead, and such an `append` raises a
+                  ValueError rather than load those rows twice. The range recorded by the interrupted run is
+                  reused, so rows outside it are left for the next run. Transfers into a shadow or partition
+                  stage table, and SQL Server merges that delete missing keys, are restarted from the
+                  beginning. Default is False.
+                - partition_column (str): A numeric, date or datetime column used to split the source read.
+                  Its MIN and MAX are looked up on the source and the range is read as partition_count
+                  slices on concurrent connections. Each slice is loaded as soon as it arrives.
+                - partition_count (int): The number of slices to read concurrently. Default is 4.
+                - pipeline_depth (int): Read batches on a background thread, keeping up to this many fetched
+                  batches queued while the current one is loaded, so extraction and loading overlap. Use
+                  with chunk_size; each queued batch is held in memory.
+                - target_batch_seconds (float): Load in batches sized by an AdaptiveBatchSizer, which measures
+                  the load time of each batch and steers towards this many seconds per batch. The source is
+                  streamed, in chunk_size rows or the sizer's initial size, and the fetched rows are regrouped
+                  into batches of the size the sizer asks for, larger or smaller than chunk_size. The size it
+                  settles on is logged at the end. A SQL Server merge then deletes missing keys in one pass
+                  at the end, as with chunk_size.
+                - max_batch_bytes (int): The memory budget of one adaptive batch. Default is 256 MiB.
+
+            - For `refresh`:
+                - refresh_mode (str): "delete" (default) empties the destination table and reloads it in
+                  place. "swap" loads a shadow copy of the destination table, builds its keys and
+                  indexes, and swaps it in with a short rename transaction, so readers keep seeing the
+                  old rows until the new ones are complete. SQL Server and PostgreSQL only; see
+                  `swap_shadow_table` for what the swap does not carry over.
+                  "partition" reloads only the partition of a partitioned destination table that holds
+                  partition_value: the rows are loaded into a standalone table with the partition's bounds
+                  as a CHECK constraint and exchanged in with ALTER TABLE ... SWITCH on SQL Server or
+                  DETACH/ATTACH PARTITION on PostgreSQL. Only the source rows inside the partition's bounds
+                  are read; the partitioning column must have the same name in the source table.
+                - partition_value: A value of the destination's partitioning column inside the partition
+                  to reload, e.g. any date in the month. Required with refresh_mode="partition".
+
+            - For `append` and `refresh`:
+                - suspend_indexes (bool): Disable (SQL Server) or drop (PostgreSQL) the destination's secondary
+                  indexes and foreign key checks during the load and rebuild them once afterwards; see
+                  `suspended_indexes`. Default is False.
+
+        Rows, bytes and batches loaded, resumed runs, and the durations of the extract, stage, merge
+        and commit phases are recorded in `keepdataflow.metrics.get_metrics()`, labelled with the
+        destination table. Each batch is also logged as a DEBUG event with its row count and size.
 
         Raises:
         -------
@@ -108,19 +256,388 @@ class DatabaseDataTransfer(DataTransfer):
             source_schema="dbo",
             destination_schema="dbo"
         )
+
+        # Streaming append example, 100k rows per batch
+        data_transfer.transfer(
+            source_table="fact_sales",
+            destination_table="fact_sales",
+            source_schema="dbo",
+            destination_schema="dbo",
+            operation="append",
+            chunk_size=100_000,
+        )
         """
+        # Every metric recorded during the transfer is labelled with the destination table, also while
+        # the rows are loaded into a shadow or partition stage table
+        with metrics_table(f"{destination_schema}.{destination_table}" if destination_schema else destination_table):
+            return self._transfer(
+                source_table, destination_table, source_schema, destination_schema, operation, **kwargs
+            )
+
+    def _transfer(
+        self, source_table, destination_table, source_schema, destination_schema, operation="merge", **kwargs
+    ):
         # Build the source table specification with schema
         if source_schema:
             source_table_spec = f"{source_schema}.{source_table}"
         else:
             source_table_spec = f"{source_table}"
 
-        # Read data from the source table
+        where = kwargs.get("where")
+        if isinstance(where, str):
+            where = [where]
+        where = list(where or [])
+        parameters = {}
+
+        partition = None
+        if operation == 'refresh' and kwargs.get("refresh_mode") == "partition":
+            if "partition_value" not in kwargs:
+                raise ValueError("refresh_mode='partition' requires a partition_value")
+            # Read only the source rows that belong in the partition being reloaded
+            partition = find_partition(
+                self.destination_engine, destination_table, kwargs["partition_value"], destination_schema
+            )
+            predicate, partition_parameters = partition["source_filter"]
+            if predicate:
+                where.append(predicate)
+                parameters.update(partition_parameters)
+
+        incremental_column = kwargs.get("incremental_column")
+        state_store = kwargs.get("state_store")
+        transfer_key = None
+        if state_store is not None:
+            transfer_key = self.transfer_key(source_table, destination_table, source_schema, destination_schema)
+        run_id = kwargs.get("run_id")
+        if incremental_column:
+            if state_store is None:
+                raise ValueError("incremental_column requires a state_store")
+            if operation == 'refresh':
+                raise ValueError("incremental_column cannot be combined with the refresh operation")
+            if operation == 'merge' and self.db_type == 'mssql' and not kwargs.get("skipDeletes", False):
+                # The MERGE would delete every destination row that did not change since the last mark
+                raise ValueError("incremental_column requires skipDeletes=True for SQL Server merges")
+            columns = kwargs.get("columns")
+            if columns and incremental_column not in columns:
+                raise ValueError(f"incremental_column {incremental_column} must be one of the selected columns")
+
+            last_mark = state_store.get_watermark(transfer_key)
+            if last_mark is not None:
+                # Only extract rows added or changed since the last successful load
+                where.append(f"{incremental_column} > :last_mark")
+                parameters["last_mark"] = last_mark
+
+        chunk_size = kwargs.get("chunk_size")
+        partition_column = kwargs.get("partition_column")
+
+        batch_sizer = None
+        if kwargs.get("target_batch_seconds"):
+            batch_sizer = AdaptiveBatchSizer(
+                target_seconds=kwargs["target_batch_seconds"],
+                **({"max_bytes": kwargs["max_batch_bytes"]} if kwargs.get("max_batch_bytes") else {}),
+            )
+            # Stream the source, so the sizer rather than the size of the table decides what is loaded at once
+            chunk_size = chunk_size or batch_sizer.batch_rows
+
+        # Shadow and partition stage tables are dropped when a load fails, and a SQL Server merge deletes by
+        # the keys of every chunk, so those transfers can only be resumed as a whole
+        resumable_chunks = not (
+            operation == 'refresh' and kwargs.get("refresh_mode", "delete") in ("swap", "partition")
+        ) and not (operation == 'merge' and self.db_type == 'mssql' and not kwargs.get("skipDeletes", False))
+
+        checkpoint = None
+        if state_store is not None and kwargs.get("resume", False):
+            checkpoint = state_store.get_checkpoint(transfer_key)
+            if checkpoint is not None and run_id is not None and checkpoint["run_id"] != run_id:
+                # Only the progress of the interrupted run itself can be trusted
+                checkpoint = None
+            if checkpoint is not None and checkpoint["completed"]:
+                logger.info("Skipping {table}: already transferred by the interrupted run", table=source_table_spec)
+                return
+            if not resumable_chunks:
+                checkpoint = None
+            partial_rows = sum(rows for rows, _ in checkpoint["partial_chunks"].values()) if checkpoint else 0
+            if partial_rows and operation == 'append':
+                # Reading the unfinished slices again would append their committed batches a second time
+                raise ValueError(
+                    f"Cannot resume the append from {source_table_spec}: the interrupted run committed "
+                    f"{partial_rows} rows of slices it did not finish. Remove them and run without resume."
+                )
+            if partial_rows and operation == 'refresh':
+                # Start again from an empty table
+                checkpoint = None
+            if checkpoint is not None:
+                count("retries")
+        completed_chunks = checkpoint["chunks"] if checkpoint is not None else {}
+
+        if partition_column:
+            if checkpoint is not None:
+                # Split the range recorded by the interrupted run, so the chunks line up with its checkpoints
+                lower, upper, partition_count = checkpoint["lower"], checkpoint["upper"], checkpoint["chunk_count"]
+            else:
+                lower, upper = self._partition_bounds(source_table_spec, where, parameters, partition_column)
+                partition_count = kwargs.get("partition_count", 4)
+            batches = self._read_partitioned(
+                source_table_spec,
+                kwargs.get("columns"),
+                where,
+                parameters,
+                partition_column,
+                lower,
+                upper,
+                partition_count,
+                chunk_size,
+                skip_chunks=set(completed_chunks),
+            )
+        else:
+            lower = upper = None
+            partition_count = 1
+            query = build_source_query(source_table_spec, columns=kwargs.get("columns"), where=where)
+            batches = iter(())
+            if 0 not in completed_chunks:
+                batches = _chunk_batches(0, self._read_source(query, chunk_size, parameters))
+
+        if state_store is not None and checkpoint is None:
+            state_store.start_checkpoint(transfer_key, partition_count, lower, upper, run_id=run_id)
+
+        pipeline_depth = kwargs.get("pipeline_depth")
+        if pipeline_depth:
+            # Fetch the next batches on a reader thread while this thread loads the current one
+            batches = prefetch(batches, depth=pipeline_depth)
+        # With a reader thread, only the time spent waiting for it counts as extraction
+        batches = timed(batches, "extract")
+        if batch_sizer is not None:
+            batches = _sized_batches(batches, batch_sizer)
+
+        load_kwargs = kwargs
+        seen_keys = None
+
+        if (
+            (chunk_size or partition_column or batch_sizer)
+            and operation == 'merge'
+            and self.db_type == 'mssql'
+            and not kwargs.get("skipDeletes", False)
+        ):
+            # A MERGE with WHEN NOT MATCHED BY SOURCE over a single batch would delete every row outside it,
+            # so batches are merged without deletes and the keys of all of them are anti-joined at the end
+            load_kwargs = {**kwargs, "skipDeletes": True}
+            match_columns = resolve_match_columns(
+                self.destination_engine,
+                destination_table,
+                kwargs.get("destination_schema", destination_schema),
+                kwargs.get("match_columns"),
+            )
+            seen_keys = []
+
+        load_table, load_schema, load_operation = destination_table, destination_schema, operation
+        refresh_mode = kwargs.get("refresh_mode", "delete") if operation == 'refresh' else None
+        swap = refresh_mode == "swap"
+        partition_stage = None
+        if swap:
+            # Load a shadow table while readers keep using the live one, then swap them at the end
+            load_table = create_shadow_table(self.destination_engine, destination_table, destination_schema)
+            load_operation = 'append'
+        elif refresh_mode == "partition":
+            # Load a standalone table shaped like one partition and exchange it in at the end
+            partition_stage = prepare_partition_stage(
+                self.destination_engine,
+                destination_table,
+                kwargs["partition_value"],
+                destination_schema,
+                partition=partition,
+            )
+            load_table = partition_stage["stage_table"]
+            load_schema = partition_stage.get("schema", destination_schema)
+            load_operation = 'append'
+        elif refresh_mode not in (None, "delete"):
+            raise ValueError(f"Unsupported refresh_mode: {refresh_mode}")
+
+        # Chunks loaded by an interrupted run still count towards the new high-water mark
+        chunk_marks = [mark for _, mark in completed_chunks.values() if mark is not None]
+        high_water_mark = max(chunk_marks) if chunk_marks else None
+        chunk_rows = {}
+        # Only the first batch of a refresh may clear the destination table, and not when resuming one
+        truncate_pending = load_operation == 'refresh' and not completed_chunks
+
+        suspension = contextlib.nullcontext()
+        if kwargs.get("suspend_indexes", False) and load_operation in ('append', 'refresh'):
+            # Build secondary indexes and check constraints once after the load instead of row by row
+            suspension = suspended_indexes(self.destination_engine, load_table, load_schema)
+
+        try:
+            with suspension:
+                # Read data from the source table, one batch at a time when chunk_size or partition_column is set
+                for chunk_id, data_frame in batches:
+                    if data_frame is None:
+                        # Every batch of the chunk is loaded
+                        if state_store is not None:
+                            rows, mark = chunk_rows.pop(chunk_id, (0, None))
+                            state_store.complete_chunk(transfer_key, chunk_id, rows, mark)
+                        continue
+
+                    batch_bytes = data_frame.estimated_size()
+                    logger.debug(
+                        "Loading {rows} rows ({size} bytes) into {table}",
+                        rows=data_frame.height,
+                        size=batch_bytes,
+                        table=load_table,
+                        chunk=chunk_id,
+                    )
+                    started = time.perf_counter()
+                    self._load(
+                        data_frame,
+                        load_table,
+                        load_schema,
+                        load_operation,
+                        truncate_table='Y' if truncate_pending else 'N',
+                        **load_kwargs,
+                    )
+                    if batch_sizer is not None:
+                        batch_sizer.record(data_frame.height, time.perf_counter() - started)
+                    truncate_pending = False
+                    count("rows", data_frame.height)
+                    count("bytes", batch_bytes)
+                    count("batches")
+                    if seen_keys is not None:
+                        seen_keys.append(data_frame.select(match_columns))
+
+                    rows, mark = chunk_rows.get(chunk_id, (0, None))
+                    if incremental_column:
+                        batch_mark = data_frame.get_column(incremental_column).max()
+                        if batch_mark is not None and (mark is None or batch_mark > mark):
+                            mark = batch_mark
+                        if batch_mark is not None and (high_water_mark is None or batch_mark > high_water_mark):
+                            high_water_mark = batch_mark
+                    chunk_rows[chunk_id] = (rows + data_frame.height, mark)
+                    if state_store is not None:
+                        # The batch is committed, so a resumed run must know its rows are in the destination
+                        state_store.record_batch(transfer_key, chunk_id, *chunk_rows[chunk_id])
+
+            if truncate_pending:
+                # An empty streamed source yields no batch at all, but a refresh still leaves the table empty
+                self._clear_table(load_table, load_schema)
+
+            # A swap or switch that fails, e.g. because a key cannot be built on the loaded rows, rolls back
+            # and leaves the shadow or stage table to be dropped below
+            if swap:
+                swap_shadow_table(self.destination_engine, destination_table, load_table, destination_schema)
+            if partition_stage is not None:
+                switch_partition(self.destination_engine, destination_table, partition_stage, destination_schema)
+        except Exception:
+            if swap:
+                drop_shadow_table(self.destination_engine, load_table, destination_schema)
+            if partition_stage is not None:
+                drop_partition_stage(self.destination_engine, partition_stage, destination_schema)
+            raise
+
+        if seen_keys is not None:
+            # Without any batch every destination row is missing from the source
+            delete_missing_rows(
+                pl.concat(seen_keys) if seen_keys else pl.DataFrame(schema=match_columns),
+                destination_table,
+                self.destination_engine,
+                schema=kwargs.get("destination_schema", destination_schema),
+                match_columns=match_columns,
+            )
+
+        # The mark only moves once every batch has been loaded, so a failed run is retried in full
+        if incremental_column and high_water_mark is not None:
+            state_store.set_watermark(transfer_key, incremental_column, high_water_mark)
+
+        if state_store is not None:
+            state_store.finish_checkpoint(transfer_key)
+
+        if batch_sizer is not None:
+            logger.info("Loading {table} {summary}", table=destination_table, summary=batch_sizer.summary())
+
+    def transfer_key(self, source_table, destination_table, source_schema=None, destination_schema=None):
+        """Identify a source/destination table pair in the state store."""
+        source_table_spec = f"{source_schema}.{source_table}" if source_schema else source_table
+        source_url = self.source_engine.url.render_as_string(hide_password=True)
+        destination_url = self.destination_engine.url.render_as_string(hide_password=True)
+        if destination_schema:
+            destination_table = f"{destination_schema}.{destination_table}"
+        return f"{source_url}/{source_table_spec}->{destination_url}/{destination_table}"
+
+    def _partition_bounds(self, source_table_spec, where, parameters, partition_column):
+        """Look up the MIN and MAX of `partition_column` on the source, honouring `where`."""
+        bounds_query = build_source_query(
+            source_table_spec, columns=[f"MIN({partition_column})", f"MAX({partition_column})"], where=where
+        )
         with self.source_engine.connect() as conn:
-            query = f'SELECT * FROM {source_table_spec}'
-            data_frame = pl.read_database(query, conn)
-            print(data_frame)
+            lower, upper = conn.execute(sa.text(bounds_query), parameters).one()
+        return lower, upper
+
+    def _read_partitioned(
+        self,
+        source_table_spec,
+        columns,
+        where,
+        parameters,
+        partition_column,
+        lower,
+        upper,
+        partition_count,
+        chunk_size=None,
+        skip_chunks=(),
+    ):
+        """Yield the source table as DataFrames read concurrently over ranges of `partition_column`.
 
+        The range from `lower` to `upper` is split into `partition_count` slices and every slice is
+        read on its own connection. Batches are yielded in the order they arrive as
+        ``(slice_number, DataFrame)`` pairs, followed by ``(slice_number, None)`` once a slice is
+        exhausted, so the slices feed the same load path as a single read. Slices numbered in
+        `skip_chunks` are not read.
+        """
+        if lower is None:
+            # Nothing to split: no rows, or the partition column is NULL everywhere
+            if 0 in skip_chunks:
+                return
+            query = build_source_query(source_table_spec, columns=columns, where=where)
+            yield from _chunk_batches(0, self._read_source(query, chunk_size, parameters))
+            return
+
+        def read_slice(slice_number, query, slice_parameters):
+            return _chunk_batches(slice_number, self._read_source(query, chunk_size, slice_parameters))
+
+        readers = []
+        for slice_number, (predicate, slice_parameters) in enumerate(
+            partition_predicates(partition_column, split_range(lower, upper, partition_count))
+        ):
+            if slice_number in skip_chunks:
+                continue
+            query = build_source_query(source_table_spec, columns=columns, where=where + [predicate])
+            readers.append(functools.partial(read_slice, slice_number, query, {**parameters, **slice_parameters}))
+
+        if readers:
+            yield from interleave(readers, max_buffered=len(readers))
+
+    def _read_source(self, query, chunk_size=None, parameters=None):
+        """Yield the result of `query` as Polars DataFrames.
+
+        Without `chunk_size` the whole result is read into a single DataFrame. With `chunk_size`
+        the query runs on a server-side cursor (``stream_results``) and batches of at most
+        `chunk_size` rows are yielded as they are fetched, so peak memory depends on the batch
+        size rather than on the size of the source table. `parameters` are bound to the query.
+        """
+        execute_options = {"parameters": parameters} if parameters else None
+        with self.source_engine.connect() as conn:
+            if not chunk_size:
+                yield pl.read_database(query, conn, execute_options=execute_options)
+                return
+
+            conn = conn.execution_options(stream_results=True, max_row_buffer=chunk_size)
+            yield from pl.read_database(
+                query, conn, iter_batches=True, batch_size=chunk_size, execute_options=execute_options
+            )
+
+    def _clear_table(self, destination_table, destination_schema):
+        """Delete every row of the destination table."""
+        table_spec = f"{destination_schema}.{destination_table}" if destination_schema else destination_table
+        with self.destination_engine.begin() as conn:
+            conn.exec_driver_sql(f"DELETE FROM {table_spec}")
+
+    def _load(self, data_frame, destination_table, destination_schema, operation, truncate_table='N', **kwargs):
+        """Write one DataFrame to the destination table using the requested operation."""
         # # # Handle operations based on db_type and operation
         if operation == 'merge':
             if self.db_type == 'mssql':  # SQL Server (Microsoft SQL Server uses "mssql")
@@ -135,6 +652,9 @@ class DatabaseDataTransfer(DataTransfer):
                     skip_inserts=kwargs.get("skip_inserts", False),
                     skip_updates=kwargs.get("skipUpdates", False),
                     skip_deletes=kwargs.get("skipDeletes", False),
+                    hash_column=kwargs.get("hash_column"),
+                    skip_unchanged=kwargs.get("skip_unchanged", False),
+                    batch_size=kwargs.get("merge_batch_size"),
                 )
             elif self.db_type == "postgresql":  # PostgreSQL
                 # Call df_insert_on_conflict with its specific parameters
@@ -144,24 +664,20 @@ class DatabaseDataTransfer(DataTransfer):
                     self.destination_engine,
                     schema=kwargs.get('destination_schema', destination_schema),
                     conflict_columns=kwargs.get('conflict_columns'),
+                    method=kwargs.get("load_method", "executemany"),
+                    skip_unchanged=kwargs.get("skip_unchanged", False),
                 )
-        elif operation == 'append':
-            # Call df_insert with its specific parameters
-            df_insert(
-                data_frame,
-                destination_table,
-                self.destination_engine,
-                schema=kwargs.get('destination_schema', destination_schema),
-                truncate_table='N',
-            )
-        elif operation == 'refresh':
+        elif operation in ('append', 'refresh'):
+            # PostgreSQL destinations are bulk loaded with COPY unless another method is requested
+            default_method = "copy" if self.db_type == "postgresql" else "executemany"
             # Call df_insert with its specific parameters
             df_insert(
                 data_frame,
                 destination_table,
                 self.destination_engine,
                 schema=kwargs.get('destination_schema', destination_schema),
-                truncate_table='Y',
+                truncate_table=truncate_table,
+                method=kwargs.get("load_method", default_method),
             )
         else:
             raise ValueError(f'Unsupported operation: {operation}')
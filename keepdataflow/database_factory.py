@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-import sqlalchemy as sa
+
+from keepdataflow.engine_registry import get_engine
 
 
 class DatabaseFactory(ABC):
@@ -18,10 +19,10 @@ class SQLServerFactory(DatabaseFactory):
         self.destination_conn_str = destination_conn_str
 
     def create_source_connection(self):
-        return sa.create_engine(self.source_conn_str)
+        return get_engine(self.source_conn_str)
 
     def create_destination_connection(self):
-        return sa.create_engine(self.destination_conn_str)
+        return get_engine(self.destination_conn_str)
 
 
 class PostgresFactory(DatabaseFactory):
@@ -30,7 +31,7 @@ class PostgresFactory(DatabaseFactory):
         self.destination_conn_str = destination_conn_str
 
     def create_source_connection(self):
-        return sa.create_engine(self.source_conn_str)
+        return get_engine(self.source_conn_str)
 
     def create_destination_connection(self):
-        return sa.create_engine(self.destination_conn_str)
+        return get_engine(self.destination_conn_str)
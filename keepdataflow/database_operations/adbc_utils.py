@@ -0,0 +1,50 @@
+def adbc_connect(engine):
+    """
+    Open an ADBC DB-API connection to the database behind a SQLAlchemy engine.
+
+    ADBC drivers take Arrow data directly, so a Polars DataFrame can be ingested without turning
+    its rows into Python objects. Supported for PostgreSQL (``adbc-driver-postgresql``) and
+    SQLite (``adbc-driver-sqlite``); the driver packages are optional and only needed for the
+    "adbc" load method.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The engine whose URL is used to connect.
+
+    Returns
+    -------
+    adbc_driver_manager.dbapi.Connection
+    """
+    dialect = engine.dialect.name
+
+    if dialect == "postgresql":
+        try:
+            import adbc_driver_postgresql.dbapi as adbc_dbapi
+        except ImportError as e:
+            raise ImportError("The adbc load method needs the adbc-driver-postgresql package") from e
+        # libpq understands the URL once the SQLAlchemy driver suffix (e.g. +psycopg2) is removed
+        uri = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        return adbc_dbapi.connect(uri)
+
+    if dialect == "sqlite":
+        try:
+            import adbc_driver_sqlite.dbapi as adbc_dbapi
+        except ImportError as e:
+            raise ImportError("The adbc load method needs the adbc-driver-sqlite package") from e
+        return adbc_dbapi.connect(engine.url.database or ":memory:")
+
+    raise ValueError(f"The adbc load method is not supported for {dialect}")
+
+
+def adbc_frame(data_frame, engine):
+    """
+    Return `data_frame` as an Arrow table with column names as the database will resolve them.
+
+    ADBC quotes the column names it ingests, while the SQL generated elsewhere in keepdataflow
+    leaves them unquoted. PostgreSQL folds unquoted names to lower case, so the names are folded
+    the same way to reach the same columns.
+    """
+    if engine.dialect.name == "postgresql":
+        data_frame = data_frame.rename({col: col.lower() for col in data_frame.columns})
+    return data_frame.to_arrow()
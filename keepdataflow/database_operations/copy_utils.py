@@ -0,0 +1,96 @@
+import io
+
+import polars as pl
+
+# Column types that Polars cannot render as CSV values PostgreSQL understands
+_UNSUPPORTED_COPY_TYPES = (pl.Binary, pl.List, pl.Struct, pl.Object)
+
+
+def supports_copy(data_frame):
+    """Return True if every column of `data_frame` can be sent through COPY ... (FORMAT csv)."""
+    return not any(dtype == unsupported for dtype in data_frame.dtypes for unsupported in _UNSUPPORTED_COPY_TYPES)
+
+
+class FrameCsvStream(io.RawIOBase):
+    """
+    A readable file object that renders a Polars DataFrame as CSV, one slice at a time.
+
+    Polars writes each slice straight from its Arrow buffers, so no Python object is created per
+    row or cell, and only one slice of CSV text is held in memory. Non-numeric values are always
+    quoted and NULL is written as an unquoted empty field, which is how COPY's csv format tells
+    NULL apart from an empty string.
+    """
+
+    def __init__(self, data_frame, slice_rows=50_000):
+        self._slices = data_frame.iter_slices(n_rows=slice_rows)
+        # The slice being read and how much of it was read; sized reads slice a view of it, so each
+        # byte is copied once however small the reads are
+        self._chunk = memoryview(b"")
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def _next_chunk(self):
+        for data_slice in self._slices:
+            return data_slice.write_csv(include_header=False, quote_style="non_numeric", null_value="").encode()
+        return b""
+
+    def _rest(self):
+        rest = self._chunk[self._offset :]
+        self._chunk, self._offset = memoryview(b""), 0
+        return rest
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b"".join(self.chunks())
+
+        if self._offset >= len(self._chunk):
+            self._chunk, self._offset = memoryview(self._next_chunk()), 0
+        # Returns less than `size` at the end of a slice; callers read until an empty result
+        data = self._chunk[self._offset : self._offset + size]
+        self._offset += len(data)
+        return bytes(data)
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def chunks(self):
+        """Yield the CSV text slice by slice."""
+        rest = self._rest()
+        if rest:
+            yield bytes(rest)
+        while chunk := self._next_chunk():
+            yield chunk
+
+
+def copy_from_frame(cursor, data_frame, table_spec, slice_rows=50_000):
+    """
+    Bulk load `data_frame` into `table_spec` with PostgreSQL's COPY FROM STDIN.
+
+    Works with psycopg2 (``copy_expert``) and psycopg 3 (``cursor.copy``) cursors.
+
+    Parameters
+    ----------
+    cursor : DBAPI cursor
+        A cursor of a psycopg2 or psycopg connection.
+    data_frame : polars.DataFrame
+        The rows to load. Column names must match the target columns.
+    table_spec : str
+        The (optionally schema qualified) target table.
+    slice_rows : int, optional
+        The number of rows rendered to CSV at a time.
+    """
+    stmt = f"COPY {table_spec} ({', '.join(data_frame.columns)}) FROM STDIN WITH (FORMAT csv)"
+    stream = FrameCsvStream(data_frame, slice_rows=slice_rows)
+
+    if hasattr(cursor, "copy_expert"):  # psycopg2
+        cursor.copy_expert(stmt, stream)
+    elif hasattr(cursor, "copy"):  # psycopg 3
+        with cursor.copy(stmt) as copy:
+            for chunk in stream.chunks():
+                copy.write(chunk)
+    else:
+        raise ValueError(f"COPY is not supported by the {type(cursor).__module__} driver")
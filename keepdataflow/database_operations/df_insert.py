@@ -1,10 +1,42 @@
 import polars as pl
+from loguru import logger
 
+from keepdataflow.database_operations.adbc_utils import (
+    adbc_connect,
+    adbc_frame,
+)
+from keepdataflow.database_operations.copy_utils import (
+    copy_from_frame,
+    supports_copy,
+)
+from keepdataflow.database_operations.values_batching import (
+    values_batch_rows,
+    values_statement,
+)
+from keepdataflow.metrics import phase
+from keepdataflow.statement_profiler import timed_statement
 
-def df_insert(data_frame, table_name, engine, schema=None, truncate_table='N'):
+
+def df_insert(data_frame, table_name, engine, schema=None, truncate_table='N', method="executemany"):
     """
     Perform a simple insert into a SQL Server or PostgreSQL table from a Polars DataFrame.
+
+    Parameters
+    ----------
+    method : str, optional
+        "executemany" (default) sends one parameter set per row. "copy" bulk loads the frame
+        with COPY FROM STDIN on PostgreSQL and falls back to "executemany" for frames with
+        column types COPY's csv format cannot carry (binary, list, struct). "adbc" hands the
+        frame's Arrow data to an ADBC driver (PostgreSQL or SQLite), which ingests it into a
+        temporary table that is then inserted with a single INSERT ... SELECT. "values" packs as
+        many rows into each multi-row INSERT ... VALUES statement as the dialect's bind parameter
+        limit allows, for drivers without a native bulk API.
     """
+    if method not in ("executemany", "copy", "adbc", "values"):
+        raise ValueError(f"Unsupported insert method: {method}")
+    if method == "copy" and engine.dialect.name != "postgresql":
+        raise ValueError("The copy insert method is only supported on PostgreSQL")
+
     table_spec = ""
     if schema:
         table_spec = f"{schema}.{table_name}"
@@ -15,21 +47,74 @@ def df_insert(data_frame, table_name, engine, schema=None, truncate_table='N'):
 
     # table_spec += table_name
 
+    if method == "adbc":
+        with adbc_connect(engine) as conn:
+            with conn.cursor() as cursor:
+                if truncate_table == 'Y':
+                    with timed_statement(engine, f"DELETE FROM {table_spec}", cursor):
+                        cursor.execute(f"DELETE FROM {table_spec}")
+                # Binary COPY needs exact type matches, so ingest into a temporary table shaped like the
+                # frame and let INSERT ... SELECT apply the usual assignment casts
+                staging_table = f"_kdf_stage_{table_name}"
+                insert_stmt = (
+                    f"INSERT INTO {table_spec} ({', '.join(data_frame.columns)}) "
+                    f"SELECT {', '.join(data_frame.columns)} FROM {staging_table}"
+                )
+                with phase("stage", table_spec), timed_statement(engine, f"ADBC INGEST INTO {staging_table}", cursor):
+                    cursor.adbc_ingest(staging_table, adbc_frame(data_frame, engine), mode="create", temporary=True)
+                with phase("merge", table_spec), timed_statement(engine, insert_stmt, cursor):
+                    cursor.execute(insert_stmt)
+                cursor.execute(f"DROP TABLE {staging_table}")
+            with phase("commit", table_spec):
+                conn.commit()
+        return
+
+    if method == "copy" and supports_copy(data_frame):
+        with engine.begin() as conn:
+            cursor = conn.connection.cursor()
+            if truncate_table == 'Y':
+                conn.exec_driver_sql(f"DELETE FROM {table_spec}")
+
+            with phase("stage", table_spec), timed_statement(engine, f"COPY {table_spec} FROM STDIN", cursor):
+                copy_from_frame(cursor, data_frame, table_spec)
+            with phase("commit", table_spec):
+                conn.connection.commit()
+        return
+
     df_columns = list(data_frame.columns)
+    # pyodbc and sqlite3 use qmark parameters, psycopg2 and most other drivers use format
+    placeholder = '?' if engine.dialect.paramstyle == 'qmark' else '%s'
+
+    if method == "values":
+        batch_rows = values_batch_rows(engine.dialect.name, len(df_columns))
+        with engine.begin() as conn:
+            cursor = conn.connection.cursor()
+            if truncate_table == 'Y':
+                conn.exec_driver_sql(f"DELETE FROM {table_spec}")
+
+            with phase("stage", table_spec):
+                for batch in data_frame.iter_slices(n_rows=batch_rows):
+                    stmt = values_statement(table_spec, tuple(df_columns), batch.height, placeholder)
+                    with timed_statement(engine, stmt, cursor):
+                        cursor.execute(stmt, [value for row in batch.iter_rows() for value in row])
+            with phase("commit", table_spec):
+                conn.connection.commit()
+        return
 
     stmt = f"""
         INSERT INTO {table_spec} ({', '.join([col for col in df_columns])})
-        VALUES ({', '.join(['?' for _ in df_columns])})
+        VALUES ({', '.join([placeholder for _ in df_columns])})
     """
-    print(stmt)
     # Convert Polars DataFrame to list of tuples for fast insertion
     data = [tuple(row) for row in data_frame.rows()]
-    print(data)
+    logger.debug("Inserting {rows} rows into {table}", rows=len(data), table=table_spec, statement=stmt)
 
     with engine.begin() as conn:
         cursor = conn.connection.cursor()
         if truncate_table == 'Y':
             conn.exec_driver_sql(f"DELETE FROM {table_spec}")
 
-        cursor.executemany(stmt, data)
-        conn.connection.commit()
+        with phase("stage", table_spec), timed_statement(engine, stmt, cursor):
+            cursor.executemany(stmt, data)
+        with phase("commit", table_spec):
+            conn.connection.commit()
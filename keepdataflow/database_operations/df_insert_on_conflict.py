@@ -1,11 +1,79 @@
 import polars as pl
 
+from keepdataflow.database_operations.adbc_utils import (
+    adbc_connect,
+    adbc_frame,
+)
+from keepdataflow.database_operations.copy_utils import (
+    copy_from_frame,
+    supports_copy,
+)
+from keepdataflow.metrics import phase
+from keepdataflow.statement_cache import statement_cache
+from keepdataflow.statement_profiler import timed_statement
 
-def df_insert_on_conflict(data_frame, table_name, engine, schema=None, conflict_columns=None):
+
+def _render_upsert(table_spec, df_columns, conflict_columns, source, skip_unchanged=False):
+    """Render INSERT INTO ... <source> ON CONFLICT for a VALUES list or a SELECT from a staging table."""
+    conflict_target = ", ".join([f"{col}" for col in conflict_columns])
+    columns_to_update = [col for col in df_columns if col not in conflict_columns]
+    update_list = ", ".join([f"{col} = EXCLUDED.{col}" for col in columns_to_update])
+    conflict_action = f"DO UPDATE SET {update_list}" if update_list else "DO NOTHING"
+
+    target = table_spec
+    if skip_unchanged and columns_to_update:
+        # IS DISTINCT FROM treats NULLs as equal, so rows whose values did not change are left untouched
+        target = f"{table_spec} AS main"
+        current = ", ".join([f"main.{col}" for col in columns_to_update])
+        incoming = ", ".join([f"EXCLUDED.{col}" for col in columns_to_update])
+        conflict_action += f"\n        WHERE ({current}) IS DISTINCT FROM ({incoming})"
+
+    return f'''
+        INSERT INTO {target} ({', '.join([col for col in df_columns])})
+        {source}
+        ON CONFLICT ({conflict_target})
+        {conflict_action}
+    '''
+
+
+def _upsert_statement(table_spec, df_columns, conflict_columns, source, skip_unchanged=False):
+    """Return the cached upsert statement, rendering it on first use for this shape."""
+    return statement_cache.get_or_render(
+        ("postgresql", table_spec, tuple(df_columns), tuple(conflict_columns), source, skip_unchanged),
+        lambda: _render_upsert(table_spec, df_columns, conflict_columns, source, skip_unchanged=skip_unchanged),
+    )
+
+
+def df_insert_on_conflict(
+    data_frame,
+    table_name,
+    engine,
+    schema=None,
+    conflict_columns=None,
+    method="executemany",
+    skip_unchanged=False,
+):
     """
     Perform an insert on conflict (upsert) on a PostgreSQL table from a Polars DataFrame.
     Constructs an INSERT INTO ... ON CONFLICT statement.
+
+    Parameters
+    ----------
+    method : str, optional
+        "executemany" (default) sends the upsert once per row. "copy" bulk loads the frame into a
+        temporary staging table with COPY FROM STDIN and upserts it with a single
+        INSERT INTO ... SELECT ... ON CONFLICT statement. Temporary tables are not WAL-logged and
+        are dropped at commit. When several rows share a conflict key the last one wins, as it
+        does with "executemany". "adbc" stages the frame the same way, but ingests its Arrow data
+        through an ADBC driver instead of COPY text.
+    skip_unchanged : bool, optional
+        Only update conflicting rows whose values differ from the incoming ones, compared NULL-safely
+        with IS DISTINCT FROM. Unchanged rows are not rewritten, which saves WAL, dead tuples and
+        trigger firings. (Default: False)
     """
+    if method not in ("executemany", "copy", "adbc"):
+        raise ValueError(f"Unsupported upsert method: {method}")
+
     table_spec = ""
     if schema:
         table_spec += schema + "."
@@ -14,21 +82,68 @@ def df_insert_on_conflict(data_frame, table_name, engine, schema=None, conflict_
 
     df_columns = list(data_frame.columns)
 
-    # Build the INSERT ON CONFLICT statement
-    conflict_target = ", ".join([f"{col}" for col in conflict_columns])
-    update_list = ", ".join([f"{col} = EXCLUDED.{col}" for col in df_columns if col not in conflict_columns])
+    if method == "copy" and not supports_copy(data_frame):
+        # Frames with columns COPY cannot carry are upserted row by row
+        method = "executemany"
 
-    stmt = f'''
-        INSERT INTO {table_spec} ({', '.join([col for col in df_columns])})
-        VALUES ({', '.join(['%s' for _ in df_columns])})
-        ON CONFLICT ({conflict_target})
-        DO UPDATE SET {update_list}
-    '''
+    if method in ("copy", "adbc"):
+        # A single statement may not update the same row twice, so keep the last row per key
+        data_frame = data_frame.unique(subset=conflict_columns, keep="last", maintain_order=True)
+        staging_table = f"_kdf_stage_{table_name}"
+        # WHERE true keeps SQLite from reading ON CONFLICT as part of the SELECT's join syntax
+        staged_stmt = _upsert_statement(
+            table_spec,
+            df_columns,
+            conflict_columns,
+            f"SELECT {', '.join(df_columns)} FROM {staging_table} WHERE true",
+            skip_unchanged=skip_unchanged,
+        )
+
+    if method == "adbc":
+        with adbc_connect(engine) as conn:
+            with conn.cursor() as cursor:
+                with phase("stage", table_spec), timed_statement(engine, f"ADBC INGEST INTO {staging_table}", cursor):
+                    cursor.adbc_ingest(staging_table, adbc_frame(data_frame, engine), mode="create", temporary=True)
+                with phase("merge", table_spec), timed_statement(engine, staged_stmt, cursor):
+                    cursor.execute(staged_stmt)
+                cursor.execute(f"DROP TABLE {staging_table}")
+            with phase("commit", table_spec):
+                conn.commit()
+        return
+
+    if method == "copy":
+        with engine.begin() as conn:
+            cursor = conn.connection.cursor()
+            create_stmt = (
+                f"CREATE TEMPORARY TABLE {staging_table} ON COMMIT DROP AS "
+                f"SELECT {', '.join(df_columns)} FROM {table_spec} WITH NO DATA"
+            )
+            with timed_statement(engine, create_stmt, cursor):
+                cursor.execute(create_stmt)
+            with phase("stage", table_spec), timed_statement(engine, f"COPY {staging_table} FROM STDIN", cursor):
+                copy_from_frame(cursor, data_frame, staging_table)
+            with phase("merge", table_spec), timed_statement(engine, staged_stmt, cursor):
+                cursor.execute(staged_stmt)
+            with phase("commit", table_spec):
+                conn.connection.commit()
+        return
+
+    # Build the INSERT ON CONFLICT statement
+    stmt = _upsert_statement(
+        table_spec,
+        df_columns,
+        conflict_columns,
+        f"VALUES ({', '.join(['%s' for _ in df_columns])})",
+        skip_unchanged=skip_unchanged,
+    )
 
     # Convert Polars DataFrame to list of tuples for fast insertion
     data = [tuple(row) for row in data_frame.rows()]
 
     with engine.begin() as conn:
         cursor = conn.connection.cursor()
-        cursor.executemany(stmt, data)
-        conn.connection.commit()
+        # Every row is staged and merged by the same statement
+        with phase("merge", table_spec), timed_statement(engine, stmt, cursor):
+            cursor.executemany(stmt, data)
+        with phase("commit", table_spec):
+            conn.connection.commit()
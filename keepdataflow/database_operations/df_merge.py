@@ -1,7 +1,14 @@
-import uuid
 import polars as pl
 import sqlalchemy as sa
 
+from keepdataflow.metrics import phase
+from keepdataflow.reflection_cache import get_reflection_cache
+from keepdataflow.statement_cache import (
+    staging_table_name,
+    statement_cache,
+)
+from keepdataflow.statement_profiler import timed_statement
+
 destinationserverAddress = "VHACDWA01.VHA.MED.VA.GOV"
 destinationDatabaseName = "HEFP_EHRMSPCAM"
 
@@ -12,6 +19,219 @@ destinationDatabaseName = "HEFP_EHRMSPCAM"
 connectionString = f"DRIVER={{ODBC Driver 17 for SQL Server}};SERVER={destinationserverAddress};DATABASE={destinationDatabaseName};Trusted_Connection=yes;"
 
 
+def render_merge_statement(
+    table_spec,
+    temp_table_name,
+    df_columns,
+    match_columns,
+    identity_columns,
+    insert_match_column=True,
+    skip_inserts=False,
+    skip_updates=False,
+    skip_deletes=False,
+    skip_unchanged=False,
+):
+    """Render the T-SQL MERGE that applies the rows staged in `temp_table_name` to `table_spec`."""
+    # Columns to update in the match clause
+    columns_to_update = [col for col in df_columns if col not in match_columns]
+
+    stmt = f"MERGE {table_spec} WITH (HOLDLOCK) AS main\n"
+    stmt += f"USING (SELECT {', '.join([f'[{col}]' for col in df_columns])} FROM {temp_table_name}) AS temp\n"
+    join_condition = " AND ".join([f"main.[{col}] = temp.[{col}]" for col in match_columns])
+    stmt += f"ON ({join_condition})"
+
+    if not skip_updates:
+        if skip_unchanged and columns_to_update:
+            # EXCEPT compares NULLs as equal, so only rows with a real difference are updated
+            current = ", ".join([f"main.[{col}]" for col in columns_to_update])
+            incoming = ", ".join([f"temp.[{col}]" for col in columns_to_update])
+            stmt += f"\nWHEN MATCHED AND EXISTS (SELECT {current} EXCEPT SELECT {incoming}) THEN\n"
+        else:
+            stmt += "\nWHEN MATCHED THEN\n"
+        update_list = ", ".join([f"[{col}] = temp.[{col}]" for col in columns_to_update])
+        stmt += f"  UPDATE SET {update_list}"
+
+    if not skip_inserts:
+        stmt += "\nWHEN NOT MATCHED THEN\n"
+
+        # Exclude identity columns and optionally match columns from the insert statement
+        insert_columns = [col for col in df_columns if col not in identity_columns]
+
+        if not insert_match_column:
+            insert_columns = [col for col in insert_columns if col not in match_columns]
+
+        insert_cols_str = ",".join([f"[{col}]\n" for col in insert_columns])
+        insert_vals_str = ",".join([f"temp.[{col}]\n" for col in insert_columns])
+        stmt += f"  INSERT ({insert_cols_str}) VALUES ({insert_vals_str})"
+
+    if not skip_deletes:
+        stmt += "\n WHEN NOT MATCHED BY SOURCE \nTHEN DELETE"
+    # THEN DELETE
+    stmt += ";"
+    return stmt
+
+
+def add_row_hash(data_frame, hash_column, key_columns):
+    """
+    Add `hash_column` holding a 64-bit hash of each row's non-key columns.
+
+    The hash is computed by Polars in one vectorized pass and stored as a signed BIGINT, the
+    widest integer SQL Server has. Polars does not promise the same hash across its versions, so
+    after an upgrade every row is reported as changed once and the stored hashes are rewritten.
+    """
+    value_columns = [col for col in data_frame.columns if col not in key_columns and col != hash_column]
+    row_hash = data_frame.select(value_columns).hash_rows(seed=0).reinterpret(signed=True)
+    return data_frame.with_columns(row_hash.alias(hash_column))
+
+
+def changed_rows(data_frame, destination, match_columns, hash_column):
+    """
+    Return the rows of `data_frame` that are new or whose hash differs from `destination`.
+
+    `destination` holds the match columns and stored hash of the rows already in the table;
+    rows without a stored hash count as changed.
+    """
+    destination = destination.select(
+        [pl.col(col).cast(data_frame.schema[col]) for col in match_columns]
+        + [pl.col(hash_column).alias("_kdf_destination_hash")]
+    )
+    return (
+        data_frame.join(destination, on=match_columns, how="left")
+        .filter(pl.col("_kdf_destination_hash").is_null() | (pl.col(hash_column) != pl.col("_kdf_destination_hash")))
+        .drop("_kdf_destination_hash")
+    )
+
+
+def _table_spec(table_name, schema=None):
+    """Return the bracket-quoted, optionally schema-qualified name of a SQL Server table."""
+    table_spec = ""
+    if schema:
+        table_spec += "[" + schema.replace("]", "]]") + "]."
+
+    table_spec += "[" + table_name.replace("]", "]]") + "]"
+    return table_spec
+
+
+def stage_frame(conn, data_frame, table_spec, temp_table_name, index_columns):
+    """
+    Bulk load `data_frame` into a new, indexed SQL Server staging table.
+
+    The staging table takes its column types from `table_spec`, the target of the load. It is
+    created empty with SELECT TOP 0 ... INTO; the UNION ALL keeps it from inheriting the IDENTITY
+    property of the target's columns, so every staged value can be inserted. The rows are
+    inserted WITH (TABLOCK) into the still empty heap, which SQL Server logs minimally, using the
+    driver's fast_executemany when it has one. A clustered index on `index_columns` is built last,
+    so the MERGE or DELETE joins against it with an ordered seek instead of scanning the whole
+    staging table. Any table left under the same name by an earlier failed load is dropped first.
+    """
+    columns = ", ".join([f"[{col}]" for col in data_frame.columns])
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {temp_table_name}")
+    conn.exec_driver_sql(
+        f"SELECT TOP 0 {columns} INTO {temp_table_name} FROM {table_spec} "
+        f"UNION ALL SELECT TOP 0 {columns} FROM {table_spec}"
+    )
+
+    if data_frame.height:
+        placeholder = '?' if conn.dialect.paramstyle == 'qmark' else '%s'
+        cursor = conn.connection.cursor()
+        if hasattr(cursor, "fast_executemany"):
+            # pyodbc sends the whole parameter array in one round trip instead of one per row
+            cursor.fast_executemany = True
+        insert_stmt = (
+            f"INSERT INTO {temp_table_name} WITH (TABLOCK) ({columns}) "
+            f"VALUES ({', '.join([placeholder for _ in data_frame.columns])})"
+        )
+        with timed_statement(conn, insert_stmt, cursor):
+            cursor.executemany(insert_stmt, data_frame.rows())
+
+    index_list = ", ".join([f"[{col}]" for col in index_columns])
+    conn.exec_driver_sql(f"CREATE CLUSTERED INDEX ix_kdf_stage ON {temp_table_name} ({index_list})")
+
+
+def _drop_staging_table(engine, temp_table_name):
+    """Drop a staging table left by a failed load, without masking the error that caused it."""
+    try:
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {temp_table_name}")
+    except Exception:
+        pass
+
+
+def resolve_match_columns(engine, table_name, schema=None, match_columns=None):
+    """Return `match_columns`, or the primary key columns of the target table when it is empty."""
+    if match_columns:
+        return list(match_columns)
+    return get_reflection_cache(engine).get_pk_constraint(table_name, schema=schema)["constrained_columns"]
+
+
+def delete_missing_rows(keys, table_name, engine, schema=None, match_columns=None):
+    """
+    Delete the rows of a SQL Server table whose match columns are not among `keys`.
+
+    This is the delete half of a merge, run as one set-based anti-join after every chunk of a
+    batched or streamed merge has been applied. The keys are staged in a temporary table and the
+    target is cleaned with a single ``DELETE ... WHERE NOT EXISTS``.
+
+    Parameters
+    ----------
+    keys : polars.DataFrame
+        Every key of the source, with at least the match columns.
+    table_name : str
+        The name of the target table.
+    engine : sqlalchemy.engine.Engine
+        The SQLAlchemy Engine to use.
+    schema : str, optional
+        The name of the schema containing the target table.
+    match_columns : list of str, optional
+        The columns that identify a row. Defaults to the primary key of the target table.
+    """
+    table_spec = _table_spec(table_name, schema)
+    match_columns = resolve_match_columns(engine, table_name, schema, match_columns)
+    keys_table_name = staging_table_name(f"{table_name}_keys")
+    join_condition = " AND ".join([f"main.[{col}] = k.[{col}]" for col in match_columns])
+
+    try:
+        with engine.begin() as conn:
+            stage_frame(conn, keys.select(match_columns).unique(), table_spec, keys_table_name, match_columns)
+            conn.exec_driver_sql(
+                f"DELETE main FROM {table_spec} AS main "
+                f"WHERE NOT EXISTS (SELECT 1 FROM {keys_table_name} AS k WHERE {join_condition})"
+            )
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {keys_table_name}")
+    except Exception:
+        _drop_staging_table(engine, keys_table_name)
+        raise
+
+
+def stored_hashes(data_frame, table_name, engine, schema, match_columns, hash_column):
+    """
+    Return the match columns and stored hash of the target rows whose keys are in `data_frame`.
+
+    Only the frame's keys are staged and joined against the target on the server, so the cost
+    follows the size of the frame rather than of the table, also when a large table is merged
+    batch by batch.
+    """
+    table_spec = _table_spec(table_name, schema)
+    keys_table_name = staging_table_name(f"{table_name}_keys")
+    key_list = ", ".join([f"k.[{col}]" for col in match_columns])
+    join_condition = " AND ".join([f"main.[{col}] = k.[{col}]" for col in match_columns])
+
+    try:
+        with engine.connect() as conn:
+            stage_frame(conn, data_frame.select(match_columns).unique(), table_spec, keys_table_name, match_columns)
+            destination = pl.read_database(
+                f"SELECT {key_list}, main.[{hash_column}] FROM {keys_table_name} AS k "
+                f"INNER JOIN {table_spec} AS main ON ({join_condition})",
+                conn,
+            )
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {keys_table_name}")
+            conn.commit()
+    except Exception:
+        _drop_staging_table(engine, keys_table_name)
+        raise
+    return destination
+
+
 # class DataframeSQLOperations:
 #     def __init__(self, dataframe, target_table_name,target_engine,target_schema):
 def df_merge(
@@ -26,11 +246,15 @@ def df_merge(
     skip_inserts=False,
     skip_updates=False,
     skip_deletes=False,
+    hash_column=None,
+    skip_unchanged=False,
+    batch_size=None,
 ):
     """
     Perform an "upsert" on a SQL Server table from a Polars DataFrame.
-    Constructs a T-SQL MERGE statement, uploads the DataFrame to a
-    temporary table, and then executes the MERGE.
+    Constructs a T-SQL MERGE statement, bulk loads the DataFrame into a
+    global temporary table indexed on the match columns (see `stage_frame`),
+    and then executes the MERGE.
 
     Parameters
     ----------
@@ -53,68 +277,115 @@ def df_merge(
         Skip inserting unmatched rows. (Default: False)
     skip_updates : bool, optional
         Skip updating matched rows. (Default: False)
+    skip_deletes : bool, optional
+        Skip deleting target rows that are not in the DataFrame. (Default: False)
+    hash_column : str, optional
+        A BIGINT column of the target table that stores a hash of each row's non-key columns.
+        When given, the hashes are computed for the DataFrame and compared with the ones stored
+        for its keys (see `stored_hashes`), and only new or changed rows are staged and merged.
+        Deletes are then applied from the keys missing in the DataFrame (see `delete_missing_rows`)
+        rather than by the MERGE, which only sees changed rows.
+    skip_unchanged : bool, optional
+        Only update matched rows whose values differ from the staged ones, compared NULL-safely on
+        the server. Unchanged rows are not rewritten, which saves log volume, trigger firings and
+        index maintenance. (Default: False)
+    batch_size : int, optional
+        Merge the DataFrame in chunks of this many rows, committing each chunk on its own so locks
+        and transaction log stay bounded. Deletes then run after the last chunk as one set-based
+        anti-join against all of the DataFrame's keys (see `delete_missing_rows`), instead of in
+        each chunk's MERGE. Rows should be unique per key. The load is no longer atomic: a failure
+        leaves the chunks before it applied.
     """
     if skip_inserts and skip_updates:
         raise ValueError("skip_inserts and skip_updates cannot both be True")
 
-    temp_table_name = "##" + str(uuid.uuid4()).replace("-", "_")
-
-    table_spec = ""
-    if schema:
-        table_spec += "[" + schema.replace("]", "]]") + "]."
-
-    table_spec += "[" + table_name.replace("]", "]]") + "]"
+    # A stable staging name keeps the MERGE text identical between loads, so SQL Server can reuse its plan
+    temp_table_name = staging_table_name(table_name)
 
-    df_columns = list(data_frame.columns)
+    table_spec = _table_spec(table_name, schema)
 
-    # Use SQLAlchemy inspect to get match columns and identity (auto-increment) columns
-    insp = sa.inspect(engine)
-    table_info = insp.get_columns(table_name, schema=schema)
+    # Use the cached SQLAlchemy reflection to get match columns and identity (auto-increment) columns
+    reflection = get_reflection_cache(engine)
+    table_info = reflection.get_columns(table_name, schema=schema)
 
     # # If match_columns are not provided, get the primary key columns
-    if not match_columns:
-        match_columns = insp.get_pk_constraint(table_name, schema=schema)["constrained_columns"]
+    match_columns = resolve_match_columns(engine, table_name, schema, match_columns)
 
-        # Identify identity (auto-increment) columns
+    # Identify identity (auto-increment) columns
     # identity_columns = [col["name"] for col in table_info if col.get("autoincrement") == True]
 
     # Identify identity (auto-increment) columns
     identity_columns = [col["name"] for col in table_info if col.get("autoincrement") == True]
 
-    # Columns to update in the match clause
-    columns_to_update = [col for col in df_columns if col not in match_columns]
-
-    stmt = f"MERGE {table_spec} WITH (HOLDLOCK) AS main\n"
-    stmt += f"USING (SELECT {', '.join([f'[{col}]' for col in df_columns])} FROM {temp_table_name}) AS temp\n"
-    join_condition = " AND ".join([f"main.[{col}] = temp.[{col}]" for col in match_columns])
-    stmt += f"ON ({join_condition})"
-
-    if not skip_updates:
-        stmt += "\nWHEN MATCHED THEN\n"
-        update_list = ", ".join([f"[{col}] = temp.[{col}]" for col in columns_to_update])
-        stmt += f"  UPDATE SET {update_list}"
+    delete_missing = False
+    if hash_column:
+        data_frame = add_row_hash(data_frame, hash_column, match_columns)
+        if not skip_deletes:
+            # The MERGE only sees changed rows, so it must not delete the unchanged ones
+            delete_missing = True
+            keys = data_frame.select(match_columns)
+            skip_deletes = True
 
-    if not skip_inserts:
-        stmt += "\nWHEN NOT MATCHED THEN\n"
+        destination = stored_hashes(data_frame, table_name, engine, schema, match_columns, hash_column)
+        data_frame = changed_rows(data_frame, destination, match_columns, hash_column)
 
-        # Exclude identity columns and optionally match columns from the insert statement
-        insert_columns = [col for col in df_columns if col not in identity_columns]
+    if batch_size and not skip_deletes:
+        # Each chunk's MERGE would delete the rows of every other chunk; delete once at the end instead
+        delete_missing = True
+        keys = data_frame.select(match_columns)
+        skip_deletes = True
 
-        if not insert_match_column:
-            insert_columns = [col for col in insert_columns if col not in match_columns]
+    df_columns = list(data_frame.columns)
 
-        insert_cols_str = ",".join([f"[{col}]\n" for col in insert_columns])
-        insert_vals_str = ",".join([f"temp.[{col}]\n" for col in insert_columns])
-        stmt += f"  INSERT ({insert_cols_str}) VALUES ({insert_vals_str})"
+    # The rendered MERGE is reused for every load of the same shape into this table
+    stmt = statement_cache.get_or_render(
+        (
+            "mssql",
+            table_spec,
+            temp_table_name,
+            tuple(df_columns),
+            tuple(match_columns),
+            tuple(identity_columns),
+            insert_match_column,
+            skip_inserts,
+            skip_updates,
+            skip_deletes,
+            skip_unchanged,
+        ),
+        lambda: render_merge_statement(
+            table_spec,
+            temp_table_name,
+            df_columns,
+            match_columns,
+            identity_columns,
+            insert_match_column=insert_match_column,
+            skip_inserts=skip_inserts,
+            skip_updates=skip_updates,
+            skip_deletes=skip_deletes,
+            skip_unchanged=skip_unchanged,
+        ),
+    )
 
-    if not skip_deletes:
-        stmt += "\n WHEN NOT MATCHED BY SOURCE \nTHEN DELETE"
-    # THEN DELETE
-    stmt += ";"
+    # With change detection there may be nothing left to stage
+    if data_frame.height or not hash_column:
+        chunk_rows = batch_size or max(data_frame.height, 1)
+        for offset in range(0, max(data_frame.height, 1), chunk_rows):
+            # Every chunk is committed on its own
+            try:
+                with engine.connect() as conn:
+                    with phase("stage", table_spec):
+                        stage_frame(
+                            conn, data_frame.slice(offset, chunk_rows), table_spec, temp_table_name, match_columns
+                        )
+                    with phase("merge", table_spec):
+                        conn.exec_driver_sql(stmt)
+                    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {temp_table_name}")
+                    with phase("commit", table_spec):
+                        conn.commit()
+            except Exception:
+                # A global temp table outlives a failed transaction on a pooled connection
+                _drop_staging_table(engine, temp_table_name)
+                raise
 
-    with engine.begin() as conn:
-        # Insert data into the temp table using Arrow
-        # pl.from_records(arrow_table.to_pandas()).to_sql(temp_table_name, conn, index=False, chunksize=chunksize)
-        data_frame.write_database(table_name=temp_table_name, connection=conn)
-        conn.exec_driver_sql(stmt)
-        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {temp_table_name}")
+    if delete_missing:
+        delete_missing_rows(keys, table_name, engine, schema=schema, match_columns=match_columns)
@@ -0,0 +1,168 @@
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from loguru import logger
+
+from keepdataflow.database_operations.table_swap import qualified_name
+from keepdataflow.reflection_cache import get_reflection_cache
+
+
+def _mssql_suspend(engine, table_spec, table_name, schema):
+    """Disable the nonclustered, non-unique indexes and constraint checks of a SQL Server table."""
+    preparer = engine.dialect.identifier_preparer
+    # The clustered index holds the data; disabling it would make the table unreadable. Unique indexes,
+    # including those behind unique constraints, keep rejecting duplicates during the load
+    indexes = [
+        index["name"]
+        for index in get_reflection_cache(engine).get_indexes(table_name, schema=schema)
+        if not index.get("dialect_options", {}).get("mssql_clustered") and not index.get("unique")
+    ]
+    with engine.begin() as conn:
+        for name in indexes:
+            conn.exec_driver_sql(f"ALTER INDEX {preparer.quote(name)} ON {table_spec} DISABLE")
+        conn.exec_driver_sql(f"ALTER TABLE {table_spec} NOCHECK CONSTRAINT ALL")
+    return indexes
+
+
+def _mssql_restore(engine, table_spec, indexes):
+    preparer = engine.dialect.identifier_preparer
+    # Every index and the constraints are restored even when one of them fails; the first error is raised
+    error = None
+    for name in indexes:
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"ALTER INDEX {preparer.quote(name)} ON {table_spec} REBUILD")
+        except Exception as exc:
+            error = error or exc
+    try:
+        # WITH CHECK validates the loaded rows, so the optimizer can trust the constraints again
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"ALTER TABLE {table_spec} WITH CHECK CHECK CONSTRAINT ALL")
+    except Exception as exc:
+        error = error or exc
+        # Keep enforcing the constraints for new rows even though the loaded ones violate them
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f"ALTER TABLE {table_spec} CHECK CONSTRAINT ALL")
+        except Exception as fallback_exc:
+            logger.warning(
+                "Could not re-enable the constraints of {table}: {error}", table=table_spec, error=fallback_exc
+            )
+    if error is not None:
+        raise error
+
+
+def _postgresql_suspend(engine, table_spec):
+    """Drop the secondary indexes and foreign keys of a PostgreSQL table, returning how to recreate them."""
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        # Unique indexes and indexes behind primary key, unique and exclusion constraints stay; they are
+        # the constraints
+        indexes = conn.execute(
+            sa.text(
+                "SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid) FROM pg_index AS i "
+                "WHERE i.indrelid = CAST(:table_spec AS regclass) AND NOT i.indisunique "
+                "AND NOT EXISTS (SELECT 1 FROM pg_constraint AS c WHERE c.conindid = i.indexrelid)"
+            ),
+            {"table_spec": table_spec},
+        ).all()
+        foreign_keys = conn.execute(
+            sa.text(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = CAST(:table_spec AS regclass) AND contype = 'f'"
+            ),
+            {"table_spec": table_spec},
+        ).all()
+
+        for name, _ in foreign_keys:
+            conn.exec_driver_sql(f"ALTER TABLE {table_spec} DROP CONSTRAINT {preparer.quote(name)}")
+        for name, _ in indexes:
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+
+    return (
+        [definition for _, definition in indexes],
+        [
+            f"ALTER TABLE {table_spec} ADD CONSTRAINT {preparer.quote(name)} {definition}"
+            for name, definition in foreign_keys
+        ],
+    )
+
+
+def _postgresql_restore(engine, index_statements, constraint_statements):
+    # Every index and foreign key is restored in its own transaction, so one failure cannot undo the
+    # others; the first error is raised once all of them were attempted
+    error = None
+    for statement in index_statements:
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(statement)
+        except Exception as exc:
+            error = error or exc
+
+    for statement in constraint_statements:
+        try:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(statement)
+        except Exception as exc:
+            error = error or exc
+            # Keep the constraint for new rows even though the loaded ones violate it; if even that
+            # fails, e.g. because the referenced table is gone, the remaining foreign keys still follow
+            try:
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"{statement} NOT VALID")
+            except Exception as fallback_exc:
+                logger.warning("Could not restore {statement}: {error}", statement=statement, error=fallback_exc)
+    if error is not None:
+        raise error
+
+
+@contextmanager
+def suspended_indexes(engine, table_name, schema=None):
+    """
+    Suspend the secondary indexes and constraint checks of a table for the duration of a bulk load.
+
+    Maintaining every nonclustered index and checking every foreign key row by row is much
+    slower than building each index once with a single sort and validating each constraint in
+    one pass after the load. On exit, also when the load fails, everything is restored:
+
+    * SQL Server: nonclustered indexes are disabled and rebuilt with ALTER INDEX ... REBUILD;
+      constraints are disabled with NOCHECK and re-enabled WITH CHECK, so they are trusted again.
+    * PostgreSQL: indexes that do not back a constraint and foreign keys are dropped and recreated
+      from the definitions recorded by pg_get_indexdef and pg_get_constraintdef.
+
+    The primary key, unique constraints and unique indexes stay in place on both databases, so
+    duplicates are still rejected during the load. Readers of the table lose the suspended
+    indexes for the duration of the load. If the loaded rows violate a constraint, the
+    constraint is re-enabled without validating existing rows (untrusted on SQL Server, NOT VALID
+    on PostgreSQL). Every index and constraint is restored even when another one fails, and the
+    first error is raised afterwards.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The destination engine (SQL Server or PostgreSQL).
+    table_name : str
+        The table being loaded.
+    schema : str, optional
+        The schema of the table.
+
+    Example Usage:
+    --------------
+    with suspended_indexes(engine, "fact_sales", schema="dbo"):
+        df_insert(data_frame, "fact_sales", engine, schema="dbo")
+    """
+    table_spec = qualified_name(engine, table_name, schema)
+    if engine.dialect.name == "mssql":
+        indexes = _mssql_suspend(engine, table_spec, table_name, schema)
+        restore = lambda: _mssql_restore(engine, table_spec, indexes)
+    elif engine.dialect.name == "postgresql":
+        index_statements, constraint_statements = _postgresql_suspend(engine, table_spec)
+        restore = lambda: _postgresql_restore(engine, index_statements, constraint_statements)
+    else:
+        raise ValueError(f"Index suspension is not supported for {engine.dialect.name}")
+
+    try:
+        yield
+    finally:
+        restore()
+        get_reflection_cache(engine).invalidate(table_name, schema=schema)
@@ -0,0 +1,354 @@
+import datetime
+import json
+import re
+
+import sqlalchemy as sa
+
+from keepdataflow.database_operations.table_swap import (
+    build_keys_and_indexes,
+    create_shadow_table,
+    qualified_name,
+    rename_table,
+    restore_index_names,
+)
+from keepdataflow.reflection_cache import get_reflection_cache
+
+PARTITION_CHECK_NAME = "ck_kdf_partition"
+
+
+def _mssql_literal(value):
+    """Render a partition boundary value as a language-independent T-SQL literal."""
+    if isinstance(value, datetime.datetime):
+        return f"'{value.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]}'"
+    if isinstance(value, datetime.date):
+        return f"'{value.strftime('%Y%m%d')}'"
+    if isinstance(value, str):
+        return "N'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def _range_filter(column, lower, upper, lower_operator, upper_operator, nulls=False):
+    """
+    Render the source predicate that selects the rows of a range partition, with its parameters.
+
+    Examples
+    --------
+    >>> _range_filter("sale_date", 1, 10, ">=", "<")
+    ('sale_date >= :partition_lower AND sale_date < :partition_upper', {'partition_lower': 1, 'partition_upper': 10})
+    >>> _range_filter("sale_date", None, 10, ">", "<=", nulls=True)
+    ('sale_date IS NULL OR (sale_date <= :partition_upper)', {'partition_upper': 10})
+    >>> _range_filter("sale_date", None, None, ">=", "<")
+    (None, {})
+    """
+    conditions, parameters = [], {}
+    if lower is not None:
+        conditions.append(f"{column} {lower_operator} :partition_lower")
+        parameters["partition_lower"] = lower
+    if upper is not None:
+        conditions.append(f"{column} {upper_operator} :partition_upper")
+        parameters["partition_upper"] = upper
+    predicate = " AND ".join(conditions)
+    if predicate and nulls:
+        predicate = f"{column} IS NULL OR ({predicate})"
+    return predicate or None, parameters
+
+
+def _mssql_partition(conn, table_spec, partition_value):
+    """Find the partition of a SQL Server table that holds `partition_value`."""
+    scheme = conn.execute(
+        sa.text(
+            "SELECT ps.data_space_id, pf.name, pf.function_id, pf.boundary_value_on_right, c.name "
+            "FROM sys.indexes AS i "
+            "JOIN sys.partition_schemes AS ps ON ps.data_space_id = i.data_space_id "
+            "JOIN sys.partition_functions AS pf ON pf.function_id = ps.function_id "
+            "JOIN sys.index_columns AS ic "
+            "ON ic.object_id = i.object_id AND ic.index_id = i.index_id AND ic.partition_ordinal = 1 "
+            "JOIN sys.columns AS c ON c.object_id = ic.object_id AND c.column_id = ic.column_id "
+            "WHERE i.object_id = OBJECT_ID(:table_spec) AND i.index_id IN (0, 1)"
+        ),
+        {"table_spec": table_spec},
+    ).one_or_none()
+    if scheme is None:
+        raise ValueError(f"{table_spec} is not a partitioned table")
+    scheme_id, function_name, function_id, range_right, column = scheme
+
+    preparer = conn.dialect.identifier_preparer
+    number = conn.execute(
+        sa.text(f"SELECT $PARTITION.{preparer.quote(function_name)}(:value)"), {"value": partition_value}
+    ).scalar_one()
+    filegroup = conn.execute(
+        sa.text(
+            "SELECT fg.name FROM sys.destination_data_spaces AS dds "
+            "JOIN sys.filegroups AS fg ON fg.data_space_id = dds.data_space_id "
+            "WHERE dds.partition_scheme_id = :scheme_id AND dds.destination_id = :number"
+        ),
+        {"scheme_id": scheme_id, "number": number},
+    ).scalar_one()
+    boundaries = dict(
+        conn.execute(
+            sa.text(
+                "SELECT boundary_id, value FROM sys.partition_range_values "
+                "WHERE function_id = :function_id AND boundary_id IN (:lower, :upper)"
+            ),
+            {"function_id": function_id, "lower": number - 1, "upper": number},
+        ).all()
+    )
+
+    # Boundary n separates partitions n and n + 1; RANGE RIGHT boundaries belong to the partition above
+    quoted_column = preparer.quote(column)
+    conditions = []
+    if number - 1 in boundaries:
+        operator = ">=" if range_right else ">"
+        conditions.append(f"{quoted_column} {operator} {_mssql_literal(boundaries[number - 1])}")
+        # NULLs always belong to the first partition, and a CHECK lets NULL through
+        conditions.append(f"{quoted_column} IS NOT NULL")
+    if number in boundaries:
+        operator = "<" if range_right else "<="
+        conditions.append(f"{quoted_column} {operator} {_mssql_literal(boundaries[number])}")
+
+    source_filter = _range_filter(
+        column,
+        boundaries.get(number - 1),
+        boundaries.get(number),
+        ">=" if range_right else ">",
+        "<" if range_right else "<=",
+        nulls=number - 1 not in boundaries,
+    )
+    return {
+        "number": number,
+        "filegroup": filegroup,
+        "check": " AND ".join(conditions) or "1 = 1",
+        "source_filter": source_filter,
+    }
+
+
+def _postgresql_source_filter(conn, table_spec, column, bound):
+    """Turn the bound of a PostgreSQL partition into a source predicate and its parameters."""
+    key_type = conn.execute(
+        sa.text(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = CAST(:table_spec AS regclass) AND attname = :column"
+        ),
+        {"table_spec": table_spec, "column": column},
+    ).scalar_one()
+
+    # The bounds are literals rendered by PostgreSQL, so casting them to the key's type gives back the values
+    range_bound = re.fullmatch(r"FOR VALUES FROM \((.+)\) TO \((.+)\)", bound)
+    if range_bound:
+        lower, upper = (
+            "NULL" if literal in ("MINVALUE", "MAXVALUE") else f"CAST({literal} AS {key_type})"
+            for literal in range_bound.groups()
+        )
+        lower, upper = conn.execute(sa.text(f"SELECT {lower}, {upper}".replace(":", "\\:"))).one()
+        return _range_filter(column, lower, upper, ">=", "<")
+
+    list_bound = re.fullmatch(r"FOR VALUES IN \((.+)\)", bound)
+    if list_bound:
+        values = (
+            conn.execute(
+                sa.text(f"SELECT unnest(CAST(ARRAY[{list_bound.group(1)}] AS {key_type}[]))".replace(":", "\\:"))
+            )
+            .scalars()
+            .all()
+        )
+        parameters = {f"partition_value_{n}": value for n, value in enumerate(values) if value is not None}
+        conditions = []
+        if parameters:
+            conditions.append(f"{column} IN ({', '.join(f':{name}' for name in parameters)})")
+        if None in values:
+            conditions.append(f"{column} IS NULL")
+        return " OR ".join(conditions), parameters
+
+    raise ValueError(f"The rows of a partition {bound} cannot be selected from the source")
+
+
+def _postgresql_partition(conn, table_spec, partition_value):
+    """Find the partition of a PostgreSQL table that holds `partition_value`."""
+    key = conn.execute(
+        sa.text("SELECT pg_get_partkeydef(CAST(:table_spec AS regclass))"), {"table_spec": table_spec}
+    ).scalar_one()
+    match = re.fullmatch(r"\w+ \((\w+|\"[^\"]+\")\)", key or "")
+    if match is None:
+        raise ValueError(f"{table_spec} is not partitioned on a single column")
+
+    # The planner prunes every partition that cannot hold the value; the one it keeps is the target
+    plan = conn.execute(
+        sa.text(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM {table_spec} WHERE {match.group(1)} = :value"),
+        {"value": partition_value},
+    ).scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    relations = []
+    nodes = [plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if "Relation Name" in node:
+            relations.append((node.get("Schema"), node["Relation Name"]))
+        nodes.extend(node.get("Plans", []))
+    if len(relations) != 1:
+        raise ValueError(f"No single partition of {table_spec} holds {partition_value!r}")
+    partition_schema, partition_name = relations[0]
+    column = match.group(1)
+    if column.startswith('"'):
+        column = column[1:-1].replace('""', '"')
+
+    bound, check = conn.execute(
+        sa.text(
+            "SELECT pg_get_expr(c.relpartbound, c.oid), pg_get_partition_constraintdef(c.oid) "
+            "FROM pg_class AS c WHERE c.oid = CAST(:partition AS regclass)"
+        ),
+        {"partition": qualified_name(conn, partition_name, partition_schema)},
+    ).one()
+    return {
+        "name": partition_name,
+        "schema": partition_schema,
+        "bound": bound,
+        "check": check,
+        "source_filter": _postgresql_source_filter(conn, table_spec, column, bound),
+    }
+
+
+def find_partition(engine, table_name, partition_value, schema=None):
+    """
+    Describe the partition of `table_name` that holds `partition_value`.
+
+    Besides what `prepare_partition_stage` needs, the description holds the partition's bounds
+    as a ``(predicate, parameters)`` pair under ``"source_filter"``: a WHERE predicate on the
+    partitioning column, with bind parameters for the bound values, that selects the source
+    rows belonging in the partition. The predicate is None when the partition holds every row.
+    Default and hash partitions of PostgreSQL tables are not supported.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The destination engine (SQL Server or PostgreSQL).
+    table_name : str
+        The partitioned table.
+    partition_value : Any
+        A value of the partitioning column inside the partition, e.g. a date in the month.
+    schema : str, optional
+        The schema of the partitioned table.
+
+    Returns
+    -------
+    dict
+        The description of the partition.
+    """
+    table_spec = qualified_name(engine, table_name, schema)
+    with engine.connect() as conn:
+        if engine.dialect.name == "mssql":
+            return _mssql_partition(conn, table_spec, partition_value)
+        if engine.dialect.name == "postgresql":
+            return _postgresql_partition(conn, table_spec, partition_value)
+    raise ValueError(f"Partition refresh is not supported for {engine.dialect.name}")
+
+
+def prepare_partition_stage(engine, table_name, partition_value, schema=None, partition=None):
+    """
+    Create an empty standalone table to load one partition of `table_name` into.
+
+    The partition is the one that holds `partition_value`. The stage table gets the partition's
+    columns and a CHECK constraint matching the partition's bounds, so rows outside the
+    partition are rejected while loading and the exchange in `switch_partition` needs no
+    validation scan. On SQL Server the stage table is created on the partition's filegroup,
+    as ALTER TABLE ... SWITCH requires.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The destination engine (SQL Server or PostgreSQL).
+    table_name : str
+        The partitioned table.
+    partition_value : Any
+        A value of the partitioning column inside the partition to refresh, e.g. a date in the month.
+    schema : str, optional
+        The schema of the partitioned table.
+    partition : dict, optional
+        The partition as already described by `find_partition`, to save looking it up again.
+
+    Returns
+    -------
+    dict
+        A description of the partition and stage table, with the stage table's name under
+        ``"stage_table"``, to pass to `switch_partition` or `drop_partition_stage`.
+    """
+    table_spec = qualified_name(engine, table_name, schema)
+    if partition is None:
+        partition = find_partition(engine, table_name, partition_value, schema)
+
+    if engine.dialect.name == "mssql":
+        stage_table = f"{table_name[:48]}_kdf_p{partition['number']}"
+        stage_spec = qualified_name(engine, stage_table, schema)
+        preparer = engine.dialect.identifier_preparer
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"DROP TABLE IF EXISTS {stage_spec}")
+            conn.exec_driver_sql(
+                f"SELECT TOP 0 * INTO {stage_spec} ON {preparer.quote(partition['filegroup'])} FROM {table_spec}"
+            )
+            conn.exec_driver_sql(
+                f"ALTER TABLE {stage_spec} WITH CHECK ADD CONSTRAINT {PARTITION_CHECK_NAME} CHECK ({partition['check']})"
+            )
+    else:
+        stage_table = create_shadow_table(engine, partition["name"], partition["schema"])
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                f"ALTER TABLE {qualified_name(engine, stage_table, partition['schema'])} "
+                f"ADD CONSTRAINT {PARTITION_CHECK_NAME} CHECK ({partition['check']})"
+            )
+
+    return {**partition, "stage_table": stage_table}
+
+
+def drop_partition_stage(engine, stage, schema=None):
+    """Drop the stage table of a partition refresh, e.g. after a failed load."""
+    stage_schema = stage.get("schema", schema)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {qualified_name(engine, stage['stage_table'], stage_schema)}")
+
+
+def switch_partition(engine, table_name, stage, schema=None):
+    """
+    Index a loaded stage table and exchange it for its partition of `table_name`.
+
+    The keys and indexes are built on the stage table first. The exchange then only changes
+    metadata, so it costs the I/O of one partition, not of the whole table.
+
+    On SQL Server, the stage table gets the partitioned table's keys and indexes. In one
+    transaction the partition is truncated with TRUNCATE TABLE ... WITH (PARTITIONS (n)), the
+    stage table is switched in with ALTER TABLE ... SWITCH TO ... PARTITION n and then dropped.
+
+    On PostgreSQL, the stage table gets the keys and indexes of the current partition; ATTACH
+    PARTITION adopts them as the partitions of the parent's indexes. In one transaction the old
+    partition is detached and dropped, the stage table is attached with the same bounds and
+    renamed to the partition's name, and the key and index names are restored.
+
+    Tables with IDENTITY or serial columns, and partitions referenced by foreign keys, are not
+    supported.
+    """
+    reflection = get_reflection_cache(engine)
+    table_spec = qualified_name(engine, table_name, schema)
+
+    if engine.dialect.name == "mssql":
+        stage_spec = qualified_name(engine, stage["stage_table"], schema)
+        build_keys_and_indexes(engine, table_name, stage["stage_table"], schema)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"TRUNCATE TABLE {table_spec} WITH (PARTITIONS ({stage['number']}))")
+            conn.exec_driver_sql(f"ALTER TABLE {stage_spec} SWITCH TO {table_spec} PARTITION {stage['number']}")
+            conn.exec_driver_sql(f"DROP TABLE {stage_spec}")
+    else:
+        partition_schema = stage["schema"]
+        partition_spec = qualified_name(engine, stage["name"], partition_schema)
+        stage_spec = qualified_name(engine, stage["stage_table"], partition_schema)
+        renames = build_keys_and_indexes(engine, stage["name"], stage["stage_table"], partition_schema)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(f"ALTER TABLE {table_spec} DETACH PARTITION {partition_spec}")
+            conn.exec_driver_sql(f"DROP TABLE {partition_spec}")
+            conn.exec_driver_sql(f"ALTER TABLE {table_spec} ATTACH PARTITION {stage_spec} {stage['bound']}")
+            rename_table(conn, stage["stage_table"], stage["name"], partition_schema)
+            restore_index_names(conn, stage["name"], renames, partition_schema)
+            # The partition bound enforces the same rule from now on
+            conn.exec_driver_sql(f"ALTER TABLE {partition_spec} DROP CONSTRAINT {PARTITION_CHECK_NAME}")
+        reflection.invalidate(stage["name"], schema=partition_schema)
+        reflection.invalidate(stage["stage_table"], schema=partition_schema)
+
+    reflection.invalidate(table_name, schema=schema)
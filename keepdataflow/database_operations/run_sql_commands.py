@@ -1,11 +1,13 @@
 from sqlalchemy.engine import Engine
-from typing import Dict, Any, Optional, Literal, List
+from typing import Dict, Any, Optional, Literal, List, Union
 from sqlalchemy import text
 import os
 
+from keepdataflow.engine_registry import get_engine
+
 
 def run_stored_procedure(
-    engine: Engine,
+    engine: Union[Engine, str],
     procedure_name: str,
     params: Optional[Dict[str, Any]] = None,
     on_fail: Literal["continue", "fail"] = "fail",
@@ -14,7 +16,7 @@ def run_stored_procedure(
     Executes a stored procedure using SQLAlchemy, adapting to the DBMS.
 
     Args:
-        engine: SQLAlchemy engine or connection.
+        engine: SQLAlchemy engine, or a connection URL resolved through the shared engine registry.
         procedure_name (str): Name of the stored procedure.
         params (dict or None): Parameters for the stored procedure.
         on_fail (str): "continue" to continue on failure, "fail" to raise exception.
@@ -25,6 +27,8 @@ def run_stored_procedure(
     if params is None:
         params = {}
 
+    engine = get_engine(engine)
+
     # Detect DBMS
     dbms = engine.dialect.name.lower()
 
@@ -68,7 +72,7 @@ def run_stored_procedure(
 
 
 def run_sql_query(
-    engine: Engine,
+    engine: Union[Engine, str],
     sql_file: Optional[str] = None,
     sql_text: Optional[str] = None,
     params: Optional[Dict[str, Any]] = None,
@@ -78,7 +82,7 @@ def run_sql_query(
     Executes a SQL query or command using SQLAlchemy, from a .sql file or a string.
 
     Args:
-        engine: SQLAlchemy engine or connection.
+        engine: SQLAlchemy engine, or a connection URL resolved through the shared engine registry.
         sql_file (str, optional): Path to a .sql file containing the query.
         sql_text (str, optional): SQL query as a string.
         params (dict or None): Parameters for the SQL query.
@@ -103,6 +107,8 @@ def run_sql_query(
     if params is None:
         params = {}
 
+    engine = get_engine(engine)
+
     results = []
     try:
         with engine.connect() as conn:
@@ -0,0 +1,304 @@
+import uuid
+
+import sqlalchemy as sa
+
+from keepdataflow.reflection_cache import get_reflection_cache
+
+SWAP_DIALECTS = ("mssql", "postgresql")
+
+# Permissions, dependent objects and triggers of a table, which a swap cannot carry over
+_SWAP_BLOCKERS = {
+    "mssql": """
+        SELECT
+            (SELECT COUNT(*) FROM sys.database_permissions WHERE class = 1 AND major_id = OBJECT_ID(:name)),
+            (SELECT COUNT(*) FROM sys.foreign_keys
+             WHERE referenced_object_id = OBJECT_ID(:name) AND parent_object_id <> OBJECT_ID(:name))
+            + (SELECT COUNT(*) FROM sys.sql_expression_dependencies
+               WHERE referenced_id = OBJECT_ID(:name) AND is_schema_bound_reference = 1),
+            (SELECT COUNT(*) FROM sys.triggers WHERE parent_id = OBJECT_ID(:name))
+    """,
+    "postgresql": """
+        SELECT
+            (SELECT COUNT(*) FROM pg_class AS c, aclexplode(c.relacl) AS a
+             WHERE c.oid = to_regclass(:name) AND a.grantee <> c.relowner),
+            (SELECT COUNT(*) FROM pg_constraint
+             WHERE confrelid = to_regclass(:name) AND contype = 'f' AND conrelid <> to_regclass(:name))
+            + (SELECT COUNT(DISTINCT r.ev_class) FROM pg_depend AS d JOIN pg_rewrite AS r ON r.oid = d.objid
+               WHERE d.classid = CAST('pg_rewrite' AS regclass) AND d.refobjid = to_regclass(:name)
+               AND r.ev_class <> to_regclass(:name)),
+            (SELECT COUNT(*) FROM pg_trigger WHERE tgrelid = to_regclass(:name) AND NOT tgisinternal)
+    """,
+}
+
+
+def shadow_table_name(table_name):
+    """Return the name of the shadow table a swap refresh of `table_name` loads into."""
+    # PostgreSQL truncates identifiers at 63 characters
+    return f"{table_name[:48]}_kdf_shadow"
+
+
+def qualified_name(engine, name, schema=None):
+    """Return the quoted, optionally schema-qualified name of a table for `engine`'s dialect."""
+    preparer = engine.dialect.identifier_preparer
+    if schema:
+        return f"{preparer.quote_schema(schema)}.{preparer.quote(name)}"
+    return preparer.quote(name)
+
+
+def drop_shadow_table(engine, shadow_name, schema=None):
+    """Drop a shadow table, e.g. one left behind by a failed load."""
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {qualified_name(engine, shadow_name, schema)}")
+
+
+def swap_blockers(engine, table_name, schema=None):
+    """
+    Return what a swap refresh of `table_name` could not carry over to the new table.
+
+    The new table gets the live table's columns, keys, indexes, CHECK constraints and foreign
+    keys. Identity and serial columns, whose counters belong to the live table, permissions
+    granted on the live table, its triggers, and views and foreign keys of other tables that
+    depend on it are not carried over; each one found is described in the returned list.
+    """
+    reasons = []
+    generated = [
+        column["name"]
+        for column in get_reflection_cache(engine).get_columns(table_name, schema=schema)
+        if column.get("identity") or "nextval(" in str(column.get("default") or "")
+    ]
+    if generated:
+        reasons.append(f"identity or serial columns {', '.join(generated)}")
+
+    with engine.connect() as conn:
+        grants, dependents, triggers = conn.execute(
+            sa.text(_SWAP_BLOCKERS[engine.dialect.name]), {"name": qualified_name(engine, table_name, schema)}
+        ).one()
+    if grants:
+        reasons.append(f"{grants} granted permissions")
+    if dependents:
+        reasons.append(f"{dependents} dependent views or referencing foreign keys")
+    if triggers:
+        reasons.append(f"{triggers} triggers")
+    return reasons
+
+
+def create_shadow_table(engine, table_name, schema=None):
+    """
+    Create an empty shadow table with the columns of `table_name` and return its name.
+
+    The shadow table has the live table's column names, types, nullability and server defaults,
+    but no keys, indexes or constraints yet, so rows load into a bare heap. They are built by
+    `swap_shadow_table` once the load is complete. Tables with anything the swap cannot carry
+    over (see `swap_blockers`) are refused before anything is loaded.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The destination engine (SQL Server or PostgreSQL).
+    table_name : str
+        The live table that will be replaced.
+    schema : str, optional
+        The schema of the live table.
+
+    Returns
+    -------
+    str
+        The name of the shadow table, in the same schema as the live table.
+
+    Raises
+    ------
+    ValueError
+        If the dialect is not supported, or the swap would lose part of the live table's definition.
+    """
+    if engine.dialect.name not in SWAP_DIALECTS:
+        raise ValueError(f"Swap refresh is not supported for {engine.dialect.name}")
+    blockers = swap_blockers(engine, table_name, schema)
+    if blockers:
+        raise ValueError(
+            f"Swap refresh of {table_name} would not carry over its {'; '.join(blockers)}. "
+            "Use refresh_mode='delete' instead."
+        )
+
+    shadow_name = shadow_table_name(table_name)
+    columns = []
+    for column in get_reflection_cache(engine).get_columns(table_name, schema=schema):
+        server_default = None
+        if column.get("default") is not None and column.get("autoincrement") is not True:
+            server_default = sa.text(column["default"])
+        columns.append(
+            sa.Column(
+                column["name"], column["type"], nullable=column.get("nullable", True), server_default=server_default
+            )
+        )
+    shadow = sa.Table(shadow_name, sa.MetaData(), *columns, schema=schema)
+
+    # A shadow table left by an earlier failed refresh is replaced
+    drop_shadow_table(engine, shadow_name, schema)
+    with engine.begin() as conn:
+        conn.execute(sa.schema.CreateTable(shadow))
+    return shadow_name
+
+
+def rename_table(conn, table_name, new_name, schema=None):
+    if conn.dialect.name == "mssql":
+        conn.execute(
+            sa.text("EXEC sp_rename :old, :new"), {"old": qualified_name(conn, table_name, schema), "new": new_name}
+        )
+    else:
+        new_name = conn.dialect.identifier_preparer.quote(new_name)
+        conn.exec_driver_sql(f"ALTER TABLE {qualified_name(conn, table_name, schema)} RENAME TO {new_name}")
+
+
+def _rename_index(conn, table_name, index_name, new_name, schema=None, constraint=False):
+    preparer = conn.dialect.identifier_preparer
+    if conn.dialect.name == "mssql":
+        if constraint:
+            # Key constraints are schema-scoped objects on SQL Server
+            old, kind = qualified_name(conn, index_name, schema), "OBJECT"
+        else:
+            old, kind = f"{qualified_name(conn, table_name, schema)}.{preparer.quote(index_name)}", "INDEX"
+        conn.execute(sa.text("EXEC sp_rename :old, :new, :kind"), {"old": old, "new": new_name, "kind": kind})
+    elif constraint:
+        conn.exec_driver_sql(
+            f"ALTER TABLE {qualified_name(conn, table_name, schema)} "
+            f"RENAME CONSTRAINT {preparer.quote(index_name)} TO {preparer.quote(new_name)}"
+        )
+    else:
+        conn.exec_driver_sql(
+            f"ALTER INDEX {qualified_name(conn, index_name, schema)} RENAME TO {preparer.quote(new_name)}"
+        )
+
+
+def build_keys_and_indexes(engine, table_name, target_name, schema=None):
+    """
+    Rebuild the primary key, indexes, CHECK constraints and foreign keys of `table_name` on `target_name`.
+
+    The definitions are read from the reflection cache and created with SQLAlchemy DDL under
+    temporary names, since key and index names are unique per schema. Foreign keys that refer to
+    `table_name` itself refer to `target_name` instead. Returns the
+    ``(temporary_name, original_name, is_constraint)`` renames for `restore_index_names` to
+    apply once the original table is gone.
+    """
+    reflection = get_reflection_cache(engine)
+    primary_key = reflection.get_pk_constraint(table_name, schema=schema)
+    indexes = reflection.get_indexes(table_name, schema=schema)
+    check_constraints = reflection.get_check_constraints(table_name, schema=schema)
+    foreign_keys = reflection.get_foreign_keys(table_name, schema=schema)
+
+    token = uuid.uuid4().hex[:8]
+    renames = []
+    target_indexes = []
+    for number, index in enumerate(indexes):
+        temp_name = f"ix_kdf_{token}_{number}"
+        # Plain columns are reflected by name; expression index parts only as SQL text
+        expressions = [
+            col if col is not None else sa.text(expression)
+            for col, expression in zip(index["column_names"], index.get("expressions") or index["column_names"])
+        ]
+        target_indexes.append(
+            sa.Index(temp_name, *expressions, unique=index.get("unique", False), **index.get("dialect_options", {}))
+        )
+        renames.append((temp_name, index["name"], False))
+
+    metadata = sa.MetaData()
+    target = sa.Table(target_name, metadata, *target_indexes, schema=schema, autoload_with=engine)
+
+    constraints = []
+    for number, check in enumerate(check_constraints):
+        temp_name = f"ck_kdf_{token}_{number}"
+        constraints.append(sa.CheckConstraint(sa.text(check["sqltext"]), name=temp_name))
+        if check.get("name"):
+            renames.append((temp_name, check["name"], True))
+    for number, foreign_key in enumerate(foreign_keys):
+        temp_name = f"fk_kdf_{token}_{number}"
+        referred_schema = foreign_key.get("referred_schema")
+        referred_table = foreign_key["referred_table"]
+        if referred_table == table_name and referred_schema in (None, schema):
+            referred = target
+        else:
+            # Only the referred column names are needed for the DDL
+            referred = sa.Table(
+                referred_table,
+                metadata,
+                *[sa.Column(col) for col in foreign_key["referred_columns"]],
+                schema=referred_schema,
+                extend_existing=True,
+            )
+        constraints.append(
+            sa.ForeignKeyConstraint(
+                [target.c[col] for col in foreign_key["constrained_columns"]],
+                [referred.c[col] for col in foreign_key["referred_columns"]],
+                name=temp_name,
+                **foreign_key.get("options", {}),
+            )
+        )
+        if foreign_key.get("name"):
+            renames.append((temp_name, foreign_key["name"], True))
+
+    with engine.begin() as conn:
+        if primary_key.get("constrained_columns"):
+            temp_name = f"pk_kdf_{token}"
+            constraint = sa.PrimaryKeyConstraint(
+                *[target.c[col] for col in primary_key["constrained_columns"]],
+                name=temp_name,
+                **primary_key.get("dialect_options", {}),
+            )
+            target.append_constraint(constraint)
+            conn.execute(sa.schema.AddConstraint(constraint))
+            if primary_key.get("name"):
+                renames.append((temp_name, primary_key["name"], True))
+
+        for index in target_indexes:
+            conn.execute(sa.schema.CreateIndex(index))
+
+        # Constraints are checked in one pass over the loaded rows, after the indexes they can use
+        for constraint in constraints:
+            target.append_constraint(constraint)
+            conn.execute(sa.schema.AddConstraint(constraint))
+
+    return renames
+
+
+def restore_index_names(conn, table_name, renames, schema=None):
+    """Give the keys, indexes and constraints built by `build_keys_and_indexes` their original names."""
+    for temp_name, original_name, is_constraint in renames:
+        _rename_index(conn, table_name, temp_name, original_name, schema, constraint=is_constraint)
+
+
+def swap_shadow_table(engine, table_name, shadow_name, schema=None):
+    """
+    Index a loaded shadow table and swap it in place of the live table.
+
+    The live table's primary key, indexes, CHECK constraints and foreign keys are rebuilt on the
+    shadow table under temporary names while readers still use the live table. In a single short
+    transaction, the live table is then renamed out of the way, the shadow table takes its name,
+    the old table is dropped, and the keys and indexes get their original names back. Readers are only held up for that
+    metadata change. The reflection cache entries of both tables are invalidated afterwards.
+
+    Tables with identity or serial columns, permissions, triggers or dependent views and foreign
+    keys are refused by `create_shadow_table` before the load, since the swap would lose them.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The destination engine (SQL Server or PostgreSQL).
+    table_name : str
+        The live table to replace.
+    shadow_name : str
+        The loaded shadow table created by `create_shadow_table`.
+    schema : str, optional
+        The schema of both tables.
+    """
+    renames = build_keys_and_indexes(engine, table_name, shadow_name, schema)
+
+    retired_name = f"{table_name[:48]}_kdf_retired"
+    with engine.begin() as conn:
+        rename_table(conn, table_name, retired_name, schema)
+        rename_table(conn, shadow_name, table_name, schema)
+        # Dropping the old table frees the names of its keys and indexes
+        conn.exec_driver_sql(f"DROP TABLE {qualified_name(conn, retired_name, schema)}")
+        restore_index_names(conn, table_name, renames, schema)
+
+    reflection = get_reflection_cache(engine)
+    reflection.invalidate(table_name, schema=schema)
+    reflection.invalidate(shadow_name, schema=schema)
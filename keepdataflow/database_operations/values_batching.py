@@ -0,0 +1,54 @@
+import functools
+
+# Maximum number of bind parameters a single statement may carry, by SQLAlchemy dialect name
+BIND_PARAMETER_LIMITS = {
+    "mssql": 2099,  # documented as 2100, one is kept spare for the driver
+    "sqlite": 32766,
+    "postgresql": 65535,
+    "mysql": 65535,
+    "oracle": 65535,
+}
+
+# Dialects that also cap the number of rows in a table value constructor
+VALUES_ROW_LIMITS = {
+    "mssql": 1000,
+}
+
+# Used for dialects without a known limit; SQLite's historic default is a safe lower bound
+DEFAULT_BIND_PARAMETER_LIMIT = 999
+
+
+def values_batch_rows(dialect_name, column_count):
+    """
+    Return how many rows fit in one multi-row INSERT ... VALUES statement.
+
+    Examples
+    --------
+    >>> values_batch_rows("mssql", 6)
+    349
+    >>> values_batch_rows("mssql", 1)
+    1000
+    >>> values_batch_rows("sqlite", 6)
+    5461
+    """
+    limit = BIND_PARAMETER_LIMITS.get(dialect_name, DEFAULT_BIND_PARAMETER_LIMIT)
+    rows = max(limit // max(column_count, 1), 1)
+    return min(rows, VALUES_ROW_LIMITS.get(dialect_name, rows))
+
+
+@functools.lru_cache(maxsize=256)
+def values_statement(table_spec, columns, row_count, placeholder):
+    """
+    Render a multi-row INSERT ... VALUES statement for `row_count` rows of `columns`.
+
+    Statements are cached by shape. Every full batch of a load reuses the same text, so it is
+    rendered once and the driver can keep reusing its prepared statement; only a final short
+    batch needs a new one.
+
+    Examples
+    --------
+    >>> values_statement("dbo.human", ("ItemID", "Quantity"), 2, "?")
+    'INSERT INTO dbo.human (ItemID, Quantity) VALUES (?, ?), (?, ?)'
+    """
+    row = f"({', '.join([placeholder] * len(columns))})"
+    return f"INSERT INTO {table_spec} ({', '.join(columns)}) VALUES {', '.join([row] * row_count)}"
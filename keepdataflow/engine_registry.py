@@ -0,0 +1,99 @@
+import threading
+
+import sqlalchemy as sa
+from sqlalchemy.engine import URL
+
+# Pool settings applied to engines created by the registry; see configure_engines
+_pool_defaults = {
+    "pool_size": None,
+    "max_overflow": None,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+}
+
+# URL -> (engine, the pool settings it was created with)
+_engines = {}
+_lock = threading.Lock()
+
+
+def configure_engines(**pool_options):
+    """
+    Change the pool settings used for engines the registry creates from now on.
+
+    Accepts ``pool_size``, ``max_overflow``, ``pool_pre_ping`` and ``pool_recycle``. A value of
+    None leaves the SQLAlchemy default in place. Engines that already exist keep their pools.
+    """
+    unknown = set(pool_options) - set(_pool_defaults)
+    if unknown:
+        raise ValueError(f"Unsupported pool options: {sorted(unknown)}")
+    with _lock:
+        _pool_defaults.update(pool_options)
+
+
+def get_engine(connection_url, **pool_options):
+    """
+    Return the process-wide engine for `connection_url`, creating it with `pool_options` on first use.
+
+    Every part of keepdataflow that connects to a database goes through this registry, so
+    repeated run_transfers calls, factories and SQL helpers share one engine and its warm
+    connection pool per URL instead of paying for a new login and pool each time. Later callers
+    get that engine whatever pool options they pass, as long as they do not conflict with it: a
+    ``pool_size`` is met by any pool at least that large, other options must match the ones the
+    engine was created with.
+
+    Parameters
+    ----------
+    connection_url : str or sqlalchemy.engine.URL
+        The database URL. Anything else, such as an existing Engine, is returned unchanged.
+    **pool_options
+        Overrides of the configured pool settings.
+
+    Returns
+    -------
+    sqlalchemy.engine.Engine
+
+    Raises
+    ------
+    ValueError
+        If the engine for the URL already exists with a smaller pool or other pool settings; call
+        `dispose_engines` first to replace it.
+    """
+    if not isinstance(connection_url, (str, URL)):
+        return connection_url
+
+    url = sa.engine.make_url(connection_url)
+    key = url.render_as_string(hide_password=False)
+
+    with _lock:
+        if key not in _engines:
+            options = {**_pool_defaults, **pool_options}
+            # Only pass what was set; not every pool class accepts every option
+            engine = sa.create_engine(url, **{name: value for name, value in options.items() if value is not None})
+            _engines[key] = (engine, options)
+            return engine
+
+        engine, options = _engines[key]
+    conflicts = {name: value for name, value in pool_options.items() if not _satisfies(engine, options, name, value)}
+    if conflicts:
+        raise ValueError(
+            f"The engine for {url.render_as_string(hide_password=True)} already exists and does not meet the pool "
+            f"settings {conflicts}; call dispose_engines() first to replace it"
+        )
+    return engine
+
+
+def _satisfies(engine, options, name, value):
+    """Return True if an engine created with `options` serves a caller asking for pool option `name`=`value`."""
+    if name == "pool_size" and value is not None:
+        # Other pools, e.g. NullPool, open a connection whenever one is needed
+        return not isinstance(engine.pool, sa.pool.QueuePool) or engine.pool.size() >= value
+    return options.get(name) == value
+
+
+def dispose_engines():
+    """Close the pooled connections of every registered engine and empty the registry."""
+    with _lock:
+        engines = [engine for engine, _ in _engines.values()]
+        _engines.clear()
+    for engine in engines:
+        engine.dispose()
@@ -0,0 +1,235 @@
+import bisect
+import contextvars
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the phase duration histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+COUNTERS = {
+    "rows": "Rows loaded into the destination table.",
+    "bytes": "Estimated in-memory size of the batches loaded into the destination table.",
+    "batches": "Batches loaded into the destination table.",
+    "retries": "Transfers resumed from the checkpoint of an interrupted run.",
+}
+
+PHASES = ("extract", "stage", "merge", "commit")
+
+_current_table = contextvars.ContextVar("keepdataflow_metrics_table", default=None)
+
+
+class TransferMetrics:
+    """
+    Per-table counters and phase duration histograms of the transfers in this process.
+
+    Counters (see `COUNTERS`) count rows, bytes, batches and retries. Histograms record how
+    long each phase of a load took:
+
+    * extract: waiting for the next batch from the source,
+    * stage: sending rows to the destination, into a staging table or, for appends, the table itself,
+    * merge: the statement that applies staged rows to the table (MERGE, INSERT ... ON CONFLICT),
+    * commit: committing the load's transaction.
+
+    Every observation is also passed to the callbacks registered with `add_callback`, as
+    ``callback(name, value, labels)``, and the totals can be written as an OpenMetrics text file
+    with `write_openmetrics`.
+
+    Parameters
+    ----------
+    buckets : tuple of float, optional
+        Upper bounds of the histogram buckets in seconds. Default is `DEFAULT_BUCKETS`.
+
+    Examples
+    --------
+    >>> metrics = TransferMetrics(buckets=(0.1, 1.0))
+    >>> metrics.increment("rows", "dbo.orders", 500)
+    >>> metrics.observe("merge", "dbo.orders", 0.4)
+    >>> metrics.counter("rows", "dbo.orders")
+    500
+    >>> print(metrics.render())  # doctest: +ELLIPSIS
+    # TYPE keepdataflow_rows counter
+    ...
+    keepdataflow_rows_total{table="dbo.orders"} 500
+    ...
+    keepdataflow_phase_duration_seconds_bucket{table="dbo.orders",phase="merge",le="1.0"} 1
+    ...
+    # EOF
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counters = {}
+        self._histograms = {}
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def add_callback(self, callback):
+        """Call ``callback(name, value, labels)`` for every counter increment and phase duration from now on."""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        with self._lock:
+            self._callbacks.remove(callback)
+
+    def increment(self, name, table, value=1):
+        """Add `value` to the counter `name` of `table`."""
+        if name not in COUNTERS:
+            raise ValueError(f"Unknown counter: {name}")
+        with self._lock:
+            self._counters[(name, table)] = self._counters.get((name, table), 0) + value
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback(name, value, {"table": table})
+
+    def observe(self, phase, table, seconds):
+        """Record that `phase` of a load into `table` took `seconds`."""
+        if phase not in PHASES:
+            raise ValueError(f"Unknown phase: {phase}")
+        with self._lock:
+            histogram = self._histograms.get((phase, table))
+            if histogram is None:
+                histogram = self._histograms[(phase, table)] = {
+                    "count": 0,
+                    "sum": 0.0,
+                    "buckets": [0] * len(self.buckets),
+                }
+            histogram["count"] += 1
+            histogram["sum"] += seconds
+            position = bisect.bisect_left(self.buckets, seconds)
+            if position < len(self.buckets):
+                histogram["buckets"][position] += 1
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback("phase_duration_seconds", seconds, {"table": table, "phase": phase})
+
+    def counter(self, name, table):
+        """Return the current value of the counter `name` of `table`."""
+        with self._lock:
+            return self._counters.get((name, table), 0)
+
+    def histogram(self, phase, table):
+        """Return the count and sum of the durations recorded for `phase` of `table`."""
+        with self._lock:
+            histogram = self._histograms.get((phase, table), {"count": 0, "sum": 0.0})
+            return {"count": histogram["count"], "sum": histogram["sum"]}
+
+    def reset(self):
+        """Forget every counter and histogram; the callbacks stay registered."""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self):
+        """Render the counters and histograms in the OpenMetrics text format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: {**value, "buckets": list(value["buckets"])} for key, value in self._histograms.items()}
+
+        lines = []
+        for name, help_text in COUNTERS.items():
+            samples = sorted((table, value) for (counter, table), value in counters.items() if counter == name)
+            if not samples:
+                continue
+            lines.append(f"# TYPE keepdataflow_{name} counter")
+            lines.append(f"# HELP keepdataflow_{name} {help_text}")
+            for table, value in samples:
+                lines.append(f'keepdataflow_{name}_total{{table="{_escape(table)}"}} {value}')
+
+        if histograms:
+            family = "keepdataflow_phase_duration_seconds"
+            lines.append(f"# TYPE {family} histogram")
+            lines.append(f"# UNIT {family} seconds")
+            lines.append(f"# HELP {family} Duration of the extract, stage, merge and commit phases of loads.")
+            for (phase, table), histogram in sorted(histograms.items(), key=lambda item: (item[0][1], item[0][0])):
+                labels = f'table="{_escape(table)}",phase="{phase}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f'{family}_bucket{{{labels},le="{float(bound)}"}} {cumulative}')
+                lines.append(f'{family}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f"{family}_count{{{labels}}} {histogram['count']}")
+                lines.append(f"{family}_sum{{{labels}}} {histogram['sum']}")
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_openmetrics(self, path):
+        """
+        Write `render` to the text file `path`, e.g. in the node exporter's textfile collector directory.
+
+        The file is written next to `path` and renamed over it, so a scraper never reads a half-written file.
+        The file gets mode 0644, since the collector usually runs as another user.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix=".keepdataflow_metrics_")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            # mkstemp creates the file readable by its owner only
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+_metrics = TransferMetrics()
+
+
+def get_metrics():
+    """Return the process-wide `TransferMetrics` every transfer records into."""
+    return _metrics
+
+
+@contextmanager
+def metrics_table(table):
+    """Attribute the metrics recorded inside the block to `table`, whatever table the load writes to."""
+    token = _current_table.set(table)
+    try:
+        yield
+    finally:
+        _current_table.reset(token)
+
+
+def current_table():
+    """Return the table of the enclosing `metrics_table` block, or None outside one."""
+    return _current_table.get()
+
+
+def _table_label(table):
+    return current_table() or table
+
+
+def count(name, value=1, table=None):
+    """Add `value` to a counter of the current `metrics_table`, or of `table` outside one."""
+    get_metrics().increment(name, _table_label(table), value)
+
+
+@contextmanager
+def phase(name, table=None):
+    """Time the block as phase `name` of a load into the current `metrics_table`, or into `table` outside one."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_metrics().observe(name, _table_label(table), time.perf_counter() - started)
+
+
+def timed(iterable, name, table=None):
+    """Yield the items of `iterable`, timing how long each one takes to produce as phase `name`."""
+    iterator = iter(iterable)
+    while True:
+        with phase(name, table):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
@@ -0,0 +1,87 @@
+import queue
+import threading
+
+_DONE = object()
+
+
+def interleave(producers, max_buffered=1):
+    """
+    Run each producer on its own thread and yield the items they produce as they arrive.
+
+    Parameters
+    ----------
+    producers : list of callable
+        Callables returning an iterable. Each one is consumed on a separate thread.
+    max_buffered : int
+        The number of produced items that may wait to be consumed. Producers block once the
+        buffer is full, which bounds memory when the consumer is slower than the producers.
+
+    Yields
+    ------
+    object
+        Items in the order they were produced. The first exception raised by a producer is
+        re-raised in the consuming thread. Closing the generator early stops the producers.
+
+    Examples
+    --------
+    >>> sorted(interleave([lambda: [1, 2], lambda: [3]]))
+    [1, 2, 3]
+    """
+    items = queue.Queue(maxsize=max(max_buffered, 1))
+    stop = threading.Event()
+
+    def put(item):
+        # Give up waiting for buffer space once the consumer has gone away
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(producer):
+        try:
+            for item in producer():
+                if not put((None, item)):
+                    return
+        except BaseException as error:  # noqa: BLE001 - handed to the consumer
+            put((error, None))
+        finally:
+            put((_DONE, None))
+
+    threads = [threading.Thread(target=run, args=(producer,), daemon=True) for producer in producers]
+    for thread in threads:
+        thread.start()
+
+    try:
+        remaining = len(threads)
+        while remaining:
+            error, item = items.get()
+            if error is _DONE:
+                remaining -= 1
+            elif error is not None:
+                raise error
+            else:
+                yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def prefetch(iterable, depth=1):
+    """
+    Iterate `iterable` on a background thread, keeping up to `depth` items ready ahead of the consumer.
+
+    While the consumer processes item N, the background thread already fetches item N+1 (and
+    further, up to `depth`), so a slow producer and a slow consumer overlap instead of taking
+    turns. The bounded buffer applies backpressure: the producer pauses once `depth` items are
+    waiting. Items keep their order.
+
+    Examples
+    --------
+    >>> list(prefetch(range(5), depth=2))
+    [0, 1, 2, 3, 4]
+    """
+    return interleave([lambda: iterable], max_buffered=depth)
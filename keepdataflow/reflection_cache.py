@@ -0,0 +1,192 @@
+import importlib
+import inspect
+import json
+import os
+import threading
+import time
+
+import sqlalchemy as sa
+from sqlalchemy.types import TypeEngine
+
+DEFAULT_TTL = 300
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def _engine_key(engine):
+    return engine.url.render_as_string(hide_password=True)
+
+
+def _dump_type(type_, dialect):
+    """Describe a reflected column type as JSON, or raise TypeError when it cannot be rebuilt from it."""
+    cls = type(type_)
+    args = {
+        name: getattr(type_, name)
+        for name, param in inspect.signature(cls.__init__).parameters.items()
+        if name != "self" and param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD) and hasattr(type_, name)
+    }
+    data = {"class": f"{cls.__module__}:{cls.__qualname__}", "args": args}
+    json.dumps(data)
+    # Types whose state is not all in their constructor arguments, e.g. arrays or enums, are not saved
+    if _load_type(data).compile(dialect=dialect) != type_.compile(dialect=dialect):
+        raise TypeError(f"{type_!r} cannot be rebuilt from its constructor arguments")
+    return data
+
+
+def _load_type(data):
+    """Rebuild a column type described by `_dump_type`; only SQLAlchemy's own type classes are created."""
+    module_name, _, class_name = data["class"].partition(":")
+    if module_name != "sqlalchemy" and not module_name.startswith("sqlalchemy."):
+        raise ValueError(f"Not a SQLAlchemy type: {data['class']}")
+    cls = getattr(importlib.import_module(module_name), class_name, None)
+    if not (isinstance(cls, type) and issubclass(cls, TypeEngine)):
+        raise ValueError(f"Not a SQLAlchemy type: {data['class']}")
+    return cls(**data["args"])
+
+
+def get_reflection_cache(engine, ttl=None):
+    """
+    Return the process-wide reflection cache for the database behind `engine`.
+
+    Engines with the same URL share one cache. `ttl` (seconds) updates the cache's TTL when given.
+    """
+    key = _engine_key(engine)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = ReflectionCache(engine, ttl=DEFAULT_TTL if ttl is None else ttl)
+        elif ttl is not None:
+            cache.ttl = ttl
+    return cache
+
+
+class ReflectionCache:
+    """
+    Cache of table metadata reflected through ``sqlalchemy.inspect``.
+
+    Catalog queries can take seconds per table on a remote server, and keepdataflow reflects the
+    same tables for every merge, staging table and dependency lookup. Results are cached per
+    (schema, table) for `ttl` seconds. Entries are dropped with `invalidate` when a table's
+    structure changes, and can be saved to and loaded from a snapshot file so that a new process
+    starts warm.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The engine used to reflect tables that are not cached.
+    ttl : float, optional
+        How long, in seconds, a reflected entry stays valid. Default is 300.
+
+    Example Usage:
+    --------------
+    cache = get_reflection_cache(engine)
+    columns = cache.get_columns("orders", schema="dbo")
+    cache.invalidate("orders", schema="dbo")
+    """
+
+    def __init__(self, engine, ttl=DEFAULT_TTL):
+        self.engine = engine
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind, table_name, schema, reflect):
+        key = (kind, schema, table_name)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            return entry[1]
+
+        value = reflect(sa.inspect(self.engine))
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+        return value
+
+    def default_schema_name(self):
+        return self._get("default_schema_name", None, None, lambda insp: insp.default_schema_name)
+
+    def get_columns(self, table_name, schema=None):
+        return self._get("columns", table_name, schema, lambda insp: insp.get_columns(table_name, schema=schema))
+
+    def get_pk_constraint(self, table_name, schema=None):
+        return self._get(
+            "pk_constraint", table_name, schema, lambda insp: insp.get_pk_constraint(table_name, schema=schema)
+        )
+
+    def get_foreign_keys(self, table_name, schema=None):
+        return self._get(
+            "foreign_keys", table_name, schema, lambda insp: insp.get_foreign_keys(table_name, schema=schema)
+        )
+
+    def get_check_constraints(self, table_name, schema=None):
+        return self._get(
+            "check_constraints", table_name, schema, lambda insp: insp.get_check_constraints(table_name, schema=schema)
+        )
+
+    def get_indexes(self, table_name, schema=None):
+        return self._get("indexes", table_name, schema, lambda insp: insp.get_indexes(table_name, schema=schema))
+
+    def invalidate(self, table_name=None, schema=None):
+        """Drop cached entries for one table, or for every table when `table_name` is omitted."""
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[1:] == (schema, table_name)]:
+                del self._entries[key]
+
+    def save(self, path):
+        """
+        Write the cached entries to a JSON snapshot file at `path`.
+
+        Entries with a value that JSON cannot describe, e.g. columns of an array or enum type, are
+        left out and reflected again by the process that loads the snapshot.
+        """
+        with self._lock:
+            entries = dict(self._entries)
+        records = []
+        for (kind, schema, table_name), (_, value) in entries.items():
+            if kind == "columns":
+                try:
+                    value = [{**column, "type": _dump_type(column["type"], self.engine.dialect)} for column in value]
+                except (TypeError, ValueError, sa.exc.CompileError):
+                    continue
+            try:
+                json.dumps(value)
+            except (TypeError, ValueError):
+                continue
+            records.append({"kind": kind, "schema": schema, "table": table_name, "value": value})
+
+        snapshot = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        snapshot[_engine_key(self.engine)] = records
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def load(self, path):
+        """
+        Load entries for this database from a snapshot written by `save`.
+
+        Loaded entries count as reflected now and stay valid for the TTL; entries this cache
+        already holds are kept. A missing snapshot file is ignored.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            records = json.load(f).get(_engine_key(self.engine), [])
+        now = time.time()
+        with self._lock:
+            for record in records:
+                key = (record["kind"], record["schema"], record["table"])
+                if key in self._entries:
+                    continue
+                value = record["value"]
+                if record["kind"] == "columns":
+                    value = [{**column, "type": _load_type(column["type"])} for column in value]
+                self._entries[key] = (now, value)
@@ -0,0 +1,124 @@
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from keepdataflow.reflection_cache import get_reflection_cache
+
+
+def get_table_dependencies(engine, table_configs):
+    """
+    Find which configured tables must be loaded before each other.
+
+    Foreign keys are reflected from the destination database. A table depends on every other
+    configured target table it references; references to tables outside the config and
+    self-references are ignored.
+
+    Parameters
+    ----------
+    engine : sqlalchemy.engine.Engine
+        The destination database engine.
+    table_configs : list of dict
+        The ``tables`` entries of a run_transfers config.
+
+    Returns
+    -------
+    dict of int to set of int
+        For each index into `table_configs`, the indexes of the tables it depends on.
+    """
+    reflection = get_reflection_cache(engine)
+    default_schema = reflection.default_schema_name()
+
+    def table_key(schema, table):
+        return ((schema or default_schema or "").lower(), table.lower())
+
+    indexes_by_table = {}
+    for index, table_config in enumerate(table_configs):
+        key = table_key(table_config.get("targetSchema", "dbo"), table_config["targetTable"])
+        indexes_by_table.setdefault(key, []).append(index)
+
+    dependencies = {}
+    for index, table_config in enumerate(table_configs):
+        schema = table_config.get("targetSchema", "dbo")
+        dependencies[index] = set()
+        for foreign_key in reflection.get_foreign_keys(table_config["targetTable"], schema=schema):
+            referred = table_key(foreign_key.get("referred_schema") or schema, foreign_key["referred_table"])
+            for parent in indexes_by_table.get(referred, []):
+                if parent != index:
+                    dependencies[index].add(parent)
+    return dependencies
+
+
+def dependency_levels(dependencies):
+    """
+    Group tables into levels so that every table only depends on tables in earlier levels.
+
+    Examples
+    --------
+    >>> dependency_levels({0: set(), 1: {0}, 2: set(), 3: {1, 2}})
+    [[0, 2], [1], [3]]
+    """
+    levels = []
+    placed = set()
+    remaining = dict(dependencies)
+    while remaining:
+        level = sorted(index for index, parents in remaining.items() if parents <= placed)
+        if not level:
+            raise ValueError(f"Circular foreign key dependency between tables {sorted(remaining)}")
+        levels.append(level)
+        placed.update(level)
+        for index in level:
+            del remaining[index]
+    return levels
+
+
+def run_dependency_graph(items, dependencies, run_item, max_workers=1):
+    """
+    Run `run_item` for every entry of `items` on a thread pool, starting each entry as soon as
+    all of the entries it depends on have finished.
+
+    Entries never wait for anything other than their own dependencies, so independent tables
+    load concurrently. After the first failure no new entries are started; entries already
+    running are allowed to finish and the first exception is then raised.
+
+    Parameters
+    ----------
+    items : list
+        The work items, e.g. table configs.
+    dependencies : dict of int to set of int
+        For each index into `items`, the indexes it depends on.
+    run_item : callable
+        Called with a single item.
+    max_workers : int
+        The number of worker threads.
+    """
+    # Validate the graph up front so a cycle fails before anything is loaded
+    dependency_levels(dependencies)
+
+    pending = {index: set(dependencies.get(index, ())) for index in range(len(items))}
+    running = {}
+    error = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if error is None:
+                ready = [index for index, parents in pending.items() if not parents]
+                for index in ready:
+                    del pending[index]
+                    running[executor.submit(run_item, items[index])] = index
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for parents in pending.values():
+                    parents.discard(index)
+
+    if error is not None:
+        raise error
@@ -0,0 +1,104 @@
+def build_source_query(table_spec, columns=None, where=None):
+    """
+    Build the SELECT statement used to read a source table.
+
+    Projection and filtering are rendered into the SQL so that they are evaluated by the
+    source database instead of in Python after a full read.
+
+    Parameters
+    ----------
+    table_spec : str
+        The (optionally schema qualified) name of the source table.
+    columns : list of str, optional
+        The columns to read. All columns are read when omitted.
+    where : str or list of str, optional
+        A filter predicate, or a list of predicates that are combined with AND.
+
+    Returns
+    -------
+    str
+        The rendered SELECT statement.
+
+    Examples
+    --------
+    >>> build_source_query("dbo.orders")
+    'SELECT * FROM dbo.orders'
+    >>> build_source_query("dbo.orders", columns=["id", "total"], where="status = 'open'")
+    "SELECT id, total FROM dbo.orders WHERE (status = 'open')"
+    """
+    select_list = ", ".join(columns) if columns else "*"
+    query = f"SELECT {select_list} FROM {table_spec}"
+
+    if isinstance(where, str):
+        where = [where]
+    predicates = [predicate for predicate in (where or []) if predicate]
+    if predicates:
+        query += " WHERE " + " AND ".join(f"({predicate})" for predicate in predicates)
+
+    return query
+
+
+def split_range(lower, upper, count):
+    """
+    Split the closed range [lower, upper] into at most `count` contiguous slices.
+
+    Works for integers, floats, decimals, dates and datetimes. Integer boundaries are kept
+    integral, and slices that would be empty are dropped.
+
+    Returns
+    -------
+    list of tuple
+        ``(start, end)`` pairs. Every slice covers ``start <= value < end`` except the last,
+        which also includes `upper`.
+
+    Examples
+    --------
+    >>> split_range(1, 100, 4)
+    [(1, 25), (25, 50), (50, 75), (75, 100)]
+    >>> split_range(1, 2, 4)
+    [(1, 2)]
+    """
+    if count < 1:
+        raise ValueError("count must be at least 1")
+
+    span = upper - lower
+    if isinstance(lower, int):
+        boundaries = [lower + span * i // count for i in range(count)]
+    else:
+        boundaries = [lower + span * i / count for i in range(count)]
+    boundaries.append(upper)
+
+    slices = []
+    for start, end in zip(boundaries, boundaries[1:]):
+        if start < end:
+            slices.append((start, end))
+    return slices or [(lower, upper)]
+
+
+def partition_predicates(column, slices):
+    """
+    Render one WHERE predicate per slice from `split_range`, with the bound values as parameters.
+
+    Rows where `column` is NULL are read with the first slice so that none are lost.
+
+    Returns
+    -------
+    list of tuple
+        ``(predicate, parameters)`` pairs.
+
+    Examples
+    --------
+    >>> first, last = partition_predicates("id", [(1, 50), (50, 100)])
+    >>> first
+    ('id IS NULL OR (id >= :partition_start AND id < :partition_end)', {'partition_start': 1, 'partition_end': 50})
+    >>> last
+    ('id >= :partition_start AND id <= :partition_end', {'partition_start': 50, 'partition_end': 100})
+    """
+    predicates = []
+    for index, (start, end) in enumerate(slices):
+        upper_operator = "<=" if index == len(slices) - 1 else "<"
+        predicate = f"{column} >= :partition_start AND {column} {upper_operator} :partition_end"
+        if index == 0:
+            predicate = f"{column} IS NULL OR ({predicate})"
+        predicates.append((predicate, {"partition_start": start, "partition_end": end}))
+    return predicates
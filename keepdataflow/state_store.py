@@ -0,0 +1,293 @@
+import datetime
+import decimal
+import sqlite3
+import threading
+import uuid
+
+# How each supported watermark type is written to and read back from the state store
+_ENCODERS = {
+    "int": (int, str, int),
+    "float": (float, repr, float),
+    "decimal": (decimal.Decimal, str, decimal.Decimal),
+    "datetime": (datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    "date": (datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    "bytes": (bytes, bytes.hex, bytes.fromhex),
+    "str": (str, str, str),
+}
+
+
+def _encode(value):
+    # bool is an int subclass and datetime a date subclass, so the first exact match wins
+    for type_name, (python_type, encode, _) in _ENCODERS.items():
+        if type(value) is python_type:
+            return type_name, encode(value)
+    for type_name, (python_type, encode, _) in _ENCODERS.items():
+        if isinstance(value, python_type) and not isinstance(value, bool):
+            return type_name, encode(value)
+    raise TypeError(f"Unsupported watermark type: {type(value).__name__}")
+
+
+def _decode(type_name, text):
+    return _ENCODERS[type_name][2](text)
+
+
+def _encode_optional(value):
+    return (None, None) if value is None else _encode(value)
+
+
+def _decode_optional(type_name, text):
+    return None if type_name is None else _decode(type_name, text)
+
+
+class StateStore:
+    """
+    A small SQLite backed store for state that has to survive between runs, such as the
+    high-water marks used by incremental transfers and the checkpoints that let an interrupted
+    transfer resume where it stopped.
+
+    Parameters
+    ----------
+    path : str
+        Path of the SQLite file. It is created on first use.
+
+    Example Usage:
+    --------------
+    >>> store = StateStore(":memory:")
+    >>> store.get_watermark("dbo.orders->dbo.orders") is None
+    True
+    >>> store.set_watermark("dbo.orders->dbo.orders", "modified_at", datetime.datetime(2024, 5, 1, 12, 30))
+    >>> store.get_watermark("dbo.orders->dbo.orders")
+    datetime.datetime(2024, 5, 1, 12, 30)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    transfer_key TEXT PRIMARY KEY,
+                    column_name TEXT NOT NULL,
+                    value_type TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    transfer_key TEXT PRIMARY KEY,
+                    run_id TEXT,
+                    chunk_count INTEGER NOT NULL,
+                    lower_type TEXT,
+                    lower_value TEXT,
+                    upper_type TEXT,
+                    upper_value TEXT,
+                    completed_at TEXT,
+                    started_at TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS checkpoint_chunks (
+                    transfer_key TEXT NOT NULL,
+                    chunk_id INTEGER NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    mark_type TEXT,
+                    mark_value TEXT,
+                    completed_at TEXT,
+                    PRIMARY KEY (transfer_key, chunk_id)
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    started_at TEXT NOT NULL,
+                    finished_at TEXT
+                )
+                """
+            )
+
+    def get_watermark(self, transfer_key):
+        """Return the saved high-water mark for `transfer_key`, or None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value_type, value FROM watermarks WHERE transfer_key = ?", (transfer_key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return _decode(*row)
+
+    def set_watermark(self, transfer_key, column_name, value):
+        """Save `value` as the high-water mark of `column_name` for `transfer_key`."""
+        value_type, text = _encode(value)
+        updated_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO watermarks (transfer_key, column_name, value_type, value, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (transfer_key) DO UPDATE SET
+                    column_name = excluded.column_name,
+                    value_type = excluded.value_type,
+                    value = excluded.value,
+                    updated_at = excluded.updated_at
+                """,
+                (transfer_key, column_name, value_type, text, updated_at),
+            )
+
+    def clear_watermark(self, transfer_key):
+        """Forget the high-water mark for `transfer_key` so the next run reads the full table."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM watermarks WHERE transfer_key = ?", (transfer_key,))
+
+    def start_run(self, transfer_keys):
+        """
+        Record the start of a run over `transfer_keys` and return its run id.
+
+        The checkpoints of `transfer_keys` are forgotten, so a later resume of this run cannot skip
+        a transfer because an earlier run had finished it.
+        """
+        run_id = uuid.uuid4().hex
+        started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            for transfer_key in transfer_keys:
+                self._conn.execute("DELETE FROM checkpoint_chunks WHERE transfer_key = ?", (transfer_key,))
+                self._conn.execute("DELETE FROM checkpoints WHERE transfer_key = ?", (transfer_key,))
+            self._conn.execute("INSERT INTO runs (run_id, started_at) VALUES (?, ?)", (run_id, started_at))
+        return run_id
+
+    def finish_run(self, run_id):
+        """Mark run `run_id` as finished, so it is not resumed."""
+        finished_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (finished_at, run_id))
+
+    def interrupted_run(self):
+        """Return the id of the most recent run if it did not finish, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, finished_at FROM runs ORDER BY started_at DESC, rowid DESC LIMIT 1"
+            ).fetchone()
+        if row is None or row[1] is not None:
+            return None
+        return row[0]
+
+    def start_checkpoint(self, transfer_key, chunk_count=1, lower=None, upper=None, run_id=None):
+        """
+        Record the start of a transfer of `chunk_count` chunks, replacing any earlier checkpoint.
+
+        `lower` and `upper` are the bounds of the partition column the chunks were split from, so a
+        resumed run splits the same range into the same chunks. `run_id` is the run, from
+        `start_run`, the transfer belongs to.
+        """
+        lower_type, lower_value = _encode_optional(lower)
+        upper_type, upper_value = _encode_optional(upper)
+        started_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoint_chunks WHERE transfer_key = ?", (transfer_key,))
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO checkpoints (
+                    transfer_key, run_id, chunk_count, lower_type, lower_value, upper_type, upper_value,
+                    completed_at, started_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, NULL, ?)
+                """,
+                (transfer_key, run_id, chunk_count, lower_type, lower_value, upper_type, upper_value, started_at),
+            )
+
+    def get_checkpoint(self, transfer_key):
+        """
+        Return the checkpoint of `transfer_key`, or None if there is none.
+
+        The checkpoint is a dict with the ``run_id``, ``chunk_count``, ``lower`` and ``upper`` given
+        to `start_checkpoint`, whether the whole transfer is ``completed``, the completed ``chunks``
+        as a dict of chunk id to ``(row_count, mark)``, and the ``partial_chunks`` that committed
+        batches but did not complete, in the same form.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT run_id, chunk_count, lower_type, lower_value, upper_type, upper_value, completed_at
+                FROM checkpoints WHERE transfer_key = ?
+                """,
+                (transfer_key,),
+            ).fetchone()
+            chunks = self._conn.execute(
+                """
+                SELECT chunk_id, row_count, mark_type, mark_value, completed_at
+                FROM checkpoint_chunks WHERE transfer_key = ?
+                """,
+                (transfer_key,),
+            ).fetchall()
+        if row is None:
+            return None
+        run_id, chunk_count, lower_type, lower_value, upper_type, upper_value, completed_at = row
+        return {
+            "run_id": run_id,
+            "chunk_count": chunk_count,
+            "lower": _decode_optional(lower_type, lower_value),
+            "upper": _decode_optional(upper_type, upper_value),
+            "completed": completed_at is not None,
+            "chunks": {
+                chunk_id: (row_count, _decode_optional(mark_type, mark_value))
+                for chunk_id, row_count, mark_type, mark_value, chunk_completed_at in chunks
+                if chunk_completed_at is not None
+            },
+            "partial_chunks": {
+                chunk_id: (row_count, _decode_optional(mark_type, mark_value))
+                for chunk_id, row_count, mark_type, mark_value, chunk_completed_at in chunks
+                if chunk_completed_at is None
+            },
+        }
+
+    def record_batch(self, transfer_key, chunk_id, row_count, mark=None):
+        """Record that chunk `chunk_id` has committed `row_count` rows so far, up to the optional high-water mark."""
+        mark_type, mark_value = _encode_optional(mark)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO checkpoint_chunks
+                    (transfer_key, chunk_id, row_count, mark_type, mark_value, completed_at)
+                VALUES (?, ?, ?, ?, ?, NULL)
+                """,
+                (transfer_key, chunk_id, row_count, mark_type, mark_value),
+            )
+
+    def complete_chunk(self, transfer_key, chunk_id, row_count, mark=None):
+        """Record that chunk `chunk_id` is loaded, with its row count and optional high-water mark."""
+        mark_type, mark_value = _encode_optional(mark)
+        completed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO checkpoint_chunks
+                    (transfer_key, chunk_id, row_count, mark_type, mark_value, completed_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (transfer_key, chunk_id, row_count, mark_type, mark_value, completed_at),
+            )
+
+    def finish_checkpoint(self, transfer_key):
+        """Mark the whole transfer as completed, so a resumed run skips it."""
+        completed_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE checkpoints SET completed_at = ? WHERE transfer_key = ?", (completed_at, transfer_key)
+            )
+
+    def clear_checkpoint(self, transfer_key):
+        """Forget the checkpoint of `transfer_key`."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoint_chunks WHERE transfer_key = ?", (transfer_key,))
+            self._conn.execute("DELETE FROM checkpoints WHERE transfer_key = ?", (transfer_key,))
+
+    def close(self):
+        self._conn.close()
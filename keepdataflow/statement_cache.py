@@ -0,0 +1,80 @@
+import os
+import re
+import threading
+import uuid
+from collections import OrderedDict
+
+# Distinguishes this process's staging tables from other processes sharing the same server
+_PROCESS_TOKEN = uuid.uuid4().hex[:8]
+
+
+class StatementCache:
+    """
+    A bounded, thread-safe LRU cache of rendered SQL statements.
+
+    Keys describe everything that shapes a statement (dialect, table, column tuple, match or
+    conflict columns, skip flags); values are the rendered text. Reusing the exact same text for
+    repeated loads into a table skips rendering.
+
+    Only the text is cached, not a driver-level prepared statement: pyodbc and psycopg2 cursors
+    are opened per load and keep nothing between loads. Compilation is still saved where the
+    server or driver matches statements by their text. SQL Server reuses the cached plan of an
+    identical ad hoc batch, which is why staging tables have stable names, and psycopg 3 prepares
+    a statement once a connection has run it ``prepare_threshold`` times.
+
+    Examples
+    --------
+    >>> cache = StatementCache(maxsize=2)
+    >>> cache.get_or_render(("mssql", "dbo.human"), lambda: "MERGE ...")
+    'MERGE ...'
+    >>> cache.get_or_render(("mssql", "dbo.human"), lambda: "never rendered")
+    'MERGE ...'
+    >>> cache.hits, cache.misses
+    (1, 1)
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._statements = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key, render):
+        """Return the cached statement for `key`, calling `render()` to build it on a miss."""
+        with self._lock:
+            if key in self._statements:
+                self._statements.move_to_end(key)
+                self.hits += 1
+                return self._statements[key]
+            self.misses += 1
+
+        statement = render()
+        with self._lock:
+            self._statements[key] = statement
+            self._statements.move_to_end(key)
+            while len(self._statements) > self.maxsize:
+                self._statements.popitem(last=False)
+        return statement
+
+    def clear(self):
+        with self._lock:
+            self._statements.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Shared by df_merge and df_insert_on_conflict
+statement_cache = StatementCache()
+
+
+def staging_table_name(table_name, prefix="##"):
+    """
+    Return a staging table name that is stable for this process, thread and target table.
+
+    A random name per call would make every generated statement unique; a stable one keeps the
+    statement text identical across chunked or scheduled loads into the same table. Names stay
+    unique between processes and between threads loading concurrently.
+    """
+    safe_table_name = re.sub(r"\W", "_", table_name)[:60]
+    return f"{prefix}kdf_{_PROCESS_TOKEN}_{os.getpid()}_{threading.get_ident()}_{safe_table_name}"
@@ -0,0 +1,284 @@
+import collections
+import functools
+import json
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import sqlalchemy as sa
+from loguru import logger
+
+from keepdataflow.metrics import current_table
+
+DEFAULT_SLOW_SECONDS = 5.0
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w\]\"#.])-?\d+(?:\.\d+)?(?![\w\[\"])")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\?|(?<![:\w]):\w+|\$\d+")
+# Staging tables are named per process and thread; see statement_cache.staging_table_name
+_STAGING_TOKENS = re.compile(r"kdf_[0-9a-f]{8}_\d+_\d+_")
+_ROW = r"\(\s*\?(?:\s*,\s*\?)*\s*\)"
+_ROWS = re.compile(rf"({_ROW})(?:\s*,\s*{_ROW})+")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+_IDENTIFIER = r"((?:\[[^\]]+\]|\"[^\"]+\"|[#\w]+)(?:\.(?:\[[^\]]+\]|\"[^\"]+\"|[#\w]+))*)"
+# The statement's target comes first; FROM is the fallback for queries
+_TABLE_PATTERNS = [
+    re.compile(rf"^\s*MERGE\s+(?:INTO\s+)?{_IDENTIFIER}", re.IGNORECASE),
+    re.compile(rf"^\s*INSERT\s+INTO\s+{_IDENTIFIER}", re.IGNORECASE),
+    re.compile(rf"^\s*UPDATE\s+{_IDENTIFIER}", re.IGNORECASE),
+    re.compile(rf"^\s*DELETE\s+(?:FROM\s+)?{_IDENTIFIER}", re.IGNORECASE),
+    re.compile(rf"^\s*COPY\s+{_IDENTIFIER}", re.IGNORECASE),
+    re.compile(
+        rf"^\s*(?:TRUNCATE|ALTER|DROP|CREATE(?:\s+TEMPORARY)?)\s+TABLE\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?{_IDENTIFIER}",
+        re.IGNORECASE,
+    ),
+    re.compile(rf"\bINTO\s+{_IDENTIFIER}", re.IGNORECASE),
+    re.compile(rf"\bFROM\s+{_IDENTIFIER}", re.IGNORECASE),
+]
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(statement):
+    """
+    Reduce a SQL statement to its shape, so that executions differing only in values group together.
+
+    Comments are removed, literals and bind placeholders become ``?``, multi-row VALUES lists and
+    IN lists are collapsed, staging table names lose their process and thread tokens, and
+    whitespace is normalised. Fingerprints are cached, since keepdataflow sends the same statement
+    text over and over.
+
+    Examples
+    --------
+    >>> fingerprint("SELECT * FROM orders WHERE id = 42 AND name = 'x'  -- lookup")
+    'SELECT * FROM orders WHERE id = ? AND name = ?'
+    >>> fingerprint("INSERT INTO t1 (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)")
+    'INSERT INTO t1 (a, b) VALUES (?, ?), ...'
+    >>> fingerprint("DELETE FROM t WHERE k IN (:k_1, :k_2, :k_3)")
+    'DELETE FROM t WHERE k IN (...)'
+    """
+    text = _COMMENTS.sub(" ", statement)
+    text = _STRINGS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _PLACEHOLDERS.sub("?", text)
+    text = _STAGING_TOKENS.sub("kdf_", text)
+    text = _WHITESPACE.sub(" ", text).strip()
+    text = _ROWS.sub(r"\1, ...", text)
+    return _IN_LISTS.sub("IN (...)", text)
+
+
+def statement_table(statement):
+    """
+    Return the table a SQL statement writes to or, for queries, reads from first.
+
+    Examples
+    --------
+    >>> statement_table("MERGE [dbo].[orders] AS main USING ##kdf_stage AS temp ON ...")
+    '[dbo].[orders]'
+    >>> statement_table("SELECT a FROM public.orders JOIN customers ON ...")
+    'public.orders'
+    >>> statement_table("SELECT 1") is None
+    True
+    """
+    for pattern in _TABLE_PATTERNS:
+        match = pattern.search(statement)
+        if match:
+            return match.group(1)
+    return None
+
+
+class StatementProfiler:
+    """
+    Aggregated timings of the SQL statements keepdataflow runs, per statement fingerprint.
+
+    Every statement is reduced with `fingerprint` and added to its fingerprint's totals: calls,
+    seconds, slowest execution and rows affected. Statements that take at least
+    `slow_seconds` are also kept in `slow_statements`, the most recent `slow_log_size` of them,
+    and logged as a loguru WARNING event. Since keepdataflow's loguru events are disabled until
+    the application enables them, slow statements are also appended to `slow_log_path` as JSON
+    lines when it is set.
+
+    Engines report to the process-wide profiler once timing is installed on them with
+    `install_statement_timing` or `statement_timing`; no engine is timed by default. Bulk loads
+    that use the DBAPI cursor directly on such an engine, such as COPY, executemany and ADBC
+    ingestion, are recorded with `timed_statement`.
+
+    Parameters
+    ----------
+    slow_seconds : float
+        The duration from which a statement is logged as slow. Default is 5 seconds.
+    slow_log_size : int
+        How many slow statements are kept. Default is 100.
+    slow_log_path : str, optional
+        A file every slow statement is appended to, one JSON object per line.
+
+    Examples
+    --------
+    >>> profiler = StatementProfiler(slow_seconds=1.0)
+    >>> profiler.record("UPDATE orders SET qty = 1 WHERE id = 7", 0.25, rowcount=1)
+    >>> profiler.record("UPDATE orders SET qty = 2 WHERE id = 8", 0.75, rowcount=1)
+    >>> entry = profiler.profile()[0]
+    >>> entry["fingerprint"], entry["table"], entry["calls"], entry["total_seconds"], entry["rows"]
+    ('UPDATE orders SET qty = ? WHERE id = ?', 'orders', 2, 1.0, 2)
+    """
+
+    def __init__(self, slow_seconds=DEFAULT_SLOW_SECONDS, slow_log_size=100, slow_log_path=None):
+        self.slow_seconds = slow_seconds
+        self.slow_log_path = slow_log_path
+        self.slow_statements = collections.deque(maxlen=slow_log_size)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, seconds, rowcount=None, database=None):
+        """Add one execution of `statement` that took `seconds` and affected `rowcount` rows."""
+        if not isinstance(rowcount, int) or rowcount < 0:
+            # DBAPI drivers report -1 when they do not know
+            rowcount = None
+        key = fingerprint(statement)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = {
+                    "fingerprint": key,
+                    "table": statement_table(key),
+                    "database": database,
+                    "calls": 0,
+                    "total_seconds": 0.0,
+                    "max_seconds": 0.0,
+                    "rows": 0,
+                }
+            entry["calls"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["rows"] += rowcount or 0
+
+        if seconds >= self.slow_seconds:
+            slow = {
+                "fingerprint": key,
+                "table": entry["table"],
+                "transfer": current_table(),
+                "database": database,
+                "seconds": seconds,
+                "rows": rowcount,
+                "at": time.time(),
+            }
+            with self._lock:
+                self.slow_statements.append(slow)
+                if self.slow_log_path:
+                    with open(self.slow_log_path, "a", encoding="utf-8") as f:
+                        f.write(json.dumps(slow, default=str) + "\n")
+            logger.warning(
+                "Slow statement on {table}: {seconds:.3f}s, {rows} rows: {fingerprint}",
+                **{name: value for name, value in slow.items() if name != "at"},
+            )
+
+    def profile(self):
+        """Return the per-fingerprint totals, the most time-consuming first."""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        for entry in entries:
+            entry["mean_seconds"] = entry["total_seconds"] / entry["calls"]
+        return sorted(entries, key=lambda entry: entry["total_seconds"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self.slow_statements.clear()
+
+    def write_profile(self, path):
+        """Write the per-fingerprint totals and the slow statements to `path` as JSON."""
+        with self._lock:
+            slow_statements = list(self.slow_statements)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"slow_seconds": self.slow_seconds, "statements": self.profile(), "slow_statements": slow_statements},
+                f,
+                indent=2,
+                default=str,
+            )
+
+
+_profiler = StatementProfiler()
+
+
+def get_statement_profiler():
+    """Return the process-wide `StatementProfiler`."""
+    return _profiler
+
+
+# Engines with statement timing installed; timed_statement records nothing for the others
+_timed_engines = weakref.WeakSet()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._kdf_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_kdf_started", None)
+    if started is None:
+        return
+    get_statement_profiler().record(
+        statement, time.perf_counter() - started, rowcount=cursor.rowcount, database=conn.dialect.name
+    )
+
+
+def install_statement_timing(engine):
+    """
+    Time every statement `engine` executes with ``before_cursor_execute`` and ``after_cursor_execute`` listeners.
+
+    The timings go to the process-wide `StatementProfiler`. Installing twice has no further effect.
+    """
+    if not sa.event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        sa.event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        sa.event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _timed_engines.add(engine)
+    return engine
+
+
+def remove_statement_timing(engine):
+    """Remove the listeners added by `install_statement_timing`, if any."""
+    if sa.event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        sa.event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+        sa.event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+    _timed_engines.discard(engine)
+
+
+@contextmanager
+def statement_timing(engine):
+    """Time the statements of `engine` for the duration of the block, unless it was already timed before."""
+    if engine in _timed_engines:
+        yield engine
+        return
+    install_statement_timing(engine)
+    try:
+        yield engine
+    finally:
+        remove_statement_timing(engine)
+
+
+@contextmanager
+def timed_statement(bind, statement, cursor=None):
+    """
+    Time a statement run on a DBAPI cursor, which SQLAlchemy's events do not see.
+
+    `bind` is the engine or connection the cursor belongs to. The rows affected are read from
+    `cursor` when the block ends. Nothing is recorded when the statement fails, or when statement
+    timing is not installed on the engine.
+    """
+    if getattr(bind, "engine", bind) not in _timed_engines:
+        yield
+        return
+    started = time.perf_counter()
+    yield
+    get_statement_profiler().record(
+        statement,
+        time.perf_counter() - started,
+        rowcount=getattr(cursor, "rowcount", None),
+        database=bind.dialect.name,
+    )
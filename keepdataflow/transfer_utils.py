@@ -1,8 +1,23 @@
 import json
-from sqlalchemy import create_engine
+from contextlib import ExitStack
 from keepdataflow.data_transfer import DatabaseDataTransfer
+from keepdataflow.engine_registry import get_engine
+from keepdataflow.metrics import get_metrics
+from keepdataflow.reflection_cache import get_reflection_cache
+from keepdataflow.scheduler import (
+    get_table_dependencies,
+    run_dependency_graph,
+)
+from keepdataflow.state_store import StateStore
+from loguru import logger
+from keepdataflow.statement_profiler import (
+    get_statement_profiler,
+    statement_timing,
+)
 from data_engineer_utils import get_execution_order, sort_table_mappings
 
+DEFAULT_STATE_PATH = "keepdataflow_state.db"
+
 
 def load_config(file_path):
     """Load the configuration file and return it as a dictionary."""
@@ -11,13 +26,81 @@ def load_config(file_path):
     return config
 
 
-def run_transfers(config, source_connection=None, destination_connection=None, enforce_table_sort=False):
+def _table_names(table_config):
+    """Return the source table, destination table, source schema and destination schema of a table entry."""
+    return (
+        table_config["sourceTable"],
+        table_config["targetTable"],
+        table_config.get("sourceSchema", "dbo"),  # Default schema is dbo
+        table_config.get("targetSchema", "dbo"),  # Default schema is dbo
+    )
+
+
+def run_transfers(
+    config,
+    source_connection=None,
+    destination_connection=None,
+    enforce_table_sort=False,
+    state_path=None,
+    max_workers=1,
+    reflection_snapshot=None,
+    reflection_ttl=None,
+    resume=False,
+    metrics_path=None,
+    profile_path=None,
+    slow_statement_seconds=None,
+    slow_log_path=None,
+):
     """
     Run data transfers based on the configuration provided in the config file.
 
     The configuration should include:
     - source and destination database connection strings.
     - the type of operation (MERGE, INSERT ON CONFLICT, or basic INSERT).
+
+    Each entry in ``tables`` may also declare ``columns`` (the source columns to read) and
+    ``where`` (a filter predicate, or a list of predicates) which are rendered into the source
+    query so projection and filtering happen in the source database.
+
+    A table with ``incremental_column`` only copies rows where that column is greater than the
+    high-water mark saved by its last successful run. Marks are kept in the SQLite file at
+    ``state_path``, ``keepdataflow_state.db`` in the working directory when it is not given. Runs
+    without incremental tables, ``resume`` or ``state_path`` keep no state and create no file.
+
+    With ``max_workers`` greater than 1 tables are loaded concurrently on a pool of that many
+    workers, each with its own pooled source and destination connection. Foreign keys in the
+    destination decide the order: a table starts as soon as the tables it references have been
+    loaded, and tables that do not depend on each other never wait for one another.
+
+    Progress is checkpointed in the same SQLite file: every finished table, and every finished
+    ``partition_column`` slice of a table. Every call is a run with its own id, and a new run
+    forgets the checkpoints of its tables before loading anything. After a failed run, calling
+    again with ``resume=True`` continues that run: it skips the tables the failed run finished and
+    only reads the slices it did not; see ``DatabaseDataTransfer.transfer`` for the transfers that
+    always restart from the beginning. When the last run finished, ``resume=True`` starts a new one.
+
+    Engines come from the process-wide registry in ``keepdataflow.engine_registry``, so repeated
+    calls with the same connection strings reuse one warm connection pool. A registered engine
+    whose pool is smaller than ``max_workers`` needs is refused; see ``get_engine``.
+
+    Table metadata reflected from the destination is cached per process. When
+    ``reflection_snapshot`` names a file, the cache is loaded from it before the transfers and
+    written back afterwards, so the next process starts with warm metadata. ``reflection_ttl``
+    sets how many seconds cached metadata, loaded from the snapshot or reflected, stays valid
+    (default 300).
+
+    Every transfer records its rows, bytes, batches and phase durations in
+    ``keepdataflow.metrics.get_metrics()``. With ``metrics_path`` they are written to that file
+    in the OpenMetrics text format once the transfers end, also when one fails, e.g. into the
+    node exporter's textfile collector directory.
+
+    With ``slow_log_path`` or ``profile_path``, every SQL statement the transfers run is timed;
+    otherwise no timing listeners are attached. Statements that take at least
+    ``slow_statement_seconds`` (default 5) are logged as slow and appended as JSON lines to
+    ``slow_log_path``, which stays readable while keepdataflow's log is disabled. With
+    ``profile_path``, the statement profile of this call, the total, mean and slowest duration
+    and the rows of every statement fingerprint plus the slow statements, is written to that
+    file as JSON at the end.
     """
     # Create SQLAlchemy engines for the source and destination databases
 
@@ -32,9 +115,15 @@ def run_transfers(config, source_connection=None, destination_connection=None, e
     source_connection_string = config["database"]["sourceConnectionString"]
     destination_connection_string = config["database"]["destinationConnectionString"]
 
-    # # Create engines using SQLAlchemy
-    source_engine = create_engine(source_connection_string)
-    destination_engine = create_engine(destination_connection_string)
+    # # Reuse the process-wide engines, sized so every worker can hold one connection, and one per
+    # slice on the source when a table is read in partitions
+    source_reads = max(
+        [table.get("partition_count", 4) for table in config.get("tables") or [] if table.get("partition_column")] + [1]
+    )
+    source_options = {"pool_size": max_workers * source_reads} if max_workers * source_reads > 1 else {}
+    destination_options = {"pool_size": max_workers} if max_workers > 1 else {}
+    source_engine = get_engine(source_connection_string, **source_options)
+    destination_engine = get_engine(destination_connection_string, **destination_options)
 
     # Initialize the DatabaseDataTransfer object (db_type is inferred automatically)
     data_transfer = DatabaseDataTransfer(
@@ -42,6 +131,10 @@ def run_transfers(config, source_connection=None, destination_connection=None, e
         destination_engine=destination_engine,
         # Default operation is merge
     )
+
+    reflection = get_reflection_cache(destination_engine, ttl=reflection_ttl)
+    if reflection_snapshot:
+        reflection.load(reflection_snapshot)
     if enforce_table_sort:
         execution_order = get_execution_order(destination_engine)
         table_mapping = config.get('tables')
@@ -49,15 +142,40 @@ def run_transfers(config, source_connection=None, destination_connection=None, e
 
     else:
         tables = config.get('tables')
+
+    profiler = get_statement_profiler()
+    if slow_statement_seconds is not None:
+        profiler.slow_seconds = slow_statement_seconds
+    profiler.slow_log_path = slow_log_path
+    if profile_path:
+        # The profile covers this run only
+        profiler.reset()
+
+    # Holds high-water marks and the checkpoints a resumed run continues from, when either is needed
+    state_store = run_id = None
+    if state_path is None and (resume or any(table_config.get("incremental_column") for table_config in tables)):
+        state_path = DEFAULT_STATE_PATH
+    if state_path is not None:
+        state_store = StateStore(state_path)
+        run_id = state_store.interrupted_run() if resume else None
+        if run_id is None:
+            # Checkpoints left by earlier runs must not let this run skip a table it has not loaded yet
+            run_id = state_store.start_run(
+                [data_transfer.transfer_key(*_table_names(table_config)) for table_config in tables]
+            )
+
     # Transfer tables listed in the configuration
-    for table_config in tables:
-        source_table = table_config["sourceTable"]
-        destination_table = table_config["targetTable"]
-        source_schema = table_config.get("sourceSchema", "dbo")  # Default schema is dbo
-        destination_schema = table_config.get("targetSchema", "dbo")  # Default schema is dbo
+    def transfer_table(table_config):
+        source_table, destination_table, source_schema, destination_schema = _table_names(table_config)
         operation = table_config.get("operation", "append")
 
-        print(f"Transferring {source_table} from {source_schema} to {destination_table} in {destination_schema}...")
+        logger.info(
+            "Transferring {source} from {source_schema} to {destination} in {destination_schema}",
+            source=source_table,
+            source_schema=source_schema,
+            destination=destination_table,
+            destination_schema=destination_schema,
+        )
 
         # Extract additional kwargs if provided
         additional_args = {}
@@ -71,6 +189,38 @@ def run_transfers(config, source_connection=None, destination_connection=None, e
             additional_args["skip_inserts"] = table_config["skip_inserts"]
         if "skip_updates" in table_config:
             additional_args["skip_updates"] = table_config["skip_updates"]
+        if "refresh_mode" in table_config:
+            additional_args["refresh_mode"] = table_config["refresh_mode"]
+        if "suspend_indexes" in table_config:
+            additional_args["suspend_indexes"] = table_config["suspend_indexes"]
+        if "partition_value" in table_config:
+            additional_args["partition_value"] = table_config["partition_value"]
+        if "merge_batch_size" in table_config:
+            additional_args["merge_batch_size"] = table_config["merge_batch_size"]
+        if "skip_unchanged" in table_config:
+            additional_args["skip_unchanged"] = table_config["skip_unchanged"]
+        if "hash_column" in table_config:
+            additional_args["hash_column"] = table_config["hash_column"]
+        if "columns" in table_config:
+            additional_args["columns"] = table_config["columns"]
+        if "where" in table_config:
+            additional_args["where"] = table_config["where"]
+        if "incremental_column" in table_config:
+            additional_args["incremental_column"] = table_config["incremental_column"]
+        if "load_method" in table_config:
+            additional_args["load_method"] = table_config["load_method"]
+        if "pipeline_depth" in table_config:
+            additional_args["pipeline_depth"] = table_config["pipeline_depth"]
+        if "target_batch_seconds" in table_config:
+            additional_args["target_batch_seconds"] = table_config["target_batch_seconds"]
+        if "max_batch_bytes" in table_config:
+            additional_args["max_batch_bytes"] = table_config["max_batch_bytes"]
+        if "chunk_size" in table_config:
+            additional_args["chunk_size"] = table_config["chunk_size"]
+        if "partition_column" in table_config:
+            additional_args["partition_column"] = table_config["partition_column"]
+        if "partition_count" in table_config:
+            additional_args["partition_count"] = table_config["partition_count"]
 
         #     # Perform the data transfer
         data_transfer.transfer(
@@ -79,4 +229,35 @@ def run_transfers(config, source_connection=None, destination_connection=None, e
             source_schema=source_schema,
             destination_schema=destination_schema,
             operation=operation,
+            state_store=state_store,
+            run_id=run_id,
+            resume=resume,
+            **additional_args,
         )
+
+    # Statements are only timed while their timings are written somewhere
+    timing = ExitStack()
+    if slow_log_path or profile_path:
+        for engine in (source_engine, destination_engine):
+            timing.enter_context(statement_timing(engine))
+
+    try:
+        if max_workers > 1:
+            dependencies = get_table_dependencies(destination_engine, tables)
+            run_dependency_graph(tables, dependencies, transfer_table, max_workers=max_workers)
+        else:
+            for table_config in tables:
+                transfer_table(table_config)
+        if state_store is not None:
+            state_store.finish_run(run_id)
+    finally:
+        timing.close()
+        if state_store is not None:
+            state_store.close()
+        if metrics_path:
+            get_metrics().write_openmetrics(metrics_path)
+        if profile_path:
+            profiler.write_profile(profile_path)
+
+    if reflection_snapshot:
+        reflection.save(reflection_snapshot)
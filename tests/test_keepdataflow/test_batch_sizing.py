@@ -0,0 +1,41 @@
+import unittest
+
+import polars as pl
+
+from keepdataflow.batch_sizing import AdaptiveBatchSizer
+
+
+class TestAdaptiveBatchSizer(unittest.TestCase):
+    def test_converges_on_target_latency(self):
+        sizer = AdaptiveBatchSizer(target_seconds=1.0, initial_rows=1000, max_rows=10_000_000)
+        # A destination that loads 50,000 rows per second plus 50 ms per batch
+        for _ in range(20):
+            rows = sizer.batch_rows
+            sizer.record(rows, 0.05 + rows / 50_000)
+        self.assertGreater(sizer.batch_rows, 40_000)
+        self.assertLess(sizer.batch_rows, 50_000)
+
+    def test_respects_bounds(self):
+        sizer = AdaptiveBatchSizer(target_seconds=1.0, initial_rows=1000, min_rows=500, max_rows=1500)
+        sizer.record(1000, 0.001)
+        self.assertEqual(sizer.batch_rows, 1500)
+        for _ in range(5):
+            sizer.record(sizer.batch_rows, 100.0)
+        self.assertEqual(sizer.batch_rows, 500)
+
+    def test_small_remainders_do_not_steer(self):
+        sizer = AdaptiveBatchSizer(target_seconds=1.0, initial_rows=1000)
+        sizer.record(10, 0.5)
+        self.assertEqual(sizer.batch_rows, 1000)
+        self.assertEqual(sizer.rows, 10)
+
+    def test_memory_and_parameter_limits(self):
+        df = pl.DataFrame({"a": range(1000), "b": range(1000)})
+        sizer = AdaptiveBatchSizer(initial_rows=1000, max_bytes=df.estimated_size() // 10)
+        self.assertEqual(sizer.size_for(df), 100)
+        sizer = AdaptiveBatchSizer(initial_rows=1000, max_parameters=300)
+        self.assertEqual(sizer.size_for(df), 150)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+
+import polars as pl
+
+from keepdataflow.database_operations.copy_utils import (
+    FrameCsvStream,
+    supports_copy,
+)
+
+
+class TestFrameCsvStream(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pl_df = pl.DataFrame(
+            {
+                "ItemID": [1088100, 1029900, 103888, 104999],
+                "ItemName": ["Laptop", "", None, 'Monitor, 24" LED'],
+                "Quantity": [10, None, 50, 8],
+            }
+        )
+
+    def test_nulls_and_empty_strings_are_distinct(self):
+        csv = FrameCsvStream(self.pl_df).read().decode()
+        self.assertEqual(
+            csv.splitlines(),
+            ['1088100,"Laptop",10', '1029900,"",', '103888,,50', '104999,"Monitor, 24"" LED",8'],
+        )
+
+    def test_sized_reads_match_full_read(self):
+        expected = FrameCsvStream(self.pl_df).read()
+        stream = FrameCsvStream(self.pl_df, slice_rows=1)
+        data = b""
+        while chunk := stream.read(5):
+            data += chunk
+        self.assertEqual(data, expected)
+        self.assertEqual(b"".join(FrameCsvStream(self.pl_df, slice_rows=3).chunks()), expected)
+
+    def test_frame_spanning_many_slices(self):
+        rows = 20_000
+        df = pl.DataFrame({"ItemID": range(rows), "ItemName": [f"item {i}" for i in range(rows)]})
+        expected = df.write_csv(include_header=False, quote_style="non_numeric", null_value="").encode()
+        stream = FrameCsvStream(df, slice_rows=1_000)
+
+        # psycopg2's copy_expert reads 8192 bytes at a time until it gets nothing back
+        chunks = []
+        while chunk := stream.read(8192):
+            self.assertLessEqual(len(chunk), 8192)
+            chunks.append(chunk)
+        self.assertEqual(b"".join(chunks), expected)
+        self.assertGreater(len(chunks), 20)
+
+    def test_supports_copy(self):
+        self.assertTrue(supports_copy(self.pl_df))
+        self.assertFalse(supports_copy(self.pl_df.with_columns(pl.lit(b"\x00").alias("RowVersion"))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,286 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import polars as pl
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from keepdataflow.batch_sizing import AdaptiveBatchSizer
+from keepdataflow.data_transfer import (
+    DatabaseDataTransfer,
+    _sized_batches,
+)
+from keepdataflow.metrics import get_metrics
+from keepdataflow.state_store import StateStore
+
+
+class SQLiteTransferTestCase(unittest.TestCase):
+    """Transfers between two SQLite files, each with a ``human`` table."""
+
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_engine = sa.create_engine(f"sqlite:///{os.path.join(self.tmp_dir.name, 'source.db')}")
+        self.destination_engine = sa.create_engine(f"sqlite:///{os.path.join(self.tmp_dir.name, 'destination.db')}")
+        for engine in (self.source_engine, self.destination_engine):
+            with engine.begin() as conn:
+                conn.exec_driver_sql("CREATE TABLE human (ItemID INTEGER PRIMARY KEY, ItemName TEXT)")
+        self.data_transfer = DatabaseDataTransfer(self.source_engine, self.destination_engine)
+
+    def tearDown(self) -> None:
+        self.source_engine.dispose()
+        self.destination_engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def insert(self, engine, rows):
+        with engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO human VALUES (?, ?)", rows)
+
+    def destination_rows(self):
+        with self.destination_engine.connect() as conn:
+            return conn.exec_driver_sql("SELECT ItemID, ItemName FROM human ORDER BY ItemID").all()
+
+
+class TestChunkedTransfer(SQLiteTransferTestCase):
+    def test_append_in_batches(self):
+        self.insert(self.source_engine, [(item_id, f"name {item_id}") for item_id in range(1, 8)])
+
+        self.data_transfer.transfer("human", "human", None, None, operation="append", chunk_size=3)
+
+        self.assertEqual(self.destination_rows(), [(item_id, f"name {item_id}") for item_id in range(1, 8)])
+
+    def test_refresh_replaces_rows(self):
+        self.insert(self.source_engine, [(1, "a"), (2, "b"), (3, "c")])
+        self.insert(self.destination_engine, [(9, "stale")])
+
+        self.data_transfer.transfer("human", "human", None, None, operation="refresh", chunk_size=2)
+
+        self.assertEqual(self.destination_rows(), [(1, "a"), (2, "b"), (3, "c")])
+
+    def test_refresh_from_empty_source_clears_destination(self):
+        self.insert(self.destination_engine, [(9, "stale")])
+
+        self.data_transfer.transfer("human", "human", None, None, operation="refresh", chunk_size=2)
+
+        self.assertEqual(self.destination_rows(), [])
+
+    def test_chunked_merge_from_empty_source_deletes_every_row(self):
+        # The delete pass is SQL Server only, so the merge itself is mocked
+        self.data_transfer.db_type = "mssql"
+        with mock.patch("keepdataflow.data_transfer.resolve_match_columns", return_value=["ItemID"]), mock.patch(
+            "keepdataflow.data_transfer.delete_missing_rows"
+        ) as delete_missing_rows:
+            self.data_transfer.transfer("human", "human", None, None, operation="merge", chunk_size=2)
+
+        keys = delete_missing_rows.call_args.args[0]
+        self.assertEqual(keys.columns, ["ItemID"])
+        self.assertEqual(keys.height, 0)
+
+
+class TestStagedRefresh(SQLiteTransferTestCase):
+    """Swap and partition refreshes, with the SQL Server and PostgreSQL only steps mocked."""
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.insert(self.source_engine, [(1, "a")])
+        with self.destination_engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE human_stage (ItemID INTEGER PRIMARY KEY, ItemName TEXT)")
+
+    def test_failed_swap_drops_the_shadow_table(self):
+        with mock.patch("keepdataflow.data_transfer.create_shadow_table", return_value="human_stage"), mock.patch(
+            "keepdataflow.data_transfer.swap_shadow_table", side_effect=sa.exc.ProgrammingError("swap", None, None)
+        ), mock.patch("keepdataflow.data_transfer.drop_shadow_table") as drop_shadow_table:
+            with self.assertRaises(sa.exc.ProgrammingError):
+                self.data_transfer.transfer("human", "human", None, None, operation="refresh", refresh_mode="swap")
+
+        drop_shadow_table.assert_called_once_with(self.destination_engine, "human_stage", None)
+
+    def test_failed_switch_drops_the_partition_stage(self):
+        stage = {"stage_table": "human_stage", "source_filter": (None, {})}
+        staged_rows = []
+
+        def switch_partition(engine, table_name, stage, schema=None):
+            with engine.connect() as conn:
+                staged_rows.extend(conn.exec_driver_sql("SELECT ItemID, ItemName FROM human_stage").all())
+            raise sa.exc.ProgrammingError("ALTER TABLE ... SWITCH", None, None)
+
+        with mock.patch("keepdataflow.data_transfer.find_partition", return_value=stage), mock.patch(
+            "keepdataflow.data_transfer.prepare_partition_stage", return_value=stage
+        ), mock.patch("keepdataflow.data_transfer.switch_partition", side_effect=switch_partition):
+            with self.assertRaises(sa.exc.ProgrammingError):
+                self.data_transfer.transfer(
+                    "human", "human", None, None, operation="refresh", refresh_mode="partition", partition_value=1
+                )
+
+        self.assertEqual(staged_rows, [(1, "a")])
+        self.assertFalse(sa.inspect(self.destination_engine).has_table("human_stage"))
+
+
+class TestPartitionedTransfer(SQLiteTransferTestCase):
+    def test_every_row_is_read_once(self):
+        self.insert(self.source_engine, [(item_id, f"name {item_id}") for item_id in range(1, 11)])
+        get_metrics().reset()
+
+        self.data_transfer.transfer(
+            "human", "human", None, None, operation="append", partition_column="ItemID", partition_count=3, chunk_size=2
+        )
+
+        self.assertEqual(self.destination_rows(), [(item_id, f"name {item_id}") for item_id in range(1, 11)])
+        self.assertEqual(get_metrics().counter("rows", "human"), 10)
+
+    def test_where_applies_to_every_slice(self):
+        self.insert(self.source_engine, [(item_id, "odd" if item_id % 2 else "even") for item_id in range(1, 11)])
+
+        self.data_transfer.transfer(
+            "human",
+            "human",
+            None,
+            None,
+            operation="append",
+            partition_column="ItemID",
+            partition_count=4,
+            where="ItemName = 'odd'",
+        )
+
+        self.assertEqual(self.destination_rows(), [(item_id, "odd") for item_id in range(1, 11, 2)])
+
+    def test_empty_source(self):
+        self.insert(self.destination_engine, [(9, "stale")])
+
+        self.data_transfer.transfer("human", "human", None, None, operation="refresh", partition_column="ItemID")
+
+        self.assertEqual(self.destination_rows(), [])
+
+
+class TestLoadMethods(SQLiteTransferTestCase):
+    def test_adbc_append_and_refresh(self):
+        self.insert(self.source_engine, [(1, "a"), (2, "b")])
+        self.data_transfer.transfer("human", "human", None, None, operation="append", load_method="adbc")
+        self.assertEqual(self.destination_rows(), [(1, "a"), (2, "b")])
+
+        self.insert(self.source_engine, [(3, None)])
+        self.data_transfer.transfer("human", "human", None, None, operation="refresh", load_method="adbc")
+        self.assertEqual(self.destination_rows(), [(1, "a"), (2, "b"), (3, None)])
+
+    def postgresql_destination_cursor(self, **kwargs):
+        """Transfer into a mocked PostgreSQL engine and return the DBAPI cursor the load used."""
+        self.insert(self.source_engine, [(1, "a"), (2, "b")])
+        engine = mock.MagicMock()
+        engine.dialect = postgresql.dialect()
+        DatabaseDataTransfer(self.source_engine, engine).transfer(
+            "human", "human", None, "public", operation="append", **kwargs
+        )
+        return engine.begin.return_value.__enter__.return_value.connection.cursor.return_value
+
+    def test_postgresql_appends_copy_by_default(self):
+        cursor = self.postgresql_destination_cursor()
+
+        cursor.copy_expert.assert_called_once()
+        self.assertEqual(
+            cursor.copy_expert.call_args.args[0], "COPY public.human (ItemID, ItemName) FROM STDIN WITH (FORMAT csv)"
+        )
+        cursor.executemany.assert_not_called()
+
+    def test_requested_load_method_wins(self):
+        cursor = self.postgresql_destination_cursor(load_method="executemany")
+
+        cursor.copy_expert.assert_not_called()
+        self.assertEqual(cursor.executemany.call_args.args[1], [(1, "a"), (2, "b")])
+
+
+class TestAdaptiveTransfer(SQLiteTransferTestCase):
+    def test_sized_batches_follow_the_sizer(self):
+        sizer = AdaptiveBatchSizer(target_seconds=1.0, initial_rows=5, min_rows=1)
+        frames = [(0, pl.DataFrame({"a": range(start, start + 2)})) for start in range(0, 12, 2)] + [(0, None)]
+
+        sizes = []
+        for chunk_id, data_frame in _sized_batches(iter(frames), sizer):
+            sizes.append(None if data_frame is None else data_frame.height)
+            if data_frame is not None:
+                # Fast loads: the sizer doubles the next batch
+                sizer.record(data_frame.height, 0.001)
+        self.assertEqual(sizes, [5, 7, None])
+
+    def test_loads_are_not_capped_by_chunk_size(self):
+        self.insert(self.source_engine, [(item_id, "x") for item_id in range(1, 8)])
+        get_metrics().reset()
+
+        self.data_transfer.transfer(
+            "human", "human", None, None, operation="append", chunk_size=2, target_batch_seconds=1.0
+        )
+
+        self.assertEqual(len(self.destination_rows()), 7)
+        self.assertEqual(get_metrics().counter("batches", "human"), 1)
+
+
+class TestIncrementalTransfer(SQLiteTransferTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.state_store = StateStore(":memory:")
+
+    def tearDown(self) -> None:
+        self.state_store.close()
+        super().tearDown()
+
+    def test_only_new_rows_are_read(self):
+        self.insert(self.source_engine, [(1, "a"), (2, "b")])
+        self.data_transfer.transfer(
+            "human", "human", None, None, operation="append", incremental_column="ItemID", state_store=self.state_store
+        )
+        self.insert(self.source_engine, [(3, "c")])
+        self.data_transfer.transfer(
+            "human", "human", None, None, operation="append", incremental_column="ItemID", state_store=self.state_store
+        )
+
+        self.assertEqual(self.destination_rows(), [(1, "a"), (2, "b"), (3, "c")])
+
+    def test_sql_server_merge_must_skip_deletes(self):
+        self.data_transfer.db_type = "mssql"
+        with self.assertRaises(ValueError):
+            self.data_transfer.transfer(
+                "human", "human", None, None, incremental_column="ItemID", state_store=self.state_store
+            )
+
+
+class TestResumeTransfer(SQLiteTransferTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.state_store = StateStore(":memory:")
+        self.insert(self.source_engine, [(1, "a"), (2, "b"), (3, "c")])
+        # An interrupted run committed the first batch of the only chunk
+        self.insert(self.destination_engine, [(1, "a"), (2, "b")])
+        self.transfer_key = self.data_transfer.transfer_key("human", "human")
+        self.state_store.start_checkpoint(self.transfer_key)
+        self.state_store.record_batch(self.transfer_key, 0, 2)
+
+    def tearDown(self) -> None:
+        self.state_store.close()
+        super().tearDown()
+
+    def transfer(self, operation):
+        self.data_transfer.transfer(
+            "human", "human", None, None, operation=operation, chunk_size=2, state_store=self.state_store, resume=True
+        )
+
+    def test_batches_are_recorded(self):
+        self.state_store.clear_checkpoint(self.transfer_key)
+        self.data_transfer.transfer(
+            "human", "human", None, None, operation="refresh", chunk_size=2, state_store=self.state_store
+        )
+        checkpoint = self.state_store.get_checkpoint(self.transfer_key)
+        self.assertEqual(checkpoint["chunks"], {0: (3, None)})
+        self.assertTrue(checkpoint["completed"])
+
+    def test_append_with_committed_batches_is_not_resumed(self):
+        with self.assertRaises(ValueError):
+            self.transfer("append")
+        self.assertEqual(self.destination_rows(), [(1, "a"), (2, "b")])
+
+    def test_refresh_with_committed_batches_restarts(self):
+        self.transfer("refresh")
+        self.assertEqual(self.destination_rows(), [(1, "a"), (2, "b"), (3, "c")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import polars as pl
+import sqlalchemy as sa
+from sqlalchemy.dialects import (
+    mssql,
+    postgresql,
+)
+
+from keepdataflow.database_operations.df_insert import df_insert
+from keepdataflow.database_operations.values_batching import values_batch_rows
+
+
+class TestValuesInsert(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engine = sa.create_engine(f"sqlite:///{os.path.join(self.tmp_dir.name, 'test.db')}")
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE human (ItemID INTEGER PRIMARY KEY, ItemName TEXT, Quantity INTEGER)")
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def rows(self):
+        with self.engine.connect() as conn:
+            return conn.exec_driver_sql("SELECT ItemID, ItemName, Quantity FROM human ORDER BY ItemID").all()
+
+    def test_rows_beyond_one_batch_are_all_inserted(self):
+        # Two full batches and a short one, each at SQLite's bind parameter limit
+        batch_rows = values_batch_rows("sqlite", 3)
+        row_count = 2 * batch_rows + 7
+        data_frame = pl.DataFrame(
+            {
+                "ItemID": range(row_count),
+                "ItemName": [None if i % 5 == 0 else f"item {i}" for i in range(row_count)],
+                "Quantity": [i % 11 for i in range(row_count)],
+            }
+        )
+
+        df_insert(data_frame, "human", self.engine, method="values")
+
+        rows = self.rows()
+        self.assertEqual(len(rows), row_count)
+        self.assertEqual([tuple(row) for row in rows], data_frame.rows())
+
+    def test_truncate_table_replaces_the_rows(self):
+        df_insert(pl.DataFrame({"ItemID": [1, 2], "ItemName": ["a", "b"]}), "human", self.engine, method="values")
+        df_insert(
+            pl.DataFrame({"ItemID": [3], "ItemName": ["c"]}), "human", self.engine, truncate_table='Y', method="values"
+        )
+        self.assertEqual([tuple(row) for row in self.rows()], [(3, "c", None)])
+
+
+class TestValuesPlaceholders(unittest.TestCase):
+    def insert(self, dialect, data_frame):
+        """Run a values insert on a mocked engine of `dialect` and return the (statement, parameters) it executed."""
+        engine = mock.MagicMock()
+        engine.dialect = dialect
+        cursor = engine.begin.return_value.__enter__.return_value.connection.cursor.return_value
+        df_insert(data_frame, "human", engine, schema="dbo", method="values")
+        return [call.args for call in cursor.execute.call_args_list]
+
+    def test_qmark_drivers(self):
+        data_frame = pl.DataFrame({"ItemID": range(2500), "ItemName": ["x"] * 2500})
+        statements = self.insert(mssql.pyodbc.dialect(paramstyle="qmark"), data_frame)
+
+        # SQL Server also caps a VALUES list at 1000 rows
+        self.assertEqual([len(params) for _, params in statements], [2000, 2000, 1000])
+        stmt, params = statements[-1]
+        self.assertTrue(stmt.startswith("INSERT INTO dbo.human (ItemID, ItemName) VALUES (?, ?), (?, ?)"))
+        self.assertEqual(stmt.count("?"), 1000)
+        self.assertEqual(params[:4], [2000, "x", 2001, "x"])
+
+    def test_format_drivers(self):
+        statements = self.insert(
+            postgresql.psycopg2.dialect(), pl.DataFrame({"ItemID": [1, 2], "ItemName": ["a", None]})
+        )
+
+        self.assertEqual(
+            statements, [("INSERT INTO dbo.human (ItemID, ItemName) VALUES (%s, %s), (%s, %s)", [1, "a", 2, None])]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest import mock
+
+import polars as pl
+from sqlalchemy.dialects import postgresql
+
+from keepdataflow.database_operations.df_insert_on_conflict import (
+    _render_upsert,
+    df_insert_on_conflict,
+)
+
+
+def mocked_engine():
+    """Return a mocked PostgreSQL engine and the DBAPI connection and cursor its connections hand out."""
+    engine = mock.MagicMock()
+    engine.dialect = postgresql.dialect()
+    dbapi_conn = engine.begin.return_value.__enter__.return_value.connection
+    return engine, dbapi_conn, dbapi_conn.cursor.return_value
+
+
+class TestRenderUpsert(unittest.TestCase):
+    def test_update(self):
+        stmt = _render_upsert("public.human", ["id", "name"], ["id"], "VALUES (%s, %s)")
+        self.assertIn("INSERT INTO public.human (id, name)", stmt)
+        self.assertIn("ON CONFLICT (id)", stmt)
+        self.assertIn("DO UPDATE SET name = EXCLUDED.name", stmt)
+        self.assertNotIn("IS DISTINCT FROM", stmt)
+
+    def test_skip_unchanged_guard(self):
+        stmt = _render_upsert("public.human", ["id", "name", "age"], ["id"], "VALUES (%s, %s, %s)", skip_unchanged=True)
+        self.assertIn("INSERT INTO public.human AS main (id, name, age)", stmt)
+        self.assertIn("WHERE (main.name, main.age) IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.age)", stmt)
+
+    def test_nothing_to_update(self):
+        stmt = _render_upsert("human", ["id"], ["id"], "VALUES (%s)", skip_unchanged=True)
+        self.assertIn("DO NOTHING", stmt)
+        self.assertNotIn("WHERE", stmt)
+
+
+class TestCopyUpsert(unittest.TestCase):
+    def setUp(self) -> None:
+        self.engine, self.dbapi_conn, self.cursor = mocked_engine()
+        self.copied = []
+        self.cursor.copy_expert.side_effect = lambda stmt, stream: self.copied.append((stmt, stream.read()))
+        self.data_frame = pl.DataFrame({"id": [1, 2, 1], "name": ["a", "b", "c"], "age": [3, None, 5]})
+
+    def test_copy_stages_into_a_temporary_table_and_upserts_it(self):
+        df_insert_on_conflict(
+            self.data_frame, "human", self.engine, schema="public", conflict_columns=["id"], method="copy"
+        )
+
+        create, merge = [call.args[0] for call in self.cursor.execute.call_args_list]
+        self.assertEqual(
+            create,
+            "CREATE TEMPORARY TABLE _kdf_stage_human ON COMMIT DROP AS "
+            "SELECT id, name, age FROM public.human WITH NO DATA",
+        )
+        # The last row per conflict key is the one staged
+        self.assertEqual(
+            self.copied,
+            [('COPY _kdf_stage_human (id, name, age) FROM STDIN WITH (FORMAT csv)', b'2,"b",\n1,"c",5\n')],
+        )
+        self.assertIn("INSERT INTO public.human (id, name, age)", merge)
+        self.assertIn("SELECT id, name, age FROM _kdf_stage_human WHERE true", merge)
+        self.assertIn("ON CONFLICT (id)", merge)
+        self.assertIn("DO UPDATE SET name = EXCLUDED.name, age = EXCLUDED.age", merge)
+        self.assertNotIn("IS DISTINCT FROM", merge)
+        self.assertEqual([name for name, _, _ in self.cursor.method_calls], ["execute", "copy_expert", "execute"])
+        self.dbapi_conn.commit.assert_called_once_with()
+        self.cursor.executemany.assert_not_called()
+
+    def test_copy_skip_unchanged_guard(self):
+        df_insert_on_conflict(
+            self.data_frame, "human", self.engine, conflict_columns=["id"], method="copy", skip_unchanged=True
+        )
+
+        merge = self.cursor.execute.call_args_list[-1].args[0]
+        self.assertIn("INSERT INTO human AS main (id, name, age)", merge)
+        self.assertIn("SELECT id, name, age FROM _kdf_stage_human WHERE true", merge)
+        self.assertIn("WHERE (main.name, main.age) IS DISTINCT FROM (EXCLUDED.name, EXCLUDED.age)", merge)
+
+    def test_executemany_does_not_render_the_staged_statement(self):
+        with mock.patch(
+            "keepdataflow.database_operations.df_insert_on_conflict._render_upsert", wraps=_render_upsert
+        ) as render:
+            df_insert_on_conflict(
+                self.data_frame, "executemany_human", self.engine, conflict_columns=["id"], skip_unchanged=True
+            )
+
+        (call,) = render.call_args_list
+        self.assertEqual(call.args[3], "VALUES (%s, %s, %s)")
+        stmt, rows = self.cursor.executemany.call_args.args
+        self.assertIn("IS DISTINCT FROM", stmt)
+        self.assertEqual(rows, [(1, "a", 3), (2, "b", None), (1, "c", 5)])
+        self.cursor.copy_expert.assert_not_called()
+
+    def test_frames_copy_cannot_carry_are_upserted_row_by_row(self):
+        data_frame = pl.DataFrame({"id": [1], "tags": [["a", "b"]]})
+        df_insert_on_conflict(data_frame, "human", self.engine, conflict_columns=["id"], method="copy")
+
+        self.cursor.copy_expert.assert_not_called()
+        self.cursor.execute.assert_not_called()
+        self.assertIn("VALUES (%s, %s)", self.cursor.executemany.call_args.args[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import threading
+import unittest
+from unittest import mock
+
+import polars as pl
+
+from keepdataflow.database_operations.df_merge import (
+    add_row_hash,
+    changed_rows,
+    render_merge_statement,
+    stage_frame,
+    stored_hashes,
+)
+from keepdataflow.statement_cache import staging_table_name
+
+
+class TestRenderMergeStatement(unittest.TestCase):
+    def setUp(self) -> None:
+        self.df_columns = ["ItemID", "ItemName", "Quantity"]
+
+    def render(self, **kwargs):
+        return render_merge_statement("[dbo].[human]", "##stage", self.df_columns, ["ItemID"], [], **kwargs)
+
+    def test_full_merge(self):
+        stmt = self.render()
+        self.assertIn("MERGE [dbo].[human] WITH (HOLDLOCK) AS main", stmt)
+        self.assertIn("USING (SELECT [ItemID], [ItemName], [Quantity] FROM ##stage) AS temp", stmt)
+        self.assertIn("ON (main.[ItemID] = temp.[ItemID])", stmt)
+        self.assertIn("UPDATE SET [ItemName] = temp.[ItemName], [Quantity] = temp.[Quantity]", stmt)
+        self.assertIn("WHEN NOT MATCHED BY SOURCE", stmt)
+        self.assertTrue(stmt.endswith(";"))
+
+    def test_skip_flags(self):
+        stmt = self.render(skip_updates=True, skip_deletes=True)
+        self.assertNotIn("WHEN MATCHED THEN", stmt)
+        self.assertNotIn("NOT MATCHED BY SOURCE", stmt)
+        self.assertIn("WHEN NOT MATCHED THEN", stmt)
+
+    def test_skip_unchanged_guard(self):
+        stmt = self.render(skip_unchanged=True)
+        self.assertIn(
+            "WHEN MATCHED AND EXISTS (SELECT main.[ItemName], main.[Quantity] "
+            "EXCEPT SELECT temp.[ItemName], temp.[Quantity]) THEN",
+            stmt,
+        )
+        self.assertNotIn("EXCEPT", self.render())
+
+    def test_identity_and_match_columns_excluded_from_insert(self):
+        stmt = render_merge_statement(
+            "[human]", "##stage", self.df_columns, ["ItemName"], ["ItemID"], insert_match_column=False
+        )
+        insert_clause = stmt.split("WHEN NOT MATCHED THEN")[1].split("WHEN NOT MATCHED BY SOURCE")[0]
+        self.assertNotIn("[ItemID]", insert_clause)
+        self.assertNotIn("[ItemName]", insert_clause)
+        self.assertIn("[Quantity]", insert_clause)
+
+
+class TestRowHash(unittest.TestCase):
+    def setUp(self) -> None:
+        self.df = add_row_hash(pl.DataFrame({"ItemID": [1, 2, 3], "ItemName": ["a", "b", "c"]}), "RowHash", ["ItemID"])
+
+    def test_hash_ignores_key_columns(self):
+        rekeyed = add_row_hash(self.df.with_columns(pl.col("ItemID") + 10), "RowHash", ["ItemID"])
+        self.assertEqual(self.df["RowHash"].dtype, pl.Int64)
+        self.assertEqual(self.df["RowHash"].to_list(), rekeyed["RowHash"].to_list())
+
+    def test_changed_rows(self):
+        destination = pl.DataFrame(
+            {
+                "ItemID": [1, 2, 4],
+                "RowHash": [self.df["RowHash"][0], self.df["RowHash"][0], None],
+            },
+            schema={"ItemID": pl.Int32, "RowHash": pl.Int64},
+        )
+        changed = changed_rows(self.df, destination, ["ItemID"], "RowHash")
+        # Row 1 is unchanged, row 2 has a different hash and row 3 is new
+        self.assertEqual(changed["ItemID"].to_list(), [2, 3])
+        self.assertEqual(changed.columns, self.df.columns)
+
+
+class TestStageFrame(unittest.TestCase):
+    def test_statements(self):
+        conn = mock.MagicMock()
+        conn.dialect.paramstyle = "qmark"
+        cursor = conn.connection.cursor.return_value
+        df = pl.DataFrame({"ItemID": [1, 2], "ItemName": ["a", "b"]})
+
+        stage_frame(conn, df, "[dbo].[human]", "##stage", ["ItemID"])
+
+        statements = [call.args[0] for call in conn.exec_driver_sql.call_args_list]
+        self.assertEqual(statements[0], "DROP TABLE IF EXISTS ##stage")
+        self.assertEqual(
+            statements[1],
+            "SELECT TOP 0 [ItemID], [ItemName] INTO ##stage FROM [dbo].[human] "
+            "UNION ALL SELECT TOP 0 [ItemID], [ItemName] FROM [dbo].[human]",
+        )
+        self.assertEqual(statements[2], "CREATE CLUSTERED INDEX ix_kdf_stage ON ##stage ([ItemID])")
+        cursor.executemany.assert_called_once_with(
+            "INSERT INTO ##stage WITH (TABLOCK) ([ItemID], [ItemName]) VALUES (?, ?)", [(1, "a"), (2, "b")]
+        )
+        self.assertTrue(cursor.fast_executemany)
+
+
+class TestStoredHashes(unittest.TestCase):
+    def test_only_the_frames_keys_are_looked_up(self):
+        engine = mock.MagicMock()
+        conn = engine.connect.return_value.__enter__.return_value
+        conn.dialect.paramstyle = "qmark"
+        cursor = conn.connection.cursor.return_value
+        df = pl.DataFrame({"ItemID": [1, 2, 2], "ItemName": ["a", "b", "b"], "RowHash": [10, 20, 20]})
+        keys_table_name = staging_table_name("human_keys")
+
+        with mock.patch.object(pl, "read_database") as read_database:
+            stored_hashes(df, "human", engine, "dbo", ["ItemID"], "RowHash")
+
+        self.assertEqual(sorted(cursor.executemany.call_args.args[1]), [(1,), (2,)])
+        self.assertEqual(
+            read_database.call_args.args[0],
+            f"SELECT k.[ItemID], main.[RowHash] FROM {keys_table_name} AS k "
+            "INNER JOIN [dbo].[human] AS main ON (main.[ItemID] = k.[ItemID])",
+        )
+        conn.commit.assert_called_once()
+
+
+class TestStagingTableName(unittest.TestCase):
+    def test_stable_within_a_thread(self):
+        self.assertEqual(staging_table_name("human"), staging_table_name("human"))
+        self.assertTrue(staging_table_name("human").startswith("##kdf_"))
+
+    def test_unique_per_thread(self):
+        names = []
+        thread = threading.Thread(target=lambda: names.append(staging_table_name("human")))
+        thread.start()
+        thread.join()
+        self.assertNotEqual(names[0], staging_table_name("human"))
+
+
+if __name__ == '__main__':
+    unittest.main()
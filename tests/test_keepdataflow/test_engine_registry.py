@@ -0,0 +1,53 @@
+import unittest
+
+import sqlalchemy as sa
+
+from keepdataflow.database_factory import SQLServerFactory
+from keepdataflow.engine_registry import (
+    dispose_engines,
+    get_engine,
+)
+
+
+class TestEngineRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.database_url = "sqlite:///registry_test.db"
+
+    def tearDown(self) -> None:
+        dispose_engines()
+
+    def test_same_url_shares_one_engine(self):
+        self.assertIs(get_engine(self.database_url), get_engine(sa.engine.make_url(self.database_url)))
+
+    def test_pool_options_share_the_engine_of_their_url(self):
+        engine = get_engine(self.database_url, pool_size=8)
+        self.assertEqual(engine.pool.size(), 8)
+        self.assertIs(get_engine(self.database_url), engine)
+        self.assertIs(get_engine(self.database_url, pool_size=4, pool_pre_ping=True), engine)
+
+    def test_conflicting_pool_options_are_rejected(self):
+        get_engine(self.database_url)
+        with self.assertRaises(ValueError):
+            get_engine(self.database_url, pool_size=64)
+        with self.assertRaises(ValueError):
+            get_engine(self.database_url, pool_recycle=60)
+
+    def test_engines_pass_through(self):
+        engine = sa.create_engine("sqlite://")
+        self.assertIs(get_engine(engine), engine)
+
+    def test_factories_use_the_registry(self):
+        factory = SQLServerFactory(self.database_url, self.database_url)
+        self.assertIs(factory.create_source_connection(), factory.create_destination_connection())
+        self.assertIs(factory.create_source_connection(), get_engine(self.database_url))
+        # run_transfers asks for a pool per worker
+        self.assertIs(factory.create_source_connection(), get_engine(self.database_url, pool_size=4))
+
+    def test_dispose_empties_the_registry(self):
+        engine = get_engine(self.database_url)
+        dispose_engines()
+        self.assertIsNot(get_engine(self.database_url), engine)
+
+
+if __name__ == '__main__':
+    unittest.main()
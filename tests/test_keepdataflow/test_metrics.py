@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+
+import sqlalchemy as sa
+
+from keepdataflow.data_transfer import DatabaseDataTransfer
+from keepdataflow.metrics import (
+    TransferMetrics,
+    get_metrics,
+    metrics_table,
+    phase,
+    timed,
+)
+
+
+class TestTransferMetrics(unittest.TestCase):
+    def test_counters_and_histograms(self):
+        metrics = TransferMetrics(buckets=(0.1, 1.0))
+        metrics.increment("rows", "dbo.orders", 10)
+        metrics.increment("rows", "dbo.orders", 5)
+        metrics.observe("stage", "dbo.orders", 0.05)
+        metrics.observe("stage", "dbo.orders", 2.0)
+
+        self.assertEqual(metrics.counter("rows", "dbo.orders"), 15)
+        self.assertEqual(metrics.counter("rows", "dbo.customers"), 0)
+        self.assertEqual(metrics.histogram("stage", "dbo.orders"), {"count": 2, "sum": 2.05})
+        with self.assertRaises(ValueError):
+            metrics.increment("widgets", "dbo.orders")
+        with self.assertRaises(ValueError):
+            metrics.observe("transform", "dbo.orders", 1.0)
+
+    def test_callbacks_receive_every_observation(self):
+        metrics = TransferMetrics()
+        events = []
+        callback = lambda *event: events.append(event)
+        metrics.add_callback(callback)
+        metrics.increment("batches", "orders")
+        metrics.observe("commit", "orders", 0.5)
+        metrics.remove_callback(callback)
+        metrics.increment("batches", "orders")
+
+        self.assertEqual(
+            events,
+            [
+                ("batches", 1, {"table": "orders"}),
+                ("phase_duration_seconds", 0.5, {"table": "orders", "phase": "commit"}),
+            ],
+        )
+
+    def test_openmetrics_text(self):
+        metrics = TransferMetrics(buckets=(0.1, 1.0))
+        metrics.increment("bytes", 'odd"name', 2048)
+        metrics.observe("merge", "orders", 0.05)
+        metrics.observe("merge", "orders", 0.5)
+        metrics.observe("merge", "orders", 5.0)
+
+        lines = metrics.render().splitlines()
+        self.assertIn('keepdataflow_bytes_total{table="odd\\"name"} 2048', lines)
+        self.assertIn('keepdataflow_phase_duration_seconds_bucket{table="orders",phase="merge",le="0.1"} 1', lines)
+        self.assertIn('keepdataflow_phase_duration_seconds_bucket{table="orders",phase="merge",le="1.0"} 2', lines)
+        self.assertIn('keepdataflow_phase_duration_seconds_bucket{table="orders",phase="merge",le="+Inf"} 3', lines)
+        self.assertIn('keepdataflow_phase_duration_seconds_count{table="orders",phase="merge"} 3', lines)
+        self.assertEqual(lines[-1], "# EOF")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "keepdataflow.prom")
+            metrics.write_openmetrics(path)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), metrics.render())
+            self.assertEqual(os.listdir(tmp_dir), ["keepdataflow.prom"])
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o644)
+
+    def test_metrics_table_labels_phases(self):
+        metrics = get_metrics()
+        metrics.reset()
+        with metrics_table("dbo.orders"):
+            with phase("stage", "dbo.orders_kdf_shadow"):
+                pass
+            self.assertEqual(list(timed([1, 2], "extract")), [1, 2])
+        with phase("stage", "dbo.orders_kdf_shadow"):
+            pass
+
+        self.assertEqual(metrics.histogram("stage", "dbo.orders")["count"], 1)
+        self.assertEqual(metrics.histogram("stage", "dbo.orders_kdf_shadow")["count"], 1)
+        # One wait per item and one for the end of the iterable
+        self.assertEqual(metrics.histogram("extract", "dbo.orders")["count"], 3)
+
+
+class TestTransferRecordsMetrics(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_engine = sa.create_engine(f"sqlite:///{os.path.join(self.tmp_dir.name, 'source.db')}")
+        self.destination_engine = sa.create_engine(f"sqlite:///{os.path.join(self.tmp_dir.name, 'destination.db')}")
+        for engine in (self.source_engine, self.destination_engine):
+            with engine.begin() as conn:
+                conn.exec_driver_sql("CREATE TABLE human (ItemID INTEGER PRIMARY KEY, ItemName TEXT)")
+        with self.source_engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO human VALUES (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd'), (5, 'e')")
+        get_metrics().reset()
+
+    def tearDown(self) -> None:
+        self.source_engine.dispose()
+        self.destination_engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def test_append_records_rows_batches_and_phases(self):
+        DatabaseDataTransfer(self.source_engine, self.destination_engine).transfer(
+            "human", "human", None, None, operation="append", chunk_size=2
+        )
+
+        metrics = get_metrics()
+        self.assertEqual(metrics.counter("rows", "human"), 5)
+        self.assertEqual(metrics.counter("batches", "human"), 3)
+        self.assertGreater(metrics.counter("bytes", "human"), 0)
+        self.assertEqual(metrics.histogram("stage", "human")["count"], 3)
+        self.assertEqual(metrics.histogram("commit", "human")["count"], 3)
+        self.assertGreaterEqual(metrics.histogram("extract", "human")["count"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
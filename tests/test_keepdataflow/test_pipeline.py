@@ -0,0 +1,54 @@
+import threading
+import time
+import unittest
+
+from keepdataflow.pipeline import (
+    interleave,
+    prefetch,
+)
+
+
+class TestPrefetch(unittest.TestCase):
+    def test_producer_runs_ahead(self):
+        produced = []
+
+        def produce():
+            for number in range(3):
+                produced.append(number)
+                yield number
+
+        batches = prefetch(produce(), depth=2)
+        self.assertEqual(next(batches), 0)
+        deadline = time.time() + 5
+        # The reader thread fills the queue while the consumer holds batch 0
+        while len(produced) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(produced, [0, 1, 2])
+        self.assertEqual(list(batches), [1, 2])
+
+    def test_error_is_raised_in_consumer(self):
+        def produce():
+            yield 1
+            raise RuntimeError("source failed")
+
+        with self.assertRaises(RuntimeError):
+            list(prefetch(produce()))
+
+    def test_stops_producer_when_closed(self):
+        stopped = threading.Event()
+
+        def produce():
+            try:
+                for number in range(1000):
+                    yield number
+            finally:
+                stopped.set()
+
+        batches = interleave([produce], max_buffered=1)
+        next(batches)
+        batches.close()
+        self.assertTrue(stopped.wait(5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import unittest
+
+import sqlalchemy as sa
+
+from keepdataflow.reflection_cache import ReflectionCache
+
+
+class TestReflectionCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.database_url = f"sqlite:///{os.path.join(self.tmp_dir.name, 'test.db')}"
+        self.engine = sa.create_engine(self.database_url)
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE human (ItemID INTEGER PRIMARY KEY, ItemName TEXT, Code VARCHAR(20), Price NUMERIC(10, 2))"
+            )
+
+    def tearDown(self) -> None:
+        self.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def add_column(self):
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("ALTER TABLE human ADD COLUMN Quantity INTEGER")
+
+    def column_names(self, cache):
+        return [col["name"] for col in cache.get_columns("human")]
+
+    def test_results_are_cached_until_invalidated(self):
+        cache = ReflectionCache(self.engine)
+        self.assertEqual(self.column_names(cache), ["ItemID", "ItemName", "Code", "Price"])
+        self.assertEqual(cache.get_pk_constraint("human")["constrained_columns"], ["ItemID"])
+
+        self.add_column()
+        self.assertEqual(self.column_names(cache), ["ItemID", "ItemName", "Code", "Price"])
+
+        cache.invalidate("human")
+        self.assertEqual(self.column_names(cache), ["ItemID", "ItemName", "Code", "Price", "Quantity"])
+
+    def test_expired_entries_are_reflected_again(self):
+        cache = ReflectionCache(self.engine, ttl=0)
+        self.column_names(cache)
+        self.add_column()
+        self.assertEqual(self.column_names(cache), ["ItemID", "ItemName", "Code", "Price", "Quantity"])
+
+    def test_snapshot_starts_a_new_cache_warm(self):
+        snapshot = os.path.join(self.tmp_dir.name, "reflection.json")
+        cache = ReflectionCache(self.engine)
+        columns = cache.get_columns("human")
+        cache.save(snapshot)
+
+        self.add_column()
+        warm_cache = ReflectionCache(sa.create_engine(self.database_url))
+        warm_cache.load(snapshot)
+        self.assertEqual(self.column_names(warm_cache), ["ItemID", "ItemName", "Code", "Price"])
+        self.assertEqual(
+            [repr(col["type"]) for col in warm_cache.get_columns("human")], [repr(col["type"]) for col in columns]
+        )
+
+    def test_snapshot_entries_are_valid_for_the_ttl_after_loading(self):
+        snapshot = os.path.join(self.tmp_dir.name, "reflection.json")
+        cache = ReflectionCache(self.engine)
+        self.column_names(cache)
+        # Entries reflected long before the snapshot is loaded
+        cache._entries = {key: (0, value) for key, (_, value) in cache._entries.items()}
+        cache.save(snapshot)
+
+        self.add_column()
+        warm_cache = ReflectionCache(sa.create_engine(self.database_url), ttl=60)
+        warm_cache.load(snapshot)
+        self.assertEqual(self.column_names(warm_cache), ["ItemID", "ItemName", "Code", "Price"])
+
+    def test_snapshot_only_creates_sqlalchemy_types(self):
+        snapshot = os.path.join(self.tmp_dir.name, "reflection.json")
+        cache = ReflectionCache(self.engine)
+        self.column_names(cache)
+        cache.save(snapshot)
+
+        with open(snapshot) as f:
+            data = json.load(f)
+        (records,) = data.values()
+        for record in records:
+            if record["kind"] == "columns":
+                record["value"][0]["type"]["class"] = "subprocess:Popen"
+        with open(snapshot, "w") as f:
+            json.dump(data, f)
+
+        with self.assertRaises(ValueError):
+            ReflectionCache(sa.create_engine(self.database_url)).load(snapshot)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+
+from keepdataflow.scheduler import (
+    dependency_levels,
+    run_dependency_graph,
+)
+
+
+class TestDependencyLevels(unittest.TestCase):
+    def test_levels_follow_dependencies(self):
+        dependencies = {0: set(), 1: {0}, 2: set(), 3: {1, 2}}
+        self.assertEqual(dependency_levels(dependencies), [[0, 2], [1], [3]])
+
+    def test_cycle_is_rejected(self):
+        with self.assertRaises(ValueError):
+            dependency_levels({0: {1}, 1: {0}})
+
+
+class TestRunDependencyGraph(unittest.TestCase):
+    def test_children_run_after_parents(self):
+        finished = []
+        lock = threading.Lock()
+
+        def run_item(item):
+            time.sleep(0.01)
+            with lock:
+                finished.append(item)
+
+        items = ["customer", "product", "order", "order_line"]
+        dependencies = {0: set(), 1: set(), 2: {0}, 3: {1, 2}}
+        run_dependency_graph(items, dependencies, run_item, max_workers=4)
+
+        self.assertEqual(sorted(finished), sorted(items))
+        self.assertLess(finished.index("customer"), finished.index("order"))
+        self.assertLess(finished.index("order"), finished.index("order_line"))
+        self.assertLess(finished.index("product"), finished.index("order_line"))
+
+    def test_independent_items_do_not_wait_for_each_other(self):
+        slow_started = threading.Event()
+        release_slow = threading.Event()
+        finished = []
+
+        def run_item(item):
+            if item == "slow":
+                slow_started.set()
+                release_slow.wait(5)
+            else:
+                slow_started.wait(5)
+            finished.append(item)
+            if item == "child_of_fast":
+                release_slow.set()
+
+        # child_of_fast only depends on fast, so it must not wait for slow
+        items = ["slow", "fast", "child_of_fast"]
+        run_dependency_graph(items, {0: set(), 1: set(), 2: {1}}, run_item, max_workers=2)
+
+        self.assertEqual(finished, ["fast", "child_of_fast", "slow"])
+
+    def test_failure_stops_dependents(self):
+        started = []
+
+        def run_item(item):
+            started.append(item)
+            if item == "parent":
+                raise RuntimeError("load failed")
+
+        with self.assertRaises(RuntimeError):
+            run_dependency_graph(["parent", "child"], {0: set(), 1: {0}}, run_item, max_workers=2)
+        self.assertEqual(started, ["parent"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from keepdataflow.source_query import build_source_query
+
+
+class TestBuildSourceQuery(unittest.TestCase):
+    def test_select_all_without_projection_or_filter(self):
+        self.assertEqual(build_source_query("dbo.human"), "SELECT * FROM dbo.human")
+
+    def test_projection(self):
+        query = build_source_query("dbo.human", columns=["ItemID", "Quantity"])
+        self.assertEqual(query, "SELECT ItemID, Quantity FROM dbo.human")
+
+    def test_single_predicate(self):
+        query = build_source_query("human", where="Quantity > 10")
+        self.assertEqual(query, "SELECT * FROM human WHERE (Quantity > 10)")
+
+    def test_predicates_are_combined_with_and(self):
+        query = build_source_query("human", where=["Quantity > 10", "Location = 'Warehouse A' OR Location IS NULL"])
+        self.assertEqual(
+            query,
+            "SELECT * FROM human WHERE (Quantity > 10) AND (Location = 'Warehouse A' OR Location IS NULL)",
+        )
+
+    def test_empty_predicates_are_ignored(self):
+        self.assertEqual(build_source_query("human", where=["", None]), "SELECT * FROM human")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import datetime
+import decimal
+import unittest
+
+from keepdataflow.state_store import StateStore
+
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self) -> None:
+        self.store = StateStore(":memory:")
+
+    def tearDown(self) -> None:
+        self.store.close()
+
+    def test_missing_watermark(self):
+        self.assertIsNone(self.store.get_watermark("human->human"))
+
+    def test_watermark_round_trip_keeps_type(self):
+        for value in [
+            42,
+            1.5,
+            decimal.Decimal("10.25"),
+            datetime.datetime(2024, 5, 1, 12, 30, 15, 500),
+            datetime.date(2024, 5, 1),
+            b"\x00\x00\x00\x00\x00\x00\x07\xd1",
+            "2024-05-01",
+        ]:
+            with self.subTest(value=value):
+                self.store.set_watermark("human->human", "ModifiedAt", value)
+                restored = self.store.get_watermark("human->human")
+                self.assertEqual(restored, value)
+                self.assertIs(type(restored), type(value))
+
+    def test_clear_watermark(self):
+        self.store.set_watermark("human->human", "ItemID", 100)
+        self.store.clear_watermark("human->human")
+        self.assertIsNone(self.store.get_watermark("human->human"))
+
+    def test_unsupported_type(self):
+        with self.assertRaises(TypeError):
+            self.store.set_watermark("human->human", "ItemID", object())
+
+    def test_checkpoint_round_trip(self):
+        self.assertIsNone(self.store.get_checkpoint("human->human"))
+        self.store.start_checkpoint("human->human", 4, datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+        self.store.complete_chunk("human->human", 2, 250, mark=datetime.datetime(2024, 5, 1))
+        self.store.complete_chunk("human->human", 0, 100)
+        self.store.record_batch("human->human", 1, 50)
+
+        checkpoint = self.store.get_checkpoint("human->human")
+        self.assertEqual(checkpoint["chunk_count"], 4)
+        self.assertEqual(checkpoint["lower"], datetime.date(2024, 1, 1))
+        self.assertEqual(checkpoint["chunks"], {0: (100, None), 2: (250, datetime.datetime(2024, 5, 1))})
+        self.assertEqual(checkpoint["partial_chunks"], {1: (50, None)})
+        self.assertFalse(checkpoint["completed"])
+
+        self.store.finish_checkpoint("human->human")
+        self.assertTrue(self.store.get_checkpoint("human->human")["completed"])
+
+    def test_start_checkpoint_forgets_chunks(self):
+        self.store.start_checkpoint("human->human")
+        self.store.complete_chunk("human->human", 0, 100)
+        self.store.start_checkpoint("human->human")
+        self.assertEqual(self.store.get_checkpoint("human->human")["chunks"], {})
+        self.store.clear_checkpoint("human->human")
+        self.assertIsNone(self.store.get_checkpoint("human->human"))
+
+    def test_runs(self):
+        self.assertIsNone(self.store.interrupted_run())
+        self.store.start_checkpoint("human->human", run_id="earlier")
+        run_id = self.store.start_run(["human->human"])
+        self.assertIsNone(self.store.get_checkpoint("human->human"))
+        self.assertEqual(self.store.interrupted_run(), run_id)
+
+        self.store.start_checkpoint("human->human", run_id=run_id)
+        self.assertEqual(self.store.get_checkpoint("human->human")["run_id"], run_id)
+        self.store.finish_run(run_id)
+        self.assertIsNone(self.store.interrupted_run())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import json
+import os
+import tempfile
+import unittest
+
+import polars as pl
+
+from keepdataflow.database_operations.df_insert import df_insert
+from keepdataflow.engine_registry import (
+    dispose_engines,
+    get_engine,
+)
+from keepdataflow.statement_cache import staging_table_name
+from keepdataflow.statement_profiler import (
+    StatementProfiler,
+    fingerprint,
+    get_statement_profiler,
+    install_statement_timing,
+    statement_timing,
+    timed_statement,
+)
+
+
+class TestFingerprint(unittest.TestCase):
+    def test_staging_tables_share_a_fingerprint(self):
+        stmt = f"DROP TABLE IF EXISTS {staging_table_name('dbo.human')}"
+        self.assertEqual(fingerprint(stmt), "DROP TABLE IF EXISTS ##kdf_dbo_human")
+
+    def test_identifiers_keep_their_digits(self):
+        self.assertEqual(
+            fingerprint("SELECT [col1], t2.x FROM t2 WHERE [col1] > 10.5"),
+            "SELECT [col1], t2.x FROM t2 WHERE [col1] > ?",
+        )
+
+
+class TestStatementProfiler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.engine = get_engine(f"sqlite:///{os.path.join(self.tmp_dir.name, 'test.db')}")
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql("CREATE TABLE human (ItemID INTEGER PRIMARY KEY, ItemName TEXT)")
+        install_statement_timing(self.engine)
+        self.profiler = get_statement_profiler()
+        self.profiler.reset()
+        self.profiler.slow_log_path = None
+
+    def tearDown(self) -> None:
+        self.profiler.slow_seconds = StatementProfiler().slow_seconds
+        self.profiler.slow_log_path = None
+        dispose_engines()
+        self.tmp_dir.cleanup()
+
+    def entry(self, table):
+        return [entry for entry in self.profiler.profile() if entry["table"] == table]
+
+    def test_engines_are_only_timed_while_timing_is_installed(self):
+        engine = get_engine(f"sqlite:///{os.path.join(self.tmp_dir.name, 'untimed.db')}")
+        with statement_timing(engine):
+            with engine.begin() as conn:
+                conn.exec_driver_sql("CREATE TABLE pet (ItemID INTEGER PRIMARY KEY)")
+        with engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO pet VALUES (1)")
+        with timed_statement(engine, "DELETE FROM pet WHERE ItemID = 1"):
+            pass
+
+        self.assertEqual(
+            [entry["fingerprint"] for entry in self.entry("pet")], ["CREATE TABLE pet (ItemID INTEGER PRIMARY KEY)"]
+        )
+
+    def test_timed_engines_report_every_statement(self):
+        with self.engine.begin() as conn:
+            for item_id in range(3):
+                conn.exec_driver_sql(f"INSERT INTO human VALUES ({item_id}, 'x')")
+
+        (entry,) = self.entry("human")
+        self.assertEqual(entry["fingerprint"], "INSERT INTO human VALUES (?, ?)")
+        self.assertEqual(entry["calls"], 3)
+        self.assertEqual(entry["rows"], 3)
+        self.assertEqual(entry["database"], "sqlite")
+
+    def test_cursor_loads_are_timed(self):
+        df_insert(pl.DataFrame({"ItemID": [1, 2], "ItemName": ["a", "b"]}), "human", self.engine)
+
+        (entry,) = self.entry("human")
+        self.assertTrue(entry["fingerprint"].startswith("INSERT INTO human (ItemID, ItemName) VALUES (?, ?)"))
+        self.assertEqual(entry["rows"], 2)
+
+    def test_slow_statements_and_profile_file(self):
+        self.profiler.slow_seconds = 0.0
+        with timed_statement(self.engine, "DELETE FROM human WHERE ItemID = 5"):
+            pass
+
+        (slow,) = self.profiler.slow_statements
+        self.assertEqual(slow["fingerprint"], "DELETE FROM human WHERE ItemID = ?")
+        self.assertEqual(slow["table"], "human")
+
+        path = os.path.join(self.tmp_dir.name, "profile.json")
+        self.profiler.write_profile(path)
+        with open(path, encoding="utf-8") as f:
+            profile = json.load(f)
+        self.assertEqual(profile["statements"][0]["calls"], 1)
+        self.assertEqual(len(profile["slow_statements"]), 1)
+
+    def test_slow_log_file(self):
+        path = os.path.join(self.tmp_dir.name, "slow.jsonl")
+        self.profiler.slow_seconds = 0.0
+        self.profiler.slow_log_path = path
+        with timed_statement(self.engine, "DELETE FROM human WHERE ItemID = 5"):
+            pass
+        with timed_statement(self.engine, "DELETE FROM human WHERE ItemID = 6"):
+            pass
+
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual([line["fingerprint"] for line in lines], ["DELETE FROM human WHERE ItemID = ?"] * 2)
+        self.assertEqual(lines[0]["database"], "sqlite")
+
+
+if __name__ == '__main__':
+    unittest.main()
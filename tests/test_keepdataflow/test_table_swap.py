@@ -0,0 +1,359 @@
+import datetime
+import unittest
+from unittest import mock
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import (
+    mssql,
+    postgresql,
+)
+
+from keepdataflow.database_operations.index_suspension import suspended_indexes
+from keepdataflow.database_operations.partition_swap import (
+    _mssql_literal,
+    find_partition,
+    prepare_partition_stage,
+    switch_partition,
+)
+from keepdataflow.database_operations.table_swap import (
+    create_shadow_table,
+    shadow_table_name,
+    swap_shadow_table,
+)
+
+
+def mocked_engine(dialect):
+    """Return a mocked engine of `dialect` whose connections record the statements they run."""
+    engine = mock.MagicMock()
+    engine.dialect = dialect
+    conn = engine.begin.return_value.__enter__.return_value
+    conn.dialect = dialect
+    return engine, conn
+
+
+def results(*rows):
+    """Return mocked results of consecutive `execute` calls, each returning one of `rows`."""
+    mocked = []
+    for row in rows:
+        result = mock.MagicMock()
+        result.one.return_value = result.one_or_none.return_value = row
+        result.scalar_one.return_value = row
+        result.all.return_value = row
+        result.scalars.return_value.all.return_value = row
+        mocked.append(result)
+    return mocked
+
+
+class TestTableSwap(unittest.TestCase):
+    def test_shadow_table_name_fits_identifier_limit(self):
+        self.assertEqual(shadow_table_name("orders"), "orders_kdf_shadow")
+        self.assertLessEqual(len(shadow_table_name("x" * 100)), 63)
+
+    def test_unsupported_dialect(self):
+        engine = sa.create_engine("sqlite://")
+        with self.assertRaises(ValueError):
+            create_shadow_table(engine, "orders")
+
+    def test_tables_the_swap_would_lose_parts_of_are_refused(self):
+        engine, conn = mocked_engine(postgresql.dialect())
+        engine.connect.return_value.__enter__.return_value.execute.return_value.one.return_value = (2, 0, 1)
+        columns = [{"name": "id", "type": sa.Integer(), "default": "nextval('orders_id_seq'::regclass)"}]
+
+        with mock.patch("keepdataflow.database_operations.table_swap.get_reflection_cache") as reflection:
+            reflection.return_value.get_columns.return_value = columns
+            with self.assertRaises(ValueError) as context:
+                create_shadow_table(engine, "orders", "public")
+
+        message = str(context.exception)
+        self.assertIn("identity or serial columns id", message)
+        self.assertIn("2 granted permissions", message)
+        self.assertIn("1 triggers", message)
+        self.assertNotIn("dependent", message)
+        conn.execute.assert_not_called()
+
+    def swap(self, dialect):
+        engine, conn = mocked_engine(dialect)
+        renames = [("ix_kdf_1_0", "orders_n_ux", False), ("pk_kdf_1", "orders_pkey", True)]
+        with mock.patch("keepdataflow.database_operations.table_swap.get_reflection_cache"), mock.patch(
+            "keepdataflow.database_operations.table_swap.build_keys_and_indexes", return_value=renames
+        ):
+            swap_shadow_table(engine, "orders", "orders_kdf_shadow", "sales")
+        return conn
+
+    def test_postgresql_swap_statements(self):
+        conn = self.swap(postgresql.dialect())
+
+        statements = [call.args[0] for call in conn.exec_driver_sql.call_args_list]
+        self.assertEqual(
+            statements,
+            [
+                "ALTER TABLE sales.orders RENAME TO orders_kdf_retired",
+                "ALTER TABLE sales.orders_kdf_shadow RENAME TO orders",
+                "DROP TABLE sales.orders_kdf_retired",
+                "ALTER INDEX sales.ix_kdf_1_0 RENAME TO orders_n_ux",
+                "ALTER TABLE sales.orders RENAME CONSTRAINT pk_kdf_1 TO orders_pkey",
+            ],
+        )
+
+    def test_mssql_swap_statements(self):
+        conn = self.swap(mssql.dialect())
+
+        self.assertEqual(
+            [call.args[1] for call in conn.execute.call_args_list],
+            [
+                {"old": "sales.orders", "new": "orders_kdf_retired"},
+                {"old": "sales.orders_kdf_shadow", "new": "orders"},
+                {"old": "sales.orders.ix_kdf_1_0", "new": "orders_n_ux", "kind": "INDEX"},
+                {"old": "sales.pk_kdf_1", "new": "orders_pkey", "kind": "OBJECT"},
+            ],
+        )
+        conn.exec_driver_sql.assert_called_once_with("DROP TABLE sales.orders_kdf_retired")
+
+
+class TestPartitionSwap(unittest.TestCase):
+    def test_mssql_literals(self):
+        self.assertEqual(_mssql_literal(datetime.date(2024, 3, 1)), "'20240301'")
+        self.assertEqual(_mssql_literal(datetime.datetime(2024, 3, 1, 12, 30)), "'2024-03-01T12:30:00.000'")
+        self.assertEqual(_mssql_literal("O'Brien"), "N'O''Brien'")
+        self.assertEqual(_mssql_literal(202403), "202403")
+
+    def test_unsupported_dialect(self):
+        engine = sa.create_engine("sqlite://")
+        with self.assertRaises(ValueError):
+            prepare_partition_stage(engine, "sales", datetime.date(2024, 3, 1))
+
+    def test_mssql_source_filter(self):
+        engine, _ = mocked_engine(mssql.dialect())
+        conn = engine.connect.return_value.__enter__.return_value
+        conn.dialect = engine.dialect
+        march, april = datetime.date(2024, 3, 1), datetime.date(2024, 4, 1)
+        conn.execute.side_effect = results(
+            (65601, "pf_month", 65536, True, "sale_date"), 3, "PRIMARY", [(2, march), (3, april)]
+        )
+
+        partition = find_partition(engine, "sales", datetime.date(2024, 3, 9), "dbo")
+
+        self.assertEqual(
+            partition["check"], "sale_date >= '20240301' AND sale_date IS NOT NULL AND sale_date < '20240401'"
+        )
+        self.assertEqual(
+            partition["source_filter"],
+            (
+                "sale_date >= :partition_lower AND sale_date < :partition_upper",
+                {"partition_lower": march, "partition_upper": april},
+            ),
+        )
+
+    def test_postgresql_source_filters(self):
+        engine, _ = mocked_engine(postgresql.dialect())
+        conn = engine.connect.return_value.__enter__.return_value
+        conn.dialect = engine.dialect
+        plan = [{"Plan": {"Relation Name": "sales_3", "Schema": "public"}}]
+        march, april = datetime.date(2024, 3, 1), datetime.date(2024, 4, 1)
+        conn.execute.side_effect = results(
+            "RANGE (sale_date)",
+            plan,
+            ("FOR VALUES FROM ('2024-03-01') TO ('2024-04-01')", "check"),
+            "date",
+            (march, april),
+            "LIST (region)",
+            plan,
+            ("FOR VALUES IN ('north', NULL)", "check"),
+            "text",
+            ["north", None],
+        )
+
+        range_partition = find_partition(engine, "sales", march, "public")
+        list_partition = find_partition(engine, "sales", "north", "public")
+
+        self.assertEqual(
+            range_partition["source_filter"],
+            (
+                "sale_date >= :partition_lower AND sale_date < :partition_upper",
+                {"partition_lower": march, "partition_upper": april},
+            ),
+        )
+        self.assertEqual(
+            list_partition["source_filter"],
+            ("region IN (:partition_value_0) OR region IS NULL", {"partition_value_0": "north"}),
+        )
+
+    def test_mssql_switch_statements(self):
+        engine, conn = mocked_engine(mssql.dialect())
+        stage = {"number": 3, "stage_table": "sales_kdf_p3"}
+        with mock.patch("keepdataflow.database_operations.partition_swap.get_reflection_cache"), mock.patch(
+            "keepdataflow.database_operations.partition_swap.build_keys_and_indexes"
+        ) as build_keys_and_indexes:
+            switch_partition(engine, "sales", stage, "dbo")
+
+        build_keys_and_indexes.assert_called_once_with(engine, "sales", "sales_kdf_p3", "dbo")
+        self.assertEqual(
+            [call.args[0] for call in conn.exec_driver_sql.call_args_list],
+            [
+                "TRUNCATE TABLE dbo.sales WITH (PARTITIONS (3))",
+                "ALTER TABLE dbo.sales_kdf_p3 SWITCH TO dbo.sales PARTITION 3",
+                "DROP TABLE dbo.sales_kdf_p3",
+            ],
+        )
+
+    def test_postgresql_detach_attach_statements(self):
+        engine, conn = mocked_engine(postgresql.dialect())
+        stage = {
+            "name": "sales_3",
+            "schema": "public",
+            "bound": "FOR VALUES FROM ('2024-03-01') TO ('2024-04-01')",
+            "stage_table": "sales_3_kdf_shadow",
+        }
+        renames = [("ix_kdf_1_0", "sales_3_sale_date_idx", False)]
+        with mock.patch("keepdataflow.database_operations.partition_swap.get_reflection_cache"), mock.patch(
+            "keepdataflow.database_operations.partition_swap.build_keys_and_indexes", return_value=renames
+        ):
+            switch_partition(engine, "sales", stage, "public")
+
+        self.assertEqual(
+            [call.args[0] for call in conn.exec_driver_sql.call_args_list],
+            [
+                "ALTER TABLE public.sales DETACH PARTITION public.sales_3",
+                "DROP TABLE public.sales_3",
+                "ALTER TABLE public.sales ATTACH PARTITION public.sales_3_kdf_shadow "
+                "FOR VALUES FROM ('2024-03-01') TO ('2024-04-01')",
+                "ALTER TABLE public.sales_3_kdf_shadow RENAME TO sales_3",
+                "ALTER INDEX public.ix_kdf_1_0 RENAME TO sales_3_sale_date_idx",
+                "ALTER TABLE public.sales_3 DROP CONSTRAINT ck_kdf_partition",
+            ],
+        )
+
+
+class TestIndexSuspension(unittest.TestCase):
+    def test_unsupported_dialect(self):
+        engine = sa.create_engine("sqlite://")
+        with self.assertRaises(ValueError):
+            with suspended_indexes(engine, "orders"):
+                pass
+
+    def test_mssql_keeps_unique_indexes_and_restores_everything(self):
+        engine, conn = mocked_engine(mssql.dialect())
+        indexes = [
+            {"name": "pk_orders", "unique": True, "dialect_options": {"mssql_clustered": True}},
+            {"name": "uq_orders_number", "unique": True},
+            {"name": "ix_orders_a"},
+            {"name": "ix_orders_b"},
+        ]
+        rebuild_error = sa.exc.DBAPIError("REBUILD", None, Exception("duplicate key"))
+
+        def execute(statement):
+            if statement == "ALTER INDEX ix_orders_a ON dbo.orders REBUILD":
+                raise rebuild_error
+
+        with mock.patch(
+            "keepdataflow.database_operations.index_suspension.get_reflection_cache"
+        ) as reflection, self.assertRaises(sa.exc.DBAPIError) as context:
+            reflection.return_value.get_indexes.return_value = indexes
+            with suspended_indexes(engine, "orders", "dbo"):
+                conn.exec_driver_sql.side_effect = execute
+
+        self.assertIs(context.exception, rebuild_error)
+        self.assertEqual(
+            [call.args[0] for call in conn.exec_driver_sql.call_args_list],
+            [
+                "ALTER INDEX ix_orders_a ON dbo.orders DISABLE",
+                "ALTER INDEX ix_orders_b ON dbo.orders DISABLE",
+                "ALTER TABLE dbo.orders NOCHECK CONSTRAINT ALL",
+                "ALTER INDEX ix_orders_a ON dbo.orders REBUILD",
+                "ALTER INDEX ix_orders_b ON dbo.orders REBUILD",
+                "ALTER TABLE dbo.orders WITH CHECK CHECK CONSTRAINT ALL",
+            ],
+        )
+
+    def test_postgresql_restores_every_index_and_foreign_key(self):
+        engine, conn = mocked_engine(postgresql.dialect())
+        conn.execute.side_effect = results(
+            [
+                ("ix_orders_a", "CREATE INDEX ix_orders_a ON public.orders (a)"),
+                ("ix_orders_b", "CREATE INDEX ix_orders_b ON public.orders (b)"),
+            ],
+            [("orders_customer_fk", "FOREIGN KEY (customer_id) REFERENCES customers(id)")],
+        )
+        index_error = sa.exc.DBAPIError("CREATE INDEX", None, Exception("out of disk"))
+
+        def execute(statement):
+            if statement.startswith("CREATE INDEX ix_orders_a"):
+                raise index_error
+
+        with mock.patch("keepdataflow.database_operations.index_suspension.get_reflection_cache"), self.assertRaises(
+            sa.exc.DBAPIError
+        ) as context:
+            with suspended_indexes(engine, "orders", "public"):
+                conn.exec_driver_sql.side_effect = execute
+
+        self.assertIs(context.exception, index_error)
+        self.assertIn("NOT i.indisunique", str(conn.execute.call_args_list[0].args[0]))
+        self.assertEqual(
+            [call.args[0] for call in conn.exec_driver_sql.call_args_list][3:],
+            [
+                "CREATE INDEX ix_orders_a ON public.orders (a)",
+                "CREATE INDEX ix_orders_b ON public.orders (b)",
+                "ALTER TABLE public.orders ADD CONSTRAINT orders_customer_fk "
+                "FOREIGN KEY (customer_id) REFERENCES customers(id)",
+            ],
+        )
+
+    def test_mssql_failed_fallback_still_raises_the_validation_error(self):
+        engine, conn = mocked_engine(mssql.dialect())
+        check_error = sa.exc.DBAPIError("WITH CHECK", None, Exception("conflicted with the FOREIGN KEY"))
+
+        def execute(statement):
+            if statement == "ALTER TABLE dbo.orders WITH CHECK CHECK CONSTRAINT ALL":
+                raise check_error
+            if statement == "ALTER TABLE dbo.orders CHECK CONSTRAINT ALL":
+                raise sa.exc.DBAPIError("CHECK", None, Exception("lock timeout"))
+
+        with mock.patch(
+            "keepdataflow.database_operations.index_suspension.get_reflection_cache"
+        ) as reflection, self.assertRaises(sa.exc.DBAPIError) as context:
+            reflection.return_value.get_indexes.return_value = []
+            with suspended_indexes(engine, "orders", "dbo"):
+                conn.exec_driver_sql.side_effect = execute
+
+        self.assertIs(context.exception, check_error)
+        self.assertEqual(conn.exec_driver_sql.call_args_list[-1].args[0], "ALTER TABLE dbo.orders CHECK CONSTRAINT ALL")
+
+    def test_postgresql_failed_fallback_does_not_stop_the_other_foreign_keys(self):
+        engine, conn = mocked_engine(postgresql.dialect())
+        conn.execute.side_effect = results(
+            [],
+            [
+                ("orders_customer_fk", "FOREIGN KEY (customer_id) REFERENCES customers(id)"),
+                ("orders_product_fk", "FOREIGN KEY (product_id) REFERENCES products(id)"),
+            ],
+        )
+        fk_error = sa.exc.DBAPIError("ADD CONSTRAINT", None, Exception("violates foreign key constraint"))
+
+        fallback_error = sa.exc.DBAPIError("NOT VALID", None, Exception('relation "customers" does not exist'))
+
+        def execute(statement):
+            if statement.startswith("ALTER TABLE public.orders ADD CONSTRAINT orders_customer_fk"):
+                raise fallback_error if statement.endswith("NOT VALID") else fk_error
+
+        with mock.patch("keepdataflow.database_operations.index_suspension.get_reflection_cache"), self.assertRaises(
+            sa.exc.DBAPIError
+        ) as context:
+            with suspended_indexes(engine, "orders", "public"):
+                conn.exec_driver_sql.side_effect = execute
+
+        self.assertIs(context.exception, fk_error)
+        self.assertEqual(
+            [call.args[0] for call in conn.exec_driver_sql.call_args_list][2:],
+            [
+                "ALTER TABLE public.orders ADD CONSTRAINT orders_customer_fk "
+                "FOREIGN KEY (customer_id) REFERENCES customers(id)",
+                "ALTER TABLE public.orders ADD CONSTRAINT orders_customer_fk "
+                "FOREIGN KEY (customer_id) REFERENCES customers(id) NOT VALID",
+                "ALTER TABLE public.orders ADD CONSTRAINT orders_product_fk "
+                "FOREIGN KEY (product_id) REFERENCES products(id)",
+            ],
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
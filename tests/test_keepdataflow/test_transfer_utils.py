@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+import unittest
+
+import sqlalchemy as sa
+
+from keepdataflow.engine_registry import (
+    dispose_engines,
+    get_engine,
+)
+from keepdataflow.statement_profiler import _after_cursor_execute
+from keepdataflow.transfer_utils import run_transfers
+
+
+class TestResumeRunTransfers(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source_url = f"sqlite:///{os.path.join(self.tmp_dir.name, 'source.db')}"
+        self.destination_url = f"sqlite:///{os.path.join(self.tmp_dir.name, 'destination.db')}"
+        self.state_path = os.path.join(self.tmp_dir.name, "state.db")
+        for url in (self.source_url, self.destination_url):
+            self.execute(url, "CREATE TABLE a (ItemID INTEGER PRIMARY KEY, ItemName TEXT)")
+            self.execute(url, "CREATE TABLE b (ItemID INTEGER PRIMARY KEY, ItemName TEXT)")
+        self.execute(self.source_url, "INSERT INTO a VALUES (1, 'a')")
+        self.execute(self.source_url, "INSERT INTO b VALUES (1, 'b')")
+
+    def tearDown(self) -> None:
+        dispose_engines()
+        self.tmp_dir.cleanup()
+
+    def execute(self, url, statement):
+        engine = sa.create_engine(url)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(statement)
+        engine.dispose()
+
+    def count(self, table):
+        engine = sa.create_engine(self.destination_url)
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar_one()
+        engine.dispose()
+        return rows
+
+    def run_transfers(self, **kwargs):
+        tables = [
+            {"sourceTable": table, "targetTable": table, "sourceSchema": None, "targetSchema": None}
+            for table in ("a", "b")
+        ]
+        config = {
+            "database": {
+                "sourceConnectionString": self.source_url,
+                "destinationConnectionString": self.destination_url,
+            },
+            "tables": [{**table, "operation": "refresh"} for table in tables],
+        }
+        run_transfers(config, **{"state_path": self.state_path, **kwargs})
+
+    def test_run_without_state_or_statement_logs_creates_no_file(self):
+        working_dir = os.getcwd()
+        os.chdir(self.tmp_dir.name)
+        self.addCleanup(os.chdir, working_dir)
+
+        self.run_transfers(state_path=None)
+        self.assertEqual(self.count("b"), 1)
+        self.assertEqual(sorted(os.listdir()), ["destination.db", "source.db"])
+
+    def test_profile_times_the_run_only(self):
+        profile_path = os.path.join(self.tmp_dir.name, "profile.json")
+        self.run_transfers(profile_path=profile_path)
+
+        with open(profile_path, encoding="utf-8") as f:
+            tables = {entry["table"] for entry in json.load(f)["statements"]}
+        self.assertTrue({"a", "b"} <= tables)
+        self.assertFalse(
+            sa.event.contains(get_engine(self.destination_url), "after_cursor_execute", _after_cursor_execute)
+        )
+
+    def test_resume_ignores_checkpoints_of_earlier_runs(self):
+        self.run_transfers()
+
+        # The next run fails on a before it reaches b, which has a new row by then
+        self.execute(self.source_url, "INSERT INTO b VALUES (2, 'b')")
+        self.execute(self.source_url, "ALTER TABLE a RENAME TO a_moved")
+        with self.assertRaises(sa.exc.OperationalError):
+            self.run_transfers()
+
+        self.execute(self.source_url, "ALTER TABLE a_moved RENAME TO a")
+        self.run_transfers(resume=True)
+        self.assertEqual(self.count("a"), 1)
+        self.assertEqual(self.count("b"), 2)
+
+    def test_resume_skips_tables_finished_by_the_interrupted_run(self):
+        # The run finishes a, then fails on b
+        self.execute(self.source_url, "ALTER TABLE b RENAME TO b_moved")
+        with self.assertRaises(sa.exc.OperationalError):
+            self.run_transfers()
+
+        # A row a reads on resume would show that a was loaded again
+        self.execute(self.source_url, "INSERT INTO a VALUES (2, 'a')")
+        self.execute(self.source_url, "ALTER TABLE b_moved RENAME TO b")
+        self.run_transfers(resume=True)
+        self.assertEqual(self.count("a"), 1)
+        self.assertEqual(self.count("b"), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()